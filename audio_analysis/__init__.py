@@ -9,14 +9,41 @@ so they can mix harmonically compatible tracks together.
 """
 
 from .key_detection import (
+    load_audio,
+    load_excerpt,
     detect_key_from_audio,
     detect_bpm,
+    analyze_audio,
     analyze_track
 )
+from .analysis_cache import (
+    AnalysisCache,
+    analyze_track_cached
+)
+from .key_estimation import estimate_key, estimate_keys, classify_keys
+from .pcm_cache import PcmCache
+from .feature_store import FeatureStore
+from .batch import analyze_tracks, WorkerPool
+from .preview import preview_track
+from .tag_reader import read_tag_analysis
 
 __all__ = [
+    'load_audio',
+    'load_excerpt',
     'detect_key_from_audio',
     'detect_bpm', 
-    'analyze_track'
+    'analyze_audio',
+    'analyze_track',
+    'AnalysisCache',
+    'analyze_track_cached',
+    'estimate_key',
+    'estimate_keys',
+    'classify_keys',
+    'PcmCache',
+    'FeatureStore',
+    'analyze_tracks',
+    'WorkerPool',
+    'preview_track',
+    'read_tag_analysis'
 ]
 
@@ -0,0 +1,483 @@
+"""
+Analysis Cache - Remembering What We Already Analyzed
+
+Analyzing a track (decode + chroma + tempo) takes seconds. Doing it
+again every time someone builds a playlist over the same folder is a
+waste, so results are stored in a small SQLite database.
+
+Each entry is keyed by the file's identity:
+- path + size + modification time (cheap, always checked)
+- optionally a content hash (survives touch/copy with new mtime)
+
+Entries also remember which ANALYZER_VERSION produced them, so when
+the detection algorithm changes, old results are recomputed.
+
+Example:
+    >>> cache = AnalysisCache.for_library("/music")
+    >>> info = analyze_track_cached("/music/song.mp3", cache)  # analyzes
+    >>> info = analyze_track_cached("/music/song.mp3", cache)  # instant
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+from .key_detection import ANALYZER_VERSION, analyze_track
+
+
+# Nome do arquivo de cache quando ele fica na raiz da biblioteca
+LIBRARY_CACHE_FILENAME = ".dj_analysis_cache.sqlite"
+
+# Default size cap (number of tracks kept before LRU eviction)
+DEFAULT_MAX_ENTRIES = 100000
+
+# Columns stored as real SQL columns - everything else in the analysis
+# dictionary goes into the JSON 'extra' column
+CORE_FIELDS = ("key", "camelot", "bpm", "duration", "confidence")
+
+# Tracks whose last-used time is written in one transaction - a
+# read-only pass over a big library shouldn't commit once per hit
+TOUCH_BATCH = 500
+
+# How much of the file the content hash reads (start + end)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_path():
+    """
+    Where the shared cache lives when no library-specific one is used.
+
+    Follows the XDG convention on Linux (~/.cache) and falls back to
+    the home folder elsewhere.
+
+    Returns:
+        Path to the SQLite file
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return Path(base) / "dj-harmonic-analyzer" / "analysis.sqlite"
+
+
+def file_content_hash(file_path):
+    """
+    Quick content fingerprint of an audio file.
+
+    Hashing 40k full tracks would cost almost as much as decoding them,
+    so we hash the size plus the first and last megabyte. That is
+    enough to tell apart two different songs with the same name.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest string
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha1(str(size).encode())
+
+    with open(file_path, "rb") as f:
+        digest.update(f.read(HASH_CHUNK_SIZE))
+        if size > 2 * HASH_CHUNK_SIZE:
+            f.seek(-HASH_CHUNK_SIZE, os.SEEK_END)
+            digest.update(f.read(HASH_CHUNK_SIZE))
+
+    return digest.hexdigest()
+
+
+def _is_cacheable(analysis):
+    """Only successful analyses are worth remembering."""
+    return (
+        analysis is not None
+        and "error" not in analysis
+        and analysis.get("duration") is not None
+        and analysis.get("camelot") not in (None, "Unknown")
+    )
+
+
+class AnalysisCache:
+    """
+    Persistent SQLite cache of track analyses.
+
+    Safe to share between threads (one connection guarded by a lock).
+
+    A hit only updates the entry's last-used time in memory. Those
+    times are written once TOUCH_BATCH tracks have been hit, with the
+    next put(), and by flush() or close().
+
+    Args:
+        db_path: SQLite file (None = default_cache_path())
+        max_entries: Size cap - least recently used entries are evicted
+        use_content_hash: Also store/check a content hash, so files whose
+                          mtime changed but content didn't keep their entry
+    """
+
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES,
+                 use_content_hash=False):
+        self.db_path = Path(db_path) if db_path else default_cache_path()
+        self.max_entries = max_entries
+        self.use_content_hash = use_content_hash
+        self._lock = threading.Lock()
+        self._touched = {}   # path -> (last_used, mtime) not written yet
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._create_schema()
+
+    @classmethod
+    def for_library(cls, directory, **kwargs):
+        """Open (or create) the cache stored in a library's root folder."""
+        return cls(Path(directory) / LIBRARY_CACHE_FILENAME, **kwargs)
+
+    def _create_schema(self):
+        with self._lock:
+            # WAL makes the per-track commits cheap
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    content_hash TEXT,
+                    analyzer_version TEXT NOT NULL,
+                    key TEXT,
+                    camelot TEXT,
+                    bpm NUMERIC,
+                    duration REAL,
+                    confidence REAL,
+                    extra TEXT,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_last_used "
+                "ON analysis (last_used)"
+            )
+            self._conn.commit()
+
+    def get(self, file_path):
+        """
+        Look up a cached analysis.
+
+        Returns None when the file is unknown, changed on disk, or was
+        analyzed by an older ANALYZER_VERSION.
+
+        Args:
+            file_path: Path to the audio file
+
+        Returns:
+            Analysis dictionary (same shape as analyze_track) or None
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, content_hash, analyzer_version, key, "
+                "camelot, bpm, duration, confidence, extra "
+                "FROM analysis WHERE path = ?", (path,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        size, mtime, content_hash, version, *core, extra = row
+        if version != ANALYZER_VERSION:
+            return None
+
+        if size != stat.st_size or mtime != stat.st_mtime:
+            # Same content with a new mtime (touch, copy) is still valid
+            if not (self.use_content_hash and content_hash
+                    and size == stat.st_size
+                    and file_content_hash(path) == content_hash):
+                return None
+
+        # Written later, in batches (see flush)
+        with self._lock:
+            self._touched[path] = (time.time(), stat.st_mtime)
+            if len(self._touched) >= TOUCH_BATCH:
+                self._write_touches()
+                self._conn.commit()
+
+        analysis = json.loads(extra) if extra else {}
+        analysis.update(dict(zip(CORE_FIELDS, core)))
+        analysis["file_path"] = file_path
+        return analysis
+
+    def put(self, file_path, analysis):
+        """
+        Store an analysis result.
+
+        Failed analyses (errors, no duration) are not stored, so they
+        get retried next time.
+
+        Args:
+            file_path: Path to the audio file
+            analysis: Dictionary returned by analyze_track()
+        """
+        if not _is_cacheable(analysis):
+            return
+
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+
+        content_hash = file_content_hash(path) if self.use_content_hash else None
+        extra = {
+            k: v for k, v in analysis.items()
+            if k not in CORE_FIELDS and k != "file_path"
+        }
+
+        with self._lock:
+            self._write_touches()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis (path, size, mtime, "
+                "content_hash, analyzer_version, key, camelot, bpm, duration, "
+                "confidence, extra, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, content_hash,
+                 ANALYZER_VERSION,
+                 *(analysis.get(field) for field in CORE_FIELDS),
+                 json.dumps(extra) if extra else None,
+                 time.time())
+            )
+            self._conn.commit()
+
+        self._evict_if_needed()
+
+    def _write_touches(self):
+        """Queue the pending last-used updates (call with the lock held,
+        then commit)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE analysis SET last_used = ?, mtime = ? WHERE path = ?",
+                [(used, mtime, path) for path, (used, mtime) in self._touched.items()]
+            )
+            self._touched = {}
+
+    def flush(self):
+        """Write the last-used times of recent cache hits to disk."""
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+
+    def invalidate(self, file_path=None):
+        """
+        Forget cached results.
+
+        Args:
+            file_path: One file to forget, or None to clear everything
+        """
+        with self._lock:
+            if file_path is None:
+                self._conn.execute("DELETE FROM analysis")
+            else:
+                self._conn.execute(
+                    "DELETE FROM analysis WHERE path = ?",
+                    (os.path.abspath(file_path),)
+                )
+            self._conn.commit()
+
+    def rename(self, old_path, new_path):
+        """
+        Move an entry to a new path (file renamed or moved on disk).
+
+        The file itself is unchanged, so its analysis stays valid.
+
+        Args:
+            old_path: Where the file used to be
+            new_path: Where it is now
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis SELECT ?, size, mtime, "
+                "content_hash, analyzer_version, key, camelot, bpm, duration, "
+                "confidence, extra, last_used FROM analysis WHERE path = ?",
+                (os.path.abspath(new_path), os.path.abspath(old_path))
+            )
+            self._conn.execute(
+                "DELETE FROM analysis WHERE path = ?", (os.path.abspath(old_path),)
+            )
+            self._conn.commit()
+
+    def purge_missing(self):
+        """
+        Remove entries whose files no longer exist.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute("SELECT path FROM analysis")]
+
+        missing = [(p,) for p in paths if not os.path.exists(p)]
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM analysis WHERE path = ?", missing)
+            self._conn.commit()
+
+        return len(missing)
+
+    def rekey(self, profiles=None):
+        """
+        Re-detect the key of every cached track without decoding anything.
+
+        Each analysis keeps the track's averaged chroma (its 12 note
+        energies), so when the key profiles or the confidence threshold
+        change, the whole library is re-scored in one vectorized call
+        (see key_estimation.classify_keys) instead of re-analyzed.
+
+        Entries without a chroma (keys read from tags, for example) are
+        left alone. A stored 'ranking' or 'correlation' is re-scored
+        along with the key.
+
+        Args:
+            profiles: Custom (24, 12) profile matrix (None = Krumhansl)
+
+        Returns:
+            Number of entries re-keyed
+
+        Example:
+            >>> AnalysisCache.for_library("/music").rekey()
+            40213
+        """
+        import numpy as np
+        from .key_estimation import classify_keys, estimate_keys
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, extra FROM analysis "
+                "WHERE analyzer_version = ? AND extra LIKE '%\"chroma\"%'",
+                (ANALYZER_VERSION,)
+            ).fetchall()
+
+        paths, chromas, extras = [], [], []
+        for path, extra in rows:
+            extra = json.loads(extra)
+            chroma = extra.get("chroma")
+            if chroma and len(chroma) == 12:
+                paths.append(path)
+                chromas.append(chroma)
+                extras.append(extra)
+
+        if not paths:
+            return 0
+
+        chromas = np.array(chromas, dtype=np.float64)
+        columns = classify_keys(chromas, profiles)
+
+        # Entries that also keep the candidate ranking get it re-scored
+        # too - otherwise it would still name the old winner
+        stale = [n for n, extra in enumerate(extras)
+                 if "ranking" in extra or "correlation" in extra]
+        updated_extras = []
+        if stale:
+            estimates = estimate_keys(chromas[stale], profiles)
+            for n, estimate in zip(stale, estimates):
+                extra = extras[n]
+                for field in ("ranking", "correlation"):
+                    if field in extra:
+                        extra[field] = estimate[field]
+                updated_extras.append((json.dumps(extra), paths[n]))
+
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE analysis SET key = ?, camelot = ?, confidence = ? "
+                "WHERE path = ?",
+                zip(columns["key"], columns["camelot"],
+                    columns["confidence"].tolist(), paths)
+            )
+            self._conn.executemany(
+                "UPDATE analysis SET extra = ? WHERE path = ?", updated_extras
+            )
+            self._conn.commit()
+
+        return len(paths)
+
+    def _evict_if_needed(self):
+        """Drop least recently used entries above max_entries."""
+        if not self.max_entries:
+            return
+
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM analysis WHERE path IN ("
+                    "SELECT path FROM analysis ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+
+    def close(self):
+        """Close the database connection (pending last-used times are written)."""
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            self._conn.close()
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """
+    Shared cache used by the organizer and the GUI.
+
+    Returns:
+        AnalysisCache instance, or None if the cache file can't be opened
+        (read-only home, etc.) - callers then simply analyze everything
+    """
+    global _default_cache
+
+    if _default_cache is None:
+        try:
+            _default_cache = AnalysisCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️  Cache de análise indisponível: {e}")
+            return None
+
+    return _default_cache
+
+
+def analyze_track_cached(file_path, cache=None):
+    """
+    analyze_track() with a persistent cache in front of it.
+
+    Args:
+        file_path: Path to the audio file
+        cache: AnalysisCache to use (None = get_default_cache())
+
+    Returns:
+        Analysis dictionary (same shape as analyze_track)
+
+    Example:
+        >>> info = analyze_track_cached("my_song.mp3")
+    """
+    if cache is None:
+        cache = get_default_cache()
+
+    if cache is not None:
+        cached = cache.get(file_path)
+        if cached is not None:
+            return cached
+
+    analysis = analyze_track(file_path)
+
+    if cache is not None:
+        cache.put(file_path, analysis)
+
+    return analysis
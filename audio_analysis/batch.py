@@ -0,0 +1,337 @@
+"""
+Batch Analysis - Analyzing a Whole Library on Every Core
+
+Decoding and chroma/tempo extraction are CPU-bound, so analyzing one
+file after another in a single process leaves most cores idle. This
+module spreads the work over a pool of processes.
+
+How it works:
+1. Cached results (see analysis_cache.py) are returned right away,
+   and so are key/BPM tags when the caller trusts them (tag_reader.py)
+2. Everything else is sent to a process pool, a few files at a time
+   (the number of files "in flight" is capped to bound memory)
+3. Results are yielded as soon as each file finishes
+4. A file that fails only produces an error result - the rest of the
+   batch keeps going
+
+Example:
+    >>> for info in analyze_tracks(files, workers=8):
+    ...     print(info['file_path'], info['camelot'])
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    # Limits BLAS/OpenMP threads of libraries that are already loaded
+    # (comes with librosa, through scikit-learn)
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+
+# Thread count variables read by OpenMP / OpenBLAS / MKL
+_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def _new_pool(workers):
+    """
+    Start a process pool whose workers are single-threaded.
+
+    We already run one process per core; letting numpy/BLAS spawn its
+    own threads inside every worker would oversubscribe the CPU.
+
+    BLAS reads the thread variables once, when it is loaded - so they
+    are set here, before any worker exists (a value the user already
+    set is kept). Forked workers inherit a BLAS the parent may have
+    loaded already, which no variable can change any more:
+    _init_worker() limits that one at runtime through threadpoolctl.
+    """
+    for var in _THREAD_VARS:
+        os.environ.setdefault(var, "1")
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def _init_worker():
+    """Runs once in every worker: cap already-loaded BLAS pools at 1 thread."""
+    global _thread_limits
+    if THREADPOOLCTL_AVAILABLE:
+        # Kept referenced so the limit lasts as long as the worker
+        _thread_limits = threadpool_limits(limits=1)
+
+
+_thread_limits = None
+
+
+def _error_result(file_path, error):
+    """Analysis-shaped dictionary for a file that failed."""
+    return {
+        "file_path": file_path,
+        "key": f"Erro: {error}",
+        "camelot": "Unknown",
+        "bpm": None,
+        "duration": None,
+        "error": str(error)
+    }
+
+
+def _analyze_worker(file_path, decode_profile="quality", keep_features=False):
+    """Runs inside a worker process - never lets an exception escape."""
+    from .key_detection import analyze_track
+
+    try:
+        if decode_profile == "preview":
+            # Provisional key/BPM from a few seconds of audio (preview.py)
+            from .preview import preview_track
+            return preview_track(file_path)
+        return analyze_track(file_path, profile=decode_profile,
+                             keep_features=keep_features)
+    except Exception as e:
+        return _error_result(file_path, e)
+
+
+def default_workers():
+    """Number of worker processes to use when none is specified."""
+    return os.cpu_count() or 1
+
+
+class WorkerPool:
+    """
+    A process pool that outlives a single analyze_tracks() call.
+
+    Starting a pool costs a fork (or spawn) and an import of librosa in
+    every worker, so a long-running caller that analyzes small batches
+    - like the library watcher - keeps one and passes it to every call.
+    The pool is started on first use and replaced if a worker crash
+    breaks it.
+
+    Args:
+        workers: Number of worker processes (None = one per CPU core)
+
+    Example:
+        >>> pool = WorkerPool(8)
+        >>> for batch in batches:
+        ...     results = list(analyze_tracks(batch, pool=pool))
+        >>> pool.shutdown()
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or default_workers()
+        self._executor = None
+
+    @property
+    def executor(self):
+        """The ProcessPoolExecutor, started if needed."""
+        if self._executor is None:
+            self._executor = _new_pool(self.workers)
+        return self._executor
+
+    def restart(self, broken=None):
+        """
+        Throw away a broken pool; the next use starts a fresh one.
+
+        Args:
+            broken: Only restart if the current executor is still this
+                    one (None = restart unconditionally)
+        """
+        if broken is None or self._executor is broken:
+            self.shutdown()
+
+    def shutdown(self):
+        """Stop the worker processes (pending work is cancelled)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def analyze_tracks(paths, workers=None, max_in_flight=None,
+                   use_cache=True, cache=None, use_tags=False,
+                   decode_profile="quality", feature_store=None, pool=None):
+    """
+    Analyze many tracks in parallel, yielding results as they finish.
+
+    Results come back in completion order, not input order - every
+    result carries its 'file_path'.
+
+    Args:
+        paths: Iterable of audio file paths
+        workers: Number of worker processes (None = one per CPU core,
+                 1 = analyze in this process, no pool)
+        max_in_flight: Max files submitted but not finished yet
+                       (None = 2 per worker)
+        use_cache: Return cached results for unchanged files and store
+                   new ones
+        cache: AnalysisCache to use (None = the shared default cache)
+        use_tags: Trust key/BPM tags written by DJ software - tracks with
+                  both tags are never decoded (results have
+                  'source': 'tags' and are not stored in the cache)
+        decode_profile: "quality" or "fast" (see key_detection.DECODE_PROFILES),
+                        or "preview" for a quick provisional result
+                        (see preview.py). Cached results are only
+                        reused by a run with the same profile - or
+                        any run, if they are "quality".
+        feature_store: FeatureStore that receives the compact feature
+                       record of every analyzed track (see
+                       feature_store.py) - cached tracks it doesn't
+                       have yet are analyzed again. Saved at the end.
+        pool: WorkerPool to run on, kept running afterwards (None =
+              start one for this call and shut it down at the end).
+              Its own worker count replaces `workers`.
+
+    Yields:
+        Analysis dictionaries (same shape as analyze_track)
+
+    Example:
+        >>> results = list(analyze_tracks(find_audio_files("/music"), workers=16))
+    """
+    if use_cache and cache is None:
+        from .analysis_cache import get_default_cache
+        cache = get_default_cache()
+    elif not use_cache:
+        cache = None
+
+    workers = pool.workers if pool is not None else workers or default_workers()
+    max_in_flight = max_in_flight or workers * 2
+    keep_features = feature_store is not None
+
+    def lookup(file_path):
+        # Cache hits (and trusted tags) never reach the pool
+        if cache is not None and (not keep_features or file_path in feature_store):
+            cached = cache.get(file_path)
+            if cached is not None and (
+                cached.get("decode_profile", "quality") in ("quality", decode_profile)
+            ):
+                return cached
+
+        if use_tags:
+            from .tag_reader import read_tag_analysis
+            tagged = read_tag_analysis(file_path)
+            if tagged is not None and tagged['bpm'] is not None:
+                return tagged
+
+        return None
+
+    def finish(file_path, analysis):
+        # numpy arrays - they go to the feature store, not the cache
+        features = analysis.pop("features", None)
+        if features is not None and keep_features:
+            feature_store.add(file_path, features)
+        if cache is not None:
+            cache.put(file_path, analysis)
+        return analysis
+
+    # Single worker: no pool, no pickling - handy for debugging
+    if pool is None and workers <= 1:
+        try:
+            for file_path in paths:
+                cached = lookup(file_path)
+                if cached is not None:
+                    yield cached
+                else:
+                    yield finish(file_path, _analyze_worker(file_path, decode_profile,
+                                                            keep_features))
+        finally:
+            if keep_features:
+                feature_store.save()
+            if cache is not None:
+                cache.flush()
+        return
+
+    own_pool = pool is None
+    if own_pool:
+        pool = WorkerPool(workers)
+    in_flight = {}
+
+    def submit(file_path):
+        in_flight[pool.executor.submit(_analyze_worker, file_path, decode_profile,
+                                       keep_features)] = file_path
+
+    def collect():
+        # Wait for at least one file; yields finished analyses
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        if not any(isinstance(f.exception(), BrokenProcessPool) for f in done):
+            for future in done:
+                file_path = in_flight.pop(future)
+                try:
+                    yield finish(file_path, future.result())
+                except Exception as e:
+                    yield finish(file_path, _error_result(file_path, e))
+            return
+
+        # A worker died hard (segfault in a decoder, OOM kill) and took
+        # the pool down: every file still in flight failed with it, but
+        # only one of them is to blame. Keep what did finish, start a
+        # fresh pool for the rest of the batch and retry the others one
+        # by one to find the culprit.
+        wait(list(in_flight))
+        suspects = []
+        for future, file_path in list(in_flight.items()):
+            if isinstance(future.exception(), BrokenProcessPool):
+                suspects.append(file_path)
+            elif future.exception() is not None:
+                yield finish(file_path, _error_result(file_path, future.exception()))
+            else:
+                yield finish(file_path, future.result())
+        in_flight.clear()
+        pool.restart()
+
+        for file_path in suspects:
+            yield finish(file_path, _analyze_isolated(file_path, decode_profile,
+                                                      keep_features))
+
+    try:
+        for file_path in paths:
+            cached = lookup(file_path)
+            if cached is not None:
+                yield cached
+                continue
+
+            # Bound memory: wait for a slot before submitting more work
+            while len(in_flight) >= max_in_flight:
+                yield from collect()
+
+            try:
+                submit(file_path)
+            except BrokenProcessPool:
+                # The pool broke between two results - recover the files
+                # in flight first (that restarts the pool), then submit
+                broken = pool.executor
+                while in_flight:
+                    yield from collect()
+                pool.restart(broken)
+                submit(file_path)
+
+        while in_flight:
+            yield from collect()
+
+    finally:
+        # Also runs when the caller stops early (break out of the loop)
+        if own_pool:
+            pool.shutdown()
+        else:
+            for future in in_flight:
+                future.cancel()
+        if keep_features:
+            feature_store.save()
+        if cache is not None:
+            cache.flush()
+
+
+def _analyze_isolated(file_path, decode_profile, keep_features):
+    """
+    Analyze one file in a pool of its own.
+
+    Used for the files that were in flight when a worker crashed: the
+    one that crashes again is the culprit and gets an error result;
+    the others just get analyzed.
+    """
+    solo = _new_pool(1)
+    try:
+        return solo.submit(_analyze_worker, file_path, decode_profile,
+                           keep_features).result()
+    except BrokenProcessPool as e:
+        return _error_result(file_path, f"o processo de análise travou: {e}")
+    finally:
+        solo.shutdown(wait=False, cancel_futures=True)
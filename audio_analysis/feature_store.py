@@ -0,0 +1,173 @@
+"""
+Feature Store - Keeping More Than "8A, 128 BPM"
+
+A key name and a BPM are all the organizer needs, but they are the end
+of the line: a better key detector, a new tempo algorithm or a "find
+tracks that sound like this one" feature would have to decode the whole
+library again.
+
+The feature store keeps a compact summary of every analyzed track
+(see key_detection.extract_features): chroma mean/variance, a short
+chroma time series, a tempogram summary and the loudness - a few KB
+per track.
+
+It is stored column by column in one NumPy .npz file: every field is a
+single array with one row per track, so library-wide computations are
+plain array operations.
+
+Example:
+    >>> store = FeatureStore.for_library("/music")
+    >>> for info in analyze_tracks(files, feature_store=store):
+    ...     pass
+    >>> columns = store.columns()
+    >>> classify_keys(columns["chroma_mean"])   # re-key 40k tracks, no audio
+"""
+
+import os
+from pathlib import Path
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Nome do arquivo quando ele fica na raiz da biblioteca
+FEATURE_STORE_FILENAME = ".dj_features.npz"
+
+# The feature fields (see key_detection.extract_features), plus the
+# columns that identify the version of each file
+FEATURE_FIELDS = ("chroma_mean", "chroma_var", "chroma_series", "tempogram", "loudness")
+IDENTITY_FIELDS = ("path", "size", "mtime")
+
+
+class FeatureStore:
+    """
+    Columnar store of per-track feature records.
+
+    New records are kept in memory until save(); saving rewrites the
+    .npz file (to a temporary file, then renamed into place).
+
+    Args:
+        store_path: The .npz file
+    """
+
+    def __init__(self, store_path):
+        self.store_path = Path(store_path)
+        self._columns = None   # field -> array, one row per track
+        self._rows = {}        # path -> row in self._columns
+        self._pending = {}     # path -> (size, mtime, features) not saved yet
+        self._load()
+
+    @classmethod
+    def for_library(cls, directory):
+        """Store kept in the root of a library folder."""
+        return cls(Path(directory) / FEATURE_STORE_FILENAME)
+
+    def _load(self):
+        if not self.store_path.exists():
+            return
+
+        try:
+            with np.load(self.store_path, allow_pickle=False) as data:
+                columns = {name: data[name] for name in data.files}
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Features corrompidas, recriando: {e}")
+            return
+
+        if not all(name in columns for name in IDENTITY_FIELDS + FEATURE_FIELDS):
+            # Written by a different version - start over
+            return
+
+        self._columns = columns
+        self._rows = {str(path): row for row, path in enumerate(columns["path"])}
+
+    def __len__(self):
+        return len(set(self._rows) | set(self._pending))
+
+    def __contains__(self, file_path):
+        """True if the store has features for this version of the file."""
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        if path in self._pending:
+            size, mtime, _ = self._pending[path]
+        elif path in self._rows:
+            row = self._rows[path]
+            size = self._columns["size"][row]
+            mtime = self._columns["mtime"][row]
+        else:
+            return False
+
+        return size == stat.st_size and mtime == stat.st_mtime
+
+    def add(self, file_path, features):
+        """
+        Add (or replace) the features of one track.
+
+        Args:
+            file_path: Audio file the features come from
+            features: Dictionary from key_detection.extract_features()
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+
+        self._pending[path] = (stat.st_size, stat.st_mtime, features)
+
+    def columns(self):
+        """
+        Every stored record, one array per field.
+
+        Returns:
+            Dictionary with 'path', 'size', 'mtime' and every feature
+            field ('chroma_mean' is (N, 12), 'chroma_series' is
+            (N, frames, 12), ...) - rows line up across fields
+        """
+        if not self._pending:
+            if self._columns is None:
+                return {}
+            return dict(self._columns)
+
+        # Saved rows that weren't replaced, then the new ones
+        keep = [row for path, row in self._rows.items() if path not in self._pending]
+        pending = list(self._pending.items())
+
+        columns = {
+            "path": np.array([str(self._columns["path"][row]) for row in keep]
+                             + [path for path, _ in pending]),
+            "size": np.array([self._columns["size"][row] for row in keep]
+                             + [size for _, (size, _, _) in pending], dtype=np.int64),
+            "mtime": np.array([self._columns["mtime"][row] for row in keep]
+                              + [mtime for _, (_, mtime, _) in pending], dtype=np.float64),
+        }
+        for field in FEATURE_FIELDS:
+            new = np.stack([features[field] for _, (_, _, features) in pending])
+            if keep:
+                new = np.concatenate([self._columns[field][keep], new])
+            columns[field] = new
+
+        return columns
+
+    def save(self):
+        """Write the store to disk (only if something was added)."""
+        if not self._pending:
+            return
+
+        columns = self.columns()
+
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.store_path.with_name(self.store_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, self.store_path)
+
+        self._columns = columns
+        self._rows = {str(path): row for row, path in enumerate(columns["path"])}
+        self._pending = {}
@@ -26,25 +26,7 @@ except ImportError:
     print("Tip: Install librosa for audio analysis with 'pip install librosa'")
 
 
-# Standard musical keys and their frequency characteristics
-# Each key has a unique "fingerprint" of which notes are emphasized
-KEY_PROFILES = {
-    # Major keys have a brighter, happier sound
-    # The numbers represent how much each note is emphasized (0-1 scale)
-    "C Major": {
-        "C": 1.0, "D": 0.6, "E": 0.8, "F": 0.7, 
-        "G": 0.9, "A": 0.5, "B": 0.6
-    },
-    "G Major": {
-        "G": 1.0, "A": 0.6, "B": 0.8, "C": 0.7,
-        "D": 0.9, "E": 0.5, "F#": 0.6
-    },
-    "D Minor": {
-        "D": 1.0, "E": 0.5, "F": 0.6, "G": 0.8,
-        "A": 0.7, "Bb": 0.5, "C": 0.6
-    },
-    # ... more keys would be defined here
-}
+# The key profiles themselves (all 24 keys) live in key_estimation.py
 
 # All notes in the chromatic scale (all 12 semitones)
 ALL_NOTES = [
@@ -52,6 +34,68 @@ ALL_NOTES = [
     "F#", "G", "G#", "A", "A#", "B"
 ]
 
+# How much audio we decode per track, and how much of it the key and
+# BPM detectors look at. The file is decoded ONCE (see load_audio) and
+# every detector works on a slice of that shared buffer.
+ANALYSIS_DURATION = 60  # segundos decodificados por faixa
+FEATURE_DURATION = 30   # segundos usados para tonalidade e BPM
+
+# Which parts of a track are decoded (see load_excerpt). Electronic
+# tracks often open with a beatless, atonal intro, so the first seconds
+# are the least informative part of the song.
+SEGMENT_STRATEGIES = {
+    # The first ANALYSIS_DURATION seconds
+    "intro": None,
+    # 3 windows of 10 s at 25%, 50% and 75% of the track
+    "spread": {"positions": (0.25, 0.50, 0.75), "length": 10},
+}
+DEFAULT_SEGMENT_STRATEGY = "spread"
+
+# Lowest sample rate the analysis works at. librosa.load decodes at
+# 22050 Hz with its best (and slowest) resampler, which is more than
+# the detectors use:
+# - chroma: chroma_cqt stops at B7 (3951 Hz, 7 octaves above C1), so a
+#   Nyquist of 5.5 kHz keeps every bin
+# - tempo: only the onset envelope matters, and kick/hi-hat attacks are
+#   still sharp at this rate. Going lower just for tempo would need a
+#   second resample of the shared buffer, which costs more than it saves.
+FAST_SAMPLE_RATE = 11025
+
+# How the shared buffer is decoded (see load_audio). Key and BPM share
+# one decode at one rate.
+#
+# Trade-off of "fast" vs. "quality" (the librosa defaults), measured with
+# benchmark.py (12 fixtures x 30 s, "spread" strategy):
+# - speed, 44.1 kHz fixtures (like real files): analyze ~1.6x the
+#   files/s of "quality" - the expensive step is resampling 44.1 kHz
+#   audio, and soxr_lq/kaiser_fast do it far cheaper than soxr_hq
+# - speed, 22.05 kHz fixtures: analyze ~17% SLOWER - there is almost
+#   nothing to save by resampling, and it's an extra step, so "fast"
+#   only pays off for sources above 22.05 kHz
+# - key: every chroma bin is still below Nyquist; the cheap resampler
+#   lets a little aliasing through near 5 kHz, above the notes that
+#   matter. Check the key/BPM accuracy lines of the benchmark against a
+#   "quality" run before relying on it.
+# - tempo: rhythm.onset_hop_length scales with the sample rate, so the
+#   onset envelope keeps the same ~23 ms frames and BPM resolution
+# Measure it on your machine with:
+#     python benchmark.py --output quality.json
+#     python benchmark.py --profile fast --compare quality.json
+DECODE_PROFILES = {
+    "quality": {"sr": 22050, "res_type": None},
+    "fast": {"sr": FAST_SAMPLE_RATE, "res_type": "fast"},
+}
+DEFAULT_DECODE_PROFILE = "quality"
+
+# Bump this whenever the detection algorithm changes so cached results
+# (see audio_analysis/analysis_cache.py) get recomputed.
+ANALYZER_VERSION = "7"
+
+# Compact feature record kept per track when asked to (see
+# extract_features and feature_store.py) - a few KB per track
+CHROMA_SERIES_FRAMES = 32   # chroma over time, averaged into this many blocks
+TEMPOGRAM_BINS = 192        # autocorrelation lags kept (~4.5 s of onset frames)
+
 
 def _note_to_frequency(note_name):
     """
@@ -152,20 +196,190 @@ def _frequency_to_note(frequency):
     return f"{ALL_NOTES[note_index]}{octave}"
 
 
-def detect_key_from_audio(file_path):
+def _fast_resampler():
+    """Cheapest decent resampler of the installed librosa."""
+    major, minor = (int(part) for part in librosa.__version__.split(".")[:2])
+    # librosa 0.10 moved from resampy to soxr
+    return "soxr_lq" if (major, minor) >= (0, 10) else "kaiser_fast"
+
+
+def _decode_options(profile):
+    """librosa.load() keyword arguments for a DECODE_PROFILES entry."""
+    settings = DECODE_PROFILES[profile]
+    options = {"sr": settings["sr"]}
+    if settings["res_type"] == "fast":
+        options["res_type"] = _fast_resampler()
+    return options
+
+
+def load_audio(file_path, duration=ANALYSIS_DURATION, profile=DEFAULT_DECODE_PROFILE):
+    """
+    Decode an audio file once into a shared buffer.
+    
+    Decoding (and resampling) is by far the most expensive step of the
+    analysis, so do it here once and hand the samples to every detector
+    instead of letting each one reload the file from disk.
+    
+    Args:
+        file_path: Path to the audio file (mp3, wav, etc.)
+        duration: How many seconds to decode (None = whole file)
+        profile: "quality" (librosa defaults) or "fast" (lower sample
+                 rate, cheaper resampler - see DECODE_PROFILES)
+    
+    Returns:
+        Tuple (y, sr) with the mono waveform and its sample rate,
+        or (None, None) if librosa is not installed
+    
+    Example:
+        >>> y, sr = load_audio("my_song.mp3")
+        >>> detect_bpm(y=y, sr=sr)
+        128
+    """
+    if not LIBROSA_AVAILABLE:
+        return None, None
+    
+    return librosa.load(file_path, duration=duration, **_decode_options(profile))
+
+
+def track_duration(file_path):
+    """
+    Length of an audio file in seconds, read from its header (no decoding).
+    
+    Args:
+        file_path: Path to the audio file
+    
+    Returns:
+        Duration in seconds
+    """
+    try:
+        return librosa.get_duration(path=file_path)
+    except TypeError:
+        # librosa < 0.10
+        return librosa.get_duration(filename=file_path)
+
+
+def load_excerpt(file_path, strategy=DEFAULT_SEGMENT_STRATEGY,
+                 profile=DEFAULT_DECODE_PROFILE, pcm_cache=None):
+    """
+    Decode only the representative parts of a track.
+    
+    With the "spread" strategy we seek straight to a few short windows
+    across the song (by default 3 x 10 s at 25/50/75%) and decode only
+    those - a third of the audio load_audio() would decode, and none of
+    it from the intro. The windows are joined into one buffer, which
+    every detector then shares, like the one from load_audio().
+    
+    Seeking is real for formats libsndfile reads (WAV, FLAC, OGG, and
+    MP3 with libsndfile >= 1.1); through the audioread fallback the
+    skipped audio is still decoded, just not resampled or analyzed.
+    
+    Args:
+        file_path: Path to the audio file
+        strategy: Name from SEGMENT_STRATEGIES, or a dictionary like
+                  {"positions": (0.3, 0.6), "length": 15}
+        profile: Decode profile (see DECODE_PROFILES)
+        pcm_cache: PcmCache holding already-decoded excerpts (see
+                   pcm_cache.py) - a hit skips decoding entirely
+    
+    Returns:
+        Tuple (y, sr, duration): the excerpt, its sample rate and the
+        length of the WHOLE track in seconds
+    
+    Example:
+        >>> y, sr, duration = load_excerpt("my_song.mp3")
+        >>> info = analyze_audio(y, sr, "my_song.mp3", duration=duration)
+    """
+    duration = track_duration(file_path)
+    
+    if pcm_cache is not None:
+        y = pcm_cache.load(file_path, strategy, profile)
+        if y is not None:
+            return y, DECODE_PROFILES[profile]["sr"], duration
+    
+    y, sr = _decode_excerpt(file_path, strategy, profile, duration)
+    
+    if pcm_cache is not None:
+        pcm_cache.store(file_path, strategy, profile, y)
+    
+    return y, sr, duration
+
+
+def _decode_excerpt(file_path, strategy, profile, duration):
+    """The decoding half of load_excerpt()."""
+    import numpy as np
+    
+    if isinstance(strategy, str):
+        strategy = SEGMENT_STRATEGIES[strategy]
+    
+    # Short tracks (and the "intro" strategy): decode from the start
+    if excerpt_windows(strategy, duration) is None:
+        return load_audio(file_path, profile=profile)
+    
+    options = _decode_options(profile)
+    windows = []
+    for offset, length in excerpt_windows(strategy, duration):
+        y, sr = librosa.load(file_path, offset=offset, duration=length, **options)
+        windows.append(y)
+    
+    return np.concatenate(windows), sr
+
+
+def excerpt_windows(strategy, duration):
+    """
+    Where the windows of an excerpt come from in the track.
+    
+    Args:
+        strategy: Segment strategy (name or dictionary, see load_excerpt)
+        duration: Length of the whole track in seconds
+    
+    Returns:
+        List of (offset, length) in seconds, or None when the excerpt
+        is simply the start of the track ("intro", short tracks)
+    """
+    if isinstance(strategy, str):
+        strategy = SEGMENT_STRATEGIES[strategy]
+    
+    if strategy is None or duration < ANALYSIS_DURATION:
+        return None
+    
+    length = strategy["length"]
+    # Center each window on its position, inside the track
+    return [
+        (min(max(0.0, position * duration - length / 2), duration - length), length)
+        for position in strategy["positions"]
+    ]
+
+
+def _feature_slice(y, sr):
+    """Return the first FEATURE_DURATION seconds of a decoded buffer."""
+    return y[:int(FEATURE_DURATION * sr)]
+
+
+def detect_key_from_audio(file_path=None, y=None, sr=None, chroma=None):
     """
     Detect the musical key of an audio file.
     
     Usa análise chroma (12 notas musicais) para detectar a tonalidade.
+    If the audio was already decoded (see load_audio), pass the samples
+    with y/sr and the file is not touched again.
     
     Args:
         file_path: Path to the audio file (mp3, wav, etc.)
+        y: Pre-loaded audio time series (optional)
+        sr: Sample rate of y (required when y is given)
+        chroma: Chroma matrix already computed from the audio
+                (optional, skips the chroma extraction)
     
     Returns:
         A dictionary with:
         - 'key': The detected key name (e.g., "C Major")
         - 'camelot': The Camelot notation (e.g., "8B")
-        - 'confidence': How sure we are about this detection (0-1)
+        - 'confidence': How sure we are about this detection (0-1) -
+          how far the winning key is ahead of the runner-up
+        - 'ranking': The best candidate keys with their scores
+          (see key_estimation.estimate_key)
+        - 'chroma': The 12 averaged note energies the key came from
+        - 'error': Why detection failed (only present on failure)
     """
     if not LIBROSA_AVAILABLE:
         return {
@@ -175,82 +389,54 @@ def detect_key_from_audio(file_path):
         }
     
     try:
-        # Carregar áudio
-        y, sr = librosa.load(file_path, duration=30)
-        
-        # Calcular chroma (energia de cada nota: C, C#, D, D#, E, F, etc)
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
+        if chroma is None:
+            # Carregar áudio (só se ninguém nos passou as amostras)
+            if y is None:
+                y, sr = librosa.load(file_path, duration=FEATURE_DURATION)
+            else:
+                y = _feature_slice(y, sr)
+            
+            # Calcular chroma (energia de cada nota: C, C#, D, D#, E, F, etc)
+            chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
         
         # Média da energia em cada nota ao longo do tempo
         chroma_mean = chroma.mean(axis=1)
         
-        # Encontrar a nota com mais energia (root note)
-        root_index = chroma_mean.argmax()
-        confidence = chroma_mean[root_index]
-        
-        # Mapeamento de índice para nota
-        note_names = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-        root_note = note_names[root_index]
-        
-        # Detectar se é major ou minor
-        is_major = _guess_scale_type(chroma_mean)
-        key_name = f"{root_note} {'Major' if is_major else 'Minor'}"
-        
-        # Converter para notação Camelot
-        from utils.camelot_map import get_camelot_key
-        camelot = get_camelot_key(key_name)
+        # Comparar com os perfis das 24 tonalidades (Krumhansl-Schmuckler)
+        from .key_estimation import estimate_key
+        key_info = estimate_key(chroma_mean)
         
-        return {
-            "key": key_name,
-            "camelot": camelot,
-            "confidence": min(confidence, 1.0)
-        }
+        # Guardar o chroma: com ele dá para recalcular a tonalidade
+        # sem decodificar de novo (see AnalysisCache.rekey)
+        key_info["chroma"] = [round(float(v), 4) for v in chroma_mean]
+        return key_info
     
     except Exception as e:
         print(f"Erro ao detectar tonalidade: {e}")
         return {
             "key": f"Erro ao detectar: {str(e)}",
             "camelot": "Unknown",
-            "confidence": 0.0
+            "confidence": 0.0,
+            "error": str(e)
         }
 
 
-def _guess_scale_type(chroma_vector):
-    """
-    Guess whether a track is in a major or minor scale.
-    
-    Analisa o padrão de notas para determinar major/minor.
-    Em escalas maiores, a 3ª e 5ª notas têm mais energia.
-    Em escalas menores, a 3ª (menor) tem menos energia.
-    """
-    try:
-        # padrão major: notas 0(root), 4(3ª maior), 7(5ª) têm mais energia
-        # padrão minor: notas 0(root), 3(3ª menor), 7(5ª) têm mais energia
-        
-        if len(chroma_vector) < 8:
-            return True  # padrão: major
-        
-        # Normalizar
-        chroma_norm = chroma_vector / (chroma_vector.max() + 1e-10)
-        
-        # Score para major: 3ª maior (índice 4) tem mais energia que 3ª menor (índice 3)
-        major_score = chroma_norm[4] - chroma_norm[3]
-        
-        return major_score > 0
-    
-    except:
-        return True  # padrão: major
-
-
-def detect_bpm(file_path):
+def detect_bpm(file_path=None, y=None, sr=None, onset_env=None):
     """
     Detect the BPM (beats per minute) of an audio file.
     
     BPM tells you how fast the tempo is - important for DJs
     to match tempos when mixing songs!
     
+    This is the short version of rhythm.analyze_rhythm(), which also
+    gives the fractional BPM, the beatgrid and the downbeat.
+    
     Args:
         file_path: Path to the audio file
+        y: Pre-loaded audio time series (optional, skips loading)
+        sr: Sample rate of y (required when y is given)
+        onset_env: Onset envelope already computed from the audio
+                   (optional, see rhythm.onset_envelope)
     
     Returns:
         BPM value as a number, or None if detection failed
@@ -258,47 +444,191 @@ def detect_bpm(file_path):
     Example:
         >>> detect_bpm("house_track.mp3")
         128
+        >>> detect_bpm(y=y, sr=sr)  # audio already decoded
+        128
     """
     if not LIBROSA_AVAILABLE:
         return None
     
     try:
-        import warnings
-        # Load the audio
-        y, sr = librosa.load(file_path, duration=30)
+        from .rhythm import onset_envelope, analyze_rhythm
         
-        # Use librosa's beat tracking (com compatibilidade com versões)
-        try:
-            # Versão nova (librosa >= 0.10)
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                tempo = librosa.feature.rhythm.tempo(y=y, sr=sr)
-                if hasattr(tempo, '__iter__'):
-                    tempo = tempo[0] if len(tempo) > 0 else 0
-        except (AttributeError, TypeError):
-            # Versão antiga (librosa < 0.10)
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                tempo = librosa.beat.tempo(y=y, sr=sr)
-                if hasattr(tempo, '__iter__'):
-                    tempo = tempo[0] if len(tempo) > 0 else 0
+        if onset_env is None:
+            # Load the audio (only if the caller didn't hand it to us)
+            if y is None:
+                y, sr = librosa.load(file_path, duration=FEATURE_DURATION)
+            else:
+                y = _feature_slice(y, sr)
+            onset_env = onset_envelope(y, sr)
         
-        return round(tempo) if tempo > 0 else None
+        rhythm = analyze_rhythm(onset_env, sr)
+        return round(rhythm["bpm_exact"]) if rhythm else None
     
     except Exception as e:
         print(f"Erro ao detectar BPM: {e}")
         return None
 
 
-def analyze_track(file_path):
+def loudness_db(y):
+    """
+    RMS level of an audio buffer in dBFS (0 = full scale, silence
+    about -120) - the energy measure used to order DJ sets.
+    """
+    import numpy as np
+    
+    return float(10 * np.log10(np.mean(np.square(y)) + 1e-12))
+
+
+def extract_features(y, sr, chroma=None, onset_env=None):
+    """
+    Compact summary of a track's sound, for re-scoring without audio.
+    
+    The key and BPM detectors boil everything down to "8A" and 128.
+    This keeps a bit more - enough for a new key or BPM algorithm,
+    or a "sounds similar" feature, to run over the whole library
+    without decoding a single file (see feature_store.py).
+    
+    Args:
+        y: Audio time series (the part the detectors look at)
+        sr: Sample rate of y
+        chroma: Chroma matrix of y, if already computed
+        onset_env: Onset envelope of y, if already computed
+    
+    Returns:
+        Dictionary of numpy arrays:
+        - 'chroma_mean', 'chroma_var': (12,) note energies and how much
+          they move over time
+        - 'chroma_series': (CHROMA_SERIES_FRAMES, 12) chroma over time
+        - 'tempogram': (TEMPOGRAM_BINS,) average onset autocorrelation -
+          peaks at the beat period and its multiples
+        - 'loudness': RMS level of the excerpt in dBFS
+    """
+    import numpy as np
+    from .rhythm import onset_envelope, onset_hop_length
+    
+    if chroma is None:
+        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
+    if onset_env is None:
+        onset_env = onset_envelope(y, sr)
+    
+    # Blocos de tempo iguais (nunca vazios, mesmo em faixas curtas)
+    frames = chroma.shape[1]
+    edges = np.linspace(0, frames, CHROMA_SERIES_FRAMES + 1).astype(int)
+    series = np.stack([
+        chroma[:, start:max(end, start + 1)].mean(axis=1)
+        for start, end in zip(edges[:-1], edges[1:])
+    ])
+    
+    tempogram = librosa.feature.tempogram(
+        onset_envelope=onset_env, sr=sr, hop_length=onset_hop_length(sr),
+        win_length=TEMPOGRAM_BINS
+    ).mean(axis=1)
+    
+    return {
+        "chroma_mean": chroma.mean(axis=1).astype(np.float32),
+        "chroma_var": chroma.var(axis=1).astype(np.float32),
+        "chroma_series": series.astype(np.float16),
+        "tempogram": (tempogram / (tempogram.max() + 1e-10)).astype(np.float16),
+        "loudness": np.float32(loudness_db(y)),
+    }
+
+
+def analyze_audio(y, sr, file_path=None, duration=None, keep_features=False,
+                  segments=None):
+    """
+    Analyze audio that is already decoded - key, BPM and duration.
+    
+    This is the single-decode core of analyze_track(): the same buffer
+    is shared by every detector, so nothing here touches the disk.
+    
+    Args:
+        y: Audio time series (from load_audio or load_excerpt)
+        sr: Sample rate of y
+        file_path: Original file, only used to label the result
+        duration: Length of the whole track, when y is only an excerpt
+                  (None = the length of y)
+        keep_features: Also return the compact feature record under
+                       'features' (see extract_features)
+        segments: Where the windows of y come from in the track (see
+                  excerpt_windows) - places the beatgrid correctly
+    
+    Returns:
+        Same dictionary shape as analyze_track()
+    
+    Example:
+        >>> y, sr = load_audio("my_song.mp3")
+        >>> info = analyze_audio(y, sr, "my_song.mp3")
+    """
+    if duration is None:
+        duration = librosa.get_duration(y=y, sr=sr)
+    
+    print(f"🎵 Analisando: {file_path}")
+    print(f"   ⏱️  Duração: {duration:.2f}s")
+    
+    # Chroma once - for the key and, if asked, the feature record
+    y_features = _feature_slice(y, sr)
+    chroma = librosa.feature.chroma_cqt(y=y_features, sr=sr)
+    
+    # Get key and BPM (both reuse the buffer we already have)
+    print(f"   🔍 Detectando tonalidade...")
+    key_info = detect_key_from_audio(y=y, sr=sr, chroma=chroma)
+    
+    # Onset envelope once - BPM, beatgrid and tempogram all come from it
+    print(f"   ⏱️  Detectando BPM...")
+    from .rhythm import onset_envelope, analyze_rhythm
+    onset_env = onset_envelope(y_features, sr)
+    rhythm = analyze_rhythm(onset_env, sr, segments)
+    
+    result = {
+        "file_path": file_path,
+        "key": key_info['key'],
+        "camelot": key_info['camelot'],
+        "bpm": round(rhythm['bpm_exact']) if rhythm else None,
+        "duration": round(duration, 2),
+        "confidence": key_info['confidence'],
+        "loudness": round(loudness_db(y), 1)
+    }
+    if "error" in key_info:
+        # Key detection failed - keep this result out of the caches
+        result["error"] = key_info["error"]
+    if "chroma" in key_info:
+        # Stored in the analysis cache, so keys can be re-scored later
+        result["chroma"] = key_info["chroma"]
+    if rhythm:
+        # Fractional BPM, beatgrid, downbeat, stability (see rhythm.py)
+        result.update(rhythm)
+    if keep_features:
+        result["features"] = extract_features(y_features, sr, chroma, onset_env)
+    
+    print(f"   ✅ Análise completa!")
+    print(f"      • Tonalidade: {result['key']}")
+    print(f"      • Camelot: {result['camelot']}")
+    print(f"      • BPM: {result['bpm']}")
+    
+    return result
+
+
+def analyze_track(file_path, strategy=DEFAULT_SEGMENT_STRATEGY,
+                  profile=DEFAULT_DECODE_PROFILE, pcm_cache=None,
+                  keep_features=False):
     """
     Complete analysis of a track - key, BPM, and more.
     
     This gives you all the important musical information about
-    a song in one call.
+    a song in one call. Only a few representative windows of the
+    file are decoded (see load_excerpt), once, and the samples are
+    shared by every detector (see analyze_audio).
     
     Args:
         file_path: Path to the audio file
+        strategy: Which parts of the track to analyze - "spread"
+                  (default), "intro" or a custom dictionary
+                  (see SEGMENT_STRATEGIES)
+        profile: "quality" or "fast" decoding (see DECODE_PROFILES)
+        pcm_cache: PcmCache of decoded audio (None = the one set up by
+                   the DJ_PCM_CACHE_DIR environment variable, if any)
+        keep_features: Also return the compact feature record under
+                       'features' (numpy arrays - see extract_features)
     
     Returns:
         Dictionary with:
@@ -307,6 +637,11 @@ def analyze_track(file_path):
         - camelot: Camelot notation
         - bpm: Beats per minute
         - duration: How long the track is (seconds)
+        - bpm_exact, first_beat, downbeat, tempo_stability: The
+          beatgrid, when a steady beat was found (see rhythm.py)
+        - bpm_raw, bpm_candidates: The tempo before half/double-time
+          folding and its scored alternatives (see rhythm.fold_bpm)
+        - loudness: RMS level in dBFS - the track's energy
     
     Example:
         >>> info = analyze_track("my_song.mp3")
@@ -324,34 +659,19 @@ def analyze_track(file_path):
         }
     
     try:
-        # Load the full audio
-        y, sr = librosa.load(file_path, duration=60)  # Carregar até 60 segundos
-        duration = librosa.get_duration(y=y, sr=sr)
+        # Decode once - only the windows picked by the strategy
+        if pcm_cache is None:
+            from .pcm_cache import get_pcm_cache
+            pcm_cache = get_pcm_cache()
         
-        print(f"🎵 Analisando: {file_path}")
-        print(f"   ⏱️  Duração: {duration:.2f}s")
-        
-        # Get key and BPM
-        print(f"   🔍 Detectando tonalidade...")
-        key_info = detect_key_from_audio(file_path)
-        
-        print(f"   ⏱️  Detectando BPM...")
-        bpm = detect_bpm(file_path)
-        
-        result = {
-            "file_path": file_path,
-            "key": key_info['key'],
-            "camelot": key_info['camelot'],
-            "bpm": bpm,
-            "duration": round(duration, 2),
-            "confidence": key_info['confidence']
-        }
-        
-        print(f"   ✅ Análise completa!")
-        print(f"      • Tonalidade: {result['key']}")
-        print(f"      • Camelot: {result['camelot']}")
-        print(f"      • BPM: {result['bpm']}")
+        y, sr, duration = load_excerpt(file_path, strategy, profile, pcm_cache)
         
+        result = analyze_audio(y, sr, file_path, duration=duration,
+                               keep_features=keep_features,
+                               segments=excerpt_windows(strategy, duration))
+        if profile != "quality":
+            # Remembered in the cache, so a quality run redoes it
+            result["decode_profile"] = profile
         return result
     
     except Exception as e:
@@ -364,6 +684,6 @@ def analyze_track(file_path):
             "key": f"Erro: {str(e)}",
             "camelot": "Unknown",
             "bpm": None,
-            "duration": None
+            "duration": None,
+            "error": str(e)
         }
-
@@ -0,0 +1,212 @@
+"""
+Key Estimation - Matching a Chroma Vector Against All 24 Keys
+
+A chroma vector says how much energy each of the 12 notes (C, C#, D...)
+has in a track. To turn that into a key we use the Krumhansl-Schmuckler
+method:
+
+1. Take the "key profile" of C major and C minor - how strongly each
+   note belongs to the key, measured in listening experiments
+2. Rotate them to get the profiles of all 24 keys (D major is C major
+   shifted up two semitones, and so on)
+3. Correlate the track's chroma with every profile - the key whose
+   profile looks most like the chroma wins
+
+All 24 correlations come out of a single matrix multiply, and so do
+the correlations of a whole library at once: pass an (N, 12) array of
+chroma vectors and get (N, 24) scores back.
+
+Example:
+    >>> estimate_key(chroma_mean)
+    {'key': 'A Minor', 'camelot': '8A', 'confidence': 0.62, 'correlation': 0.91,
+     'ranking': [('A Minor', 0.91), ('C Major', 0.84), ('E Minor', 0.71)]}
+"""
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from utils.camelot_map import MAJOR_KEY_NAMES, MINOR_KEY_NAMES, get_camelot_key
+
+
+# Krumhansl & Kessler (1982) probe-tone profiles, starting on the tonic
+KRUMHANSL_MAJOR = (6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88)
+KRUMHANSL_MINOR = (6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17)
+
+# Row order of the score matrix: the 12 major keys, then the 12 minor ones
+KEY_NAMES = MAJOR_KEY_NAMES + MINOR_KEY_NAMES
+KEY_CAMELOT = [get_camelot_key(name) for name in KEY_NAMES]
+
+# A winner this far ahead of the runner-up (in correlation) counts as
+# fully confident; smaller margins scale down linearly
+CONFIDENT_MARGIN = 0.2
+
+# How many candidates estimate_key() lists in 'ranking'
+RANKING_SIZE = 3
+
+
+def key_profile_matrix(major=KRUMHANSL_MAJOR, minor=KRUMHANSL_MINOR):
+    """
+    The 24 key profiles, ready for correlation.
+
+    Every row is centered and scaled to unit length, so a dot product
+    with a centered, unit-length chroma vector IS the Pearson
+    correlation.
+
+    Args:
+        major: 12 weights of the major profile, starting on the tonic
+        minor: 12 weights of the minor profile, starting on the tonic
+
+    Returns:
+        (24, 12) array, rows in KEY_NAMES order
+    """
+    rows = [np.roll(major, tonic) for tonic in range(12)]
+    rows += [np.roll(minor, tonic) for tonic in range(12)]
+    return _normalize_rows(np.array(rows, dtype=np.float64))
+
+
+def _normalize_rows(matrix):
+    """Center each row and scale it to unit length (all-zero rows stay zero)."""
+    centered = matrix - matrix.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1, keepdims=True)
+    return np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+
+
+_default_profiles = None
+
+
+def score_keys(chroma, profiles=None):
+    """
+    Correlation of chroma vectors with every key profile.
+
+    Args:
+        chroma: One chroma vector (12,) or a stack of them (N, 12)
+        profiles: (24, 12) matrix from key_profile_matrix()
+                  (None = Krumhansl profiles)
+
+    Returns:
+        (24,) or (N, 24) array of correlations in [-1, 1], columns in
+        KEY_NAMES order (a silent track scores 0 everywhere)
+    """
+    global _default_profiles
+
+    if profiles is None:
+        if _default_profiles is None:
+            _default_profiles = key_profile_matrix()
+        profiles = _default_profiles
+
+    chroma = np.asarray(chroma, dtype=np.float64)
+    single = chroma.ndim == 1
+    scores = _normalize_rows(np.atleast_2d(chroma)) @ profiles.T
+    return scores[0] if single else scores
+
+
+def classify_keys(chroma, profiles=None):
+    """
+    Key, Camelot code and confidence of a whole library in one call.
+
+    The lean version of estimate_keys(): no per-track dictionaries or
+    rankings, just three parallel columns - fast enough to re-key tens
+    of thousands of tracks straight from the analysis cache whenever
+    the profiles or thresholds change (see AnalysisCache.rekey).
+
+    Args:
+        chroma: (N, 12) array of chroma vectors
+        profiles: Custom (24, 12) profile matrix (None = Krumhansl)
+
+    Returns:
+        Dictionary with:
+        - 'key': List of N key names ("Unknown" for silence)
+        - 'camelot': List of N Camelot codes
+        - 'confidence': (N,) array, same meaning as in estimate_key()
+
+    Example:
+        >>> classify_keys(np.stack([chroma_a, chroma_b]))
+        {'key': ['A Minor', 'G Major'], 'camelot': ['8A', '9B'],
+         'confidence': array([0.62, 0.4])}
+    """
+    scores = score_keys(np.atleast_2d(chroma), profiles)
+
+    best = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(scores)), best]
+    runner_up = np.partition(scores, -2, axis=1)[:, -2]
+    confidences = np.clip((best_scores - runner_up) / CONFIDENT_MARGIN, 0.0, 1.0)
+
+    # Silence, or nothing that looks like any key
+    unknown = best_scores <= 0
+    confidences[unknown] = 0.0
+
+    return {
+        "key": ["Unknown" if u else KEY_NAMES[i] for i, u in zip(best, unknown)],
+        "camelot": ["Unknown" if u else KEY_CAMELOT[i] for i, u in zip(best, unknown)],
+        "confidence": np.round(confidences, 3),
+    }
+
+
+def estimate_keys(chroma, profiles=None, ranking_size=RANKING_SIZE):
+    """
+    Best key of every chroma vector in a batch.
+
+    Args:
+        chroma: (N, 12) array of chroma vectors (e.g. chroma means)
+        profiles: Custom (24, 12) profile matrix (None = Krumhansl)
+        ranking_size: Candidates listed per track
+
+    Returns:
+        List of N dictionaries (see estimate_key)
+    """
+    scores = score_keys(np.atleast_2d(chroma), profiles)
+
+    # Best candidates first, for every row at once
+    order = np.argsort(-scores, axis=1)[:, :max(ranking_size, 2)]
+    best = np.take_along_axis(scores, order, axis=1)
+    margins = best[:, 0] - best[:, 1]
+    confidences = np.clip(margins / CONFIDENT_MARGIN, 0.0, 1.0)
+
+    results = []
+    for row, (indices, values) in enumerate(zip(order, best)):
+        if values[0] <= 0:
+            # Silence, or nothing that looks like any key
+            results.append({
+                "key": "Unknown",
+                "camelot": "Unknown",
+                "confidence": 0.0,
+                "correlation": float(values[0]),
+                "ranking": [],
+            })
+            continue
+
+        key_name = KEY_NAMES[indices[0]]
+        results.append({
+            "key": key_name,
+            "camelot": KEY_CAMELOT[indices[0]],
+            "confidence": round(float(confidences[row]), 3),
+            "correlation": round(float(values[0]), 3),
+            "ranking": [
+                (KEY_NAMES[i], round(float(v), 3))
+                for i, v in zip(indices[:ranking_size], values[:ranking_size])
+            ],
+        })
+    return results
+
+
+def estimate_key(chroma, profiles=None, ranking_size=RANKING_SIZE):
+    """
+    Best key for one chroma vector.
+
+    Args:
+        chroma: 12 values, one per note starting at C
+        profiles: Custom (24, 12) profile matrix (None = Krumhansl)
+        ranking_size: Candidates listed in 'ranking'
+
+    Returns:
+        Dictionary with:
+        - 'key': e.g. "A Minor" (or "Unknown" for silence)
+        - 'camelot': e.g. "8A"
+        - 'confidence': 0-1, from the margin over the runner-up key
+        - 'correlation': how well the winning profile matches (-1 to 1)
+        - 'ranking': [(key, correlation), ...] best first
+    """
+    return estimate_keys(np.asarray(chroma)[np.newaxis, :], profiles, ranking_size)[0]
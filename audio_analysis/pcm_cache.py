@@ -0,0 +1,225 @@
+"""
+PCM Cache - Decode Once, Experiment Forever
+
+The analysis cache (analysis_cache.py) remembers results, but as soon
+as the detection algorithm changes every track has to be decoded again
+- and decoding MP3/FLAC is the slowest part of the analysis.
+
+This optional cache keeps the decoded excerpt of each track (mono, at
+the analysis sample rate) as a plain .npy file. Reading it back is a
+memory map: no decoding, no copy, the OS pages the samples in as the
+detectors touch them. Re-analyzing a whole library after tweaking the
+key detector then costs only the feature extraction.
+
+The cache has a size budget: when it's full, the least recently used
+files are deleted (every hit refreshes the file's mtime).
+
+It's off by default. Turn it on for a session with an environment
+variable (worker processes inherit it):
+    DJ_PCM_CACHE_DIR=~/.cache/dj-harmonic-analyzer/pcm python benchmark.py
+
+Example:
+    >>> cache = PcmCache("/tmp/pcm", max_bytes=5 * 1024**3)
+    >>> info = analyze_track("song.mp3", pcm_cache=cache)   # decodes + stores
+    >>> info = analyze_track("song.mp3", pcm_cache=cache)   # memory-mapped
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Environment variable that turns the cache on (see get_pcm_cache)
+PCM_CACHE_ENV = "DJ_PCM_CACHE_DIR"
+
+# Default size budget: ~4000 tracks of 30 s float32 excerpts at 22050 Hz
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+# After an eviction the cache is trimmed to this fraction of the budget,
+# so we don't evict again on the very next store
+EVICTION_TARGET = 0.9
+
+
+class PcmCache:
+    """
+    Directory of decoded excerpts, memory-mapped on load.
+
+    Safe to use from several worker processes at once: every entry is
+    written to a temporary file and renamed into place.
+
+    Args:
+        directory: Where the .npy files go
+        max_bytes: Size budget (least recently used files are evicted)
+        dtype: "float32" (zero-copy loads) or "int16" (half the disk
+               space, but converted back to float32 on load - a copy)
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, dtype="float32"):
+        if dtype not in ("float32", "int16"):
+            raise ValueError(f"Unsupported dtype: {dtype}")
+
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Rough running total - the real sizes are rechecked when evicting
+        self._approx_bytes = self._total_bytes()
+
+    def _entry_path(self, file_path, strategy, profile):
+        """Cache file for this version of the track, or None if it's gone."""
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        identity = json.dumps(
+            [path, stat.st_size, stat.st_mtime, strategy, profile, self.dtype],
+            sort_keys=True
+        )
+        return self.directory / (hashlib.sha1(identity.encode()).hexdigest() + ".npy")
+
+    def load(self, file_path, strategy, profile):
+        """
+        Decoded excerpt of a track, if cached.
+
+        Args:
+            file_path: Audio file
+            strategy: Segment strategy it was decoded with
+            profile: Decode profile it was decoded with
+
+        Returns:
+            Read-only float32 array (memory-mapped for float32 caches),
+            or None on a miss
+        """
+        entry = self._entry_path(file_path, strategy, profile)
+        if entry is None:
+            return None
+
+        try:
+            samples = np.load(entry, mmap_mode="r")
+            # Recently used - last to be evicted
+            os.utime(entry)
+        except (OSError, ValueError):
+            return None
+
+        if self.dtype == "int16":
+            return samples.astype(np.float32) / 32767.0
+        return samples
+
+    def store(self, file_path, strategy, profile, y):
+        """
+        Save a decoded excerpt.
+
+        Args:
+            file_path: Audio file
+            strategy: Segment strategy used to decode it
+            profile: Decode profile used to decode it
+            y: The samples (mono float array)
+        """
+        entry = self._entry_path(file_path, strategy, profile)
+        if entry is None:
+            return
+
+        if self.dtype == "int16":
+            samples = (np.clip(y, -1.0, 1.0) * 32767).astype(np.int16)
+        else:
+            samples = np.asarray(y, dtype=np.float32)
+
+        tmp_path = entry.with_name(f"{entry.stem}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, samples)
+            os.replace(tmp_path, entry)
+        except OSError as e:
+            print(f"⚠️  Não foi possível salvar o PCM em cache: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._approx_bytes += samples.nbytes
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".npy"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _total_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Delete least recently used files until the cache fits its budget.
+
+        Returns:
+            Number of files deleted
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        self._approx_bytes = total
+        return removed
+
+    def clear(self):
+        """Delete every cached excerpt."""
+        for _, _, path in self._entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._approx_bytes = 0
+
+
+_pcm_caches = {}
+
+
+def get_pcm_cache():
+    """
+    PCM cache configured by the DJ_PCM_CACHE_DIR environment variable.
+
+    Returns:
+        PcmCache, or None when the variable isn't set (the default),
+        numpy is missing or the folder can't be created
+    """
+    directory = os.environ.get(PCM_CACHE_ENV)
+    if not directory or not NUMPY_AVAILABLE:
+        return None
+
+    if directory not in _pcm_caches:
+        try:
+            _pcm_caches[directory] = PcmCache(directory)
+        except OSError as e:
+            print(f"⚠️  Cache de PCM indisponível: {e}")
+            return None
+
+    return _pcm_caches[directory]
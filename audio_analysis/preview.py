@@ -0,0 +1,324 @@
+"""
+Preview Analysis - A Provisional Key/BPM Without Decoding the Track
+
+Even the "spread" excerpt (see key_detection.load_excerpt) goes through
+librosa.load, and for MP3 that usually means decoding from the start of
+the file up to the last window. For triage - "roughly what key is
+everything in this 5000-track download folder?" - that's too slow.
+
+MP3 files are a chain of independent-ish frames (~26 ms of audio each)
+and every frame starts with a 4-byte header that says how long the
+frame is. So without decoding anything we can:
+
+1. Walk the frame headers to find where each frame starts (and how
+   long the track is)
+2. Cut a few seconds of frames out of the middle of the track
+3. Glue them into a tiny MP3 and decode just that, at a low sample
+   rate with the fast resampler (the "fast" decode profile)
+
+A frame may borrow bytes from the frames before it (the "bit
+reservoir"), so each cut starts a few frames early - more at low
+bitrates - and those frames are thrown away after decoding. Where two
+cuts meet, the decoder may print "dequantization failed!" to stderr:
+that's the thrown-away frames reading the other window's bytes, and
+is expected.
+
+The result is marked provisional ('provisional': True) and cached
+with decode_profile "preview", so a normal analysis never reuses it -
+run the full analysis later on the tracks that need it.
+
+Other formats (FLAC, WAV, AAC/M4A...) get a shorter excerpt through
+the regular decoder: FLAC and WAV seek cheaply anyway, and AAC frames
+live inside an MP4 container that would need its own parser.
+
+Example:
+    >>> info = preview_track("new_track.mp3")
+    >>> info['camelot'], info['bpm'], info['provisional']
+    ('8A', 124, True)
+"""
+
+import io
+import os
+import mmap
+import tempfile
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+
+# Where the preview listens: 3 windows of 6 s (vs 3 x 10 s for "spread")
+PREVIEW_STRATEGY = {"positions": (0.25, 0.50, 0.75), "length": 6}
+
+# Decode profile of the preview (see key_detection.DECODE_PROFILES)
+PREVIEW_DECODE_PROFILE = "fast"
+
+# Frames decoded before each window and thrown away. A frame's data
+# can start up to 511 bytes back in the frames before it (the bit
+# reservoir, 255 bytes in MPEG-2), plus one more frame for the MDCT
+# overlap - at 128 kbps that's 3 frames, at 32 kbps 6. The priming
+# frames at a window join read the end of the previous window as their
+# reservoir, which makes libmpg123 print "dequantization failed!" on
+# stderr; that audio is never kept.
+PRIMING_FRAMES = 2
+MAX_PRIMING_FRAMES = 8
+_MAX_RESERVOIR = {1152: 511, 576: 255}
+
+# Back-to-back frame headers needed before a sync is trusted - a stray
+# 0xFF in a tag or in album art easily looks like a single header
+SYNC_FRAMES = 3
+
+# Bitrates (kbps) of MPEG Layer III, by bitrate index
+_BITRATES_MPEG1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_MPEG2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+# Sample rates by MPEG version bits (00 = 2.5, 10 = 2, 11 = 1)
+_SAMPLE_RATES = {
+    0b00: (11025, 12000, 8000),
+    0b10: (22050, 24000, 16000),
+    0b11: (44100, 48000, 32000),
+}
+
+
+def parse_frame_header(header):
+    """
+    Read a 4-byte MPEG audio frame header.
+
+    Only Layer III (MP3) is understood.
+
+    Args:
+        header: 4 bytes
+
+    Returns:
+        Tuple (frame_length, sample_rate, samples_per_frame), or None
+        if these bytes are not a valid MP3 frame header
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version = (header[1] >> 3) & 0b11
+    layer = (header[1] >> 1) & 0b11
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0b11
+    padding = (header[2] >> 1) & 1
+
+    if version == 0b01 or layer != 0b01:
+        return None  # reserved version, or not Layer III
+    if bitrate_index in (0, 15) or rate_index == 3:
+        return None  # free format / invalid
+
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if version == 0b11:
+        bitrate = _BITRATES_MPEG1[bitrate_index] * 1000
+        return 144 * bitrate // sample_rate + padding, sample_rate, 1152
+
+    bitrate = _BITRATES_MPEG2[bitrate_index] * 1000
+    return 72 * bitrate // sample_rate + padding, sample_rate, 576
+
+
+def _audio_start(data):
+    """Offset of the first byte after an ID3v2 tag (0 if there is none)."""
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)   # "syncsafe" integer
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _confirmed(data, position, frame):
+    """True if SYNC_FRAMES headers of the same stream follow each other
+    from `position` on (or the chain runs exactly to the end of data)."""
+    for _ in range(SYNC_FRAMES - 1):
+        position += frame[0]
+        if position == len(data):
+            return True
+        following = parse_frame_header(data[position:position + 4])
+        if following is None or following[1:] != frame[1:]:
+            return False
+        frame = following
+    return True
+
+
+def scan_frames(data):
+    """
+    Find every MP3 frame in a file - headers only, nothing decoded.
+
+    After a tag or garbage, a header only counts once SYNC_FRAMES
+    headers follow each other back to back, so a stray sync pattern
+    can't lock the scan onto the wrong sample rate or frame grid.
+
+    Args:
+        data: The file contents (bytes or a memory map)
+
+    Returns:
+        Tuple (offsets, lengths, sample_rate, samples_per_frame), or
+        None if no MP3 frames were found
+    """
+    offsets, lengths = [], []
+    stream = None
+    in_sync = False   # True right after a frame we accepted
+    position = _audio_start(data)
+    end = len(data)
+
+    while position + 4 <= end:
+        frame = parse_frame_header(data[position:position + 4])
+        if (frame is not None and (stream is None or frame[1:] == stream)
+                and (in_sync or _confirmed(data, position, frame))):
+            stream = frame[1:]
+            offsets.append(position)
+            lengths.append(frame[0])
+            position += frame[0]
+            in_sync = True
+            continue
+
+        # Garbage between frames - look for the next sync byte
+        in_sync = False
+        position = data.find(b"\xff", position + 1)
+        if position < 0:
+            break
+
+    if not offsets:
+        return None
+    return offsets, lengths, stream[0], stream[1]
+
+
+def _priming_frames(lengths, frame_samples):
+    """Frames to decode in front of a window so its first kept frame
+    has its whole bit reservoir (see PRIMING_FRAMES)."""
+    reservoir = _MAX_RESERVOIR[frame_samples]
+    shortest = max(1, min(lengths))
+    needed = -(-reservoir // shortest) + 1
+    return min(max(PRIMING_FRAMES, needed), MAX_PRIMING_FRAMES)
+
+
+def load_mp3_preview(file_path, strategy=PREVIEW_STRATEGY, profile=PREVIEW_DECODE_PROFILE):
+    """
+    Decode a few windows of an MP3, cut straight from the bitstream.
+
+    Args:
+        file_path: Path to the .mp3 file
+        strategy: {"positions": (...), "length": seconds} - like the
+                  segment strategies of key_detection
+        profile: Decode profile (see key_detection.DECODE_PROFILES)
+
+    Returns:
+        Tuple (y, sr, duration, segments): the joined windows, their
+        sample rate, the length of the whole track and where each
+        window comes from ([(offset, length), ...] in seconds) - or
+        None if the file doesn't look like an MP3
+    """
+    import numpy as np
+    from .key_detection import _decode_options
+
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            frames = scan_frames(data)
+            if frames is None:
+                return None
+            offsets, lengths, native_sr, frame_samples = frames
+            priming = _priming_frames(lengths, frame_samples)
+
+            frame_time = frame_samples / native_sr
+            duration = len(offsets) * frame_time
+            window_frames = int(strategy["length"] / frame_time)
+
+            # (first frame, frame count) of every window
+            if len(offsets) < window_frames + priming:
+                # Track shorter than one window: take all of it
+                runs = [(0, len(offsets))]
+            else:
+                runs = [
+                    (min(max(priming, int(position * len(offsets)) - window_frames // 2),
+                         len(offsets) - window_frames), window_frames)
+                    for position in strategy["positions"]
+                ]
+
+            # Every window, with its priming frames in front
+            chunks = []
+            for first, count in runs:
+                start = offsets[max(0, first - priming)]
+                last = first + count - 1
+                chunks.append(data[start:offsets[last] + lengths[last]])
+            bitstream = b"".join(chunks)
+
+    options = _decode_options(profile)
+    y, sr = _decode_bytes(bitstream, options)
+
+    # Cut the priming frames back out
+    windows, segments = [], []
+    position = 0
+    for first, count in runs:
+        primed = first - max(0, first - priming)
+        start = position + int(primed * frame_samples * sr / native_sr)
+        stop = position + int((primed + count) * frame_samples * sr / native_sr)
+        windows.append(y[start:stop])
+        segments.append((first * frame_time, (stop - start) / sr))
+        position = stop
+
+    return np.concatenate(windows), sr, duration, segments
+
+
+def _decode_bytes(bitstream, options):
+    """Decode an in-memory MP3 (through a temporary file if needed)."""
+    try:
+        # libsndfile >= 1.1 reads MP3 straight from memory
+        return librosa.load(io.BytesIO(bitstream), mono=True, **options)
+    except Exception:
+        pass
+
+    # The audioread fallback needs a real file
+    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
+        tmp.write(bitstream)
+    try:
+        return librosa.load(tmp.name, mono=True, **options)
+    finally:
+        os.unlink(tmp.name)
+
+
+def preview_track(file_path):
+    """
+    Quick, provisional key/BPM of a track.
+
+    MP3s are analyzed from a few seconds of frames cut out of the
+    bitstream (see load_mp3_preview); other formats from a short
+    excerpt decoded the usual way.
+
+    Args:
+        file_path: Path to the audio file
+
+    Returns:
+        Same dictionary shape as analyze_track(), plus
+        'provisional': True and 'decode_profile': 'preview'
+
+    Example:
+        >>> preview_track("new_track.mp3")['camelot']
+        '8A'
+    """
+    from .key_detection import analyze_audio, analyze_track
+
+    if not LIBROSA_AVAILABLE:
+        return analyze_track(file_path)
+
+    preview = None
+    if str(file_path).lower().endswith(".mp3"):
+        try:
+            preview = load_mp3_preview(file_path)
+        except Exception as e:
+            print(f"⚠️  Preview do bitstream falhou ({e}), usando o decoder normal")
+
+    if preview is not None:
+        y, sr, duration, segments = preview
+        result = analyze_audio(y, sr, file_path, duration=duration, segments=segments)
+    else:
+        result = analyze_track(file_path, strategy=PREVIEW_STRATEGY,
+                               profile=PREVIEW_DECODE_PROFILE)
+
+    result["decode_profile"] = "preview"
+    result["provisional"] = True
+    return result
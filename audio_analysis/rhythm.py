@@ -0,0 +1,308 @@
+"""
+Rhythm Analysis - BPM, Beatgrid and Downbeats From One Onset Envelope
+
+Every rhythm feature starts from the same curve: the onset strength
+envelope, which jumps every time a kick, snare or hi-hat hits. We
+compute it ONCE per track and derive everything else from it:
+
+- fractional BPM (127.96, not just 128)
+- a beatgrid: where the first beat of the track falls, so together
+  with the BPM every other beat can be placed
+- the first downbeat (the "1" of the bar)
+- tempo stability: 1 for a machine-steady grid, lower for live
+  drummers and tempo changes
+
+How the BPM is kept out of half/double time: beat trackers happily
+lock onto every other kick (124 BPM house comes back as 62) or onto
+the hi-hats (248). So the tracked tempo is only a starting point - its
+half, double, etc. are scored against the tempogram (how strongly the
+onsets repeat at each beat period), and the best candidate inside the
+preferred range wins. Every candidate is stored with the analysis, so
+a different range can be applied later without any audio (see
+fold_bpm).
+
+How the BPM gets its decimals: the beat tracker places beats on onset
+frames (~23 ms apart), which alone would only give the BPM to within
+a few beats per minute. Fitting a straight line through 20+ beat
+positions averages that rounding away - the slope of the line is the
+beat period with sub-frame precision.
+
+Example:
+    >>> env = onset_envelope(y, sr)
+    >>> analyze_rhythm(env, sr)
+    {'bpm_exact': 127.96, 'bpm_raw': 63.98, 'bpm_candidates': [[127.96, 0.81], ...],
+     'first_beat': 0.21, 'downbeat': 1.15, 'tempo_stability': 0.92}
+"""
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+
+# Beat-timing wobble (as a fraction of the beat period) at which a
+# track counts as having no steady tempo at all (stability 0)
+STABILITY_TOLERANCE = 0.1
+
+# Fewer beats than this in a window and we don't trust the line fit
+MIN_BEATS = 4
+
+# Almost everything a DJ plays is in 4/4
+BEATS_PER_BAR = 4
+
+# Where a DJ expects the BPM of a track to be - from slow hip-hop to
+# drum & bass. Tempos outside it are folded in (62 -> 124, 248 -> 124).
+PREFERRED_BPM_RANGE = (85, 175)
+
+# Multiples of the tracked tempo considered as the "real" BPM
+TEMPO_OCTAVES = (0.25, 0.5, 1, 2, 4)
+
+# Onset autocorrelation lags looked at (~8.9 s - down to ~7 BPM)
+TEMPOGRAM_WINDOW = 384
+
+
+def onset_hop_length(sr):
+    """
+    Hop length giving the same ~23 ms onset frames at any sample rate
+    (512 at 22050 Hz), so a low-rate decode keeps the BPM resolution.
+    """
+    return max(64, int(round(512 * sr / 22050)))
+
+
+def onset_envelope(y, sr):
+    """
+    Onset strength envelope of an audio buffer - the input of every
+    rhythm feature (and of the tempogram, see extract_features).
+
+    Args:
+        y: Audio time series
+        sr: Sample rate of y
+
+    Returns:
+        1-D array, one value per onset frame (see onset_hop_length)
+    """
+    return librosa.onset.onset_strength(y=y, sr=sr, hop_length=onset_hop_length(sr))
+
+
+def tempo_candidates(onset_env, sr, bpm):
+    """
+    Score the half/double-time versions of a tempo.
+
+    Args:
+        onset_env: Envelope from onset_envelope()
+        sr: Sample rate the envelope was computed at
+        bpm: Tempo found by the beat tracker
+
+    Returns:
+        List of [bpm, evidence] for every multiple in TEMPO_OCTAVES,
+        evidence (0-1) being the onset autocorrelation at that beat
+        period - how strongly the onsets repeat at that tempo
+    """
+    import numpy as np
+
+    hop_length = onset_hop_length(sr)
+    frame_time = hop_length / sr
+
+    # Average autocorrelation of the onsets at every lag
+    autocorrelation = librosa.feature.tempogram(
+        onset_envelope=onset_env, sr=sr, hop_length=hop_length,
+        win_length=min(TEMPOGRAM_WINDOW, len(onset_env))
+    ).mean(axis=1)
+    autocorrelation = autocorrelation / (autocorrelation[0] + 1e-10)
+    lags = np.arange(len(autocorrelation))
+
+    candidates = []
+    for octave in TEMPO_OCTAVES:
+        candidate = bpm * octave
+        lag = 60.0 / (candidate * frame_time)
+        # A period longer than the window can't be measured
+        evidence = np.interp(lag, lags, autocorrelation) if lag < lags[-1] else 0.0
+        candidates.append([round(candidate, 2), round(float(evidence), 3)])
+    return candidates
+
+
+def fold_bpm(candidates, preferred_range=PREFERRED_BPM_RANGE):
+    """
+    Pick the BPM from its half/double-time candidates.
+
+    Works on the candidates stored with an analysis, so a library can
+    be re-folded into a different range without decoding anything.
+
+    Args:
+        candidates: [[bpm, evidence], ...] from tempo_candidates()
+        preferred_range: (low, high) where the BPM should end up
+
+    Returns:
+        The best supported candidate inside the range - or, if none
+        is inside, the best supported one halved/doubled towards it
+
+    Example:
+        >>> fold_bpm([[31.0, 0.2], [62.0, 0.9], [124.0, 0.7], [248.0, 0.4]])
+        124.0
+        >>> fold_bpm([[31.0, 0.2], [62.0, 0.9], [124.0, 0.7]], (50, 80))
+        62.0
+    """
+    low, high = preferred_range
+    inside = [c for c in candidates if low <= c[0] <= high]
+    if inside:
+        return max(inside, key=lambda c: c[1])[0]
+
+    bpm = max(candidates, key=lambda c: c[1])[0]
+    while bpm < low and bpm * 2 <= high:
+        bpm *= 2
+    while bpm > high and bpm / 2 >= low:
+        bpm /= 2
+    return round(bpm, 2)
+
+
+def fold_grid(env, frame_time, raw_phase, raw_period, period):
+    """
+    Beat phase and downbeat of a window, on the folded tempo's grid.
+
+    When the tempo is halved (tracked at 248, played at 124), only one
+    in every k tracked beats is a real beat - and the tracker may have
+    started on an off-beat - so the phase is the one of the k tracked
+    beats whose grid hits hardest. When it is doubled, the real beats
+    in between the tracked ones are read from the envelope. Either
+    way the downbeat is picked among the beats of the folded grid.
+
+    Args:
+        env: Onset envelope of the window
+        frame_time: Seconds per envelope frame
+        raw_phase: Time of the first tracked beat in the window (s)
+        raw_period: Tracked beat period (s)
+        period: Folded beat period (s)
+
+    Returns:
+        Tuple (phase, bar_position): time of the first beat of the
+        folded grid in the window, and which beat of the bar (counted
+        from it) is the downbeat
+    """
+    import numpy as np
+
+    env = np.asarray(env, dtype=np.float64)
+    # Strongest onset within a frame of each beat (beats fall between frames)
+    peaks = np.maximum(env, np.maximum(np.r_[env[1:], 0.0], np.r_[0.0, env[:-1]]))
+    window_time = len(env) * frame_time
+
+    def strengths(phase):
+        times = phase + period * np.arange(max(0, int((window_time - phase) / period)) + 1)
+        frames = np.round(times / frame_time).astype(int)
+        return peaks[frames[frames < len(env)]]
+
+    def score(phase):
+        hits = strengths(phase)
+        return hits.mean() if len(hits) else 0.0
+
+    # Every tracked beat that can start the folded grid (just the
+    # first one unless the tempo was halved)
+    steps = max(1, int(round(period / raw_period)))
+    phase = max((raw_phase + j * raw_period for j in range(steps)), key=score)
+
+    beats = strengths(phase)
+    if not len(beats):
+        return phase, 0
+
+    # Downbeat: the beat of the bar that hits hardest on average
+    bar_position = int(np.argmax([
+        beats[beat::BEATS_PER_BAR].mean()
+        for beat in range(min(BEATS_PER_BAR, len(beats)))
+    ]))
+    return phase, bar_position
+
+
+def analyze_rhythm(onset_env, sr, segments=None, preferred_range=PREFERRED_BPM_RANGE):
+    """
+    BPM, beatgrid, downbeat and stability from an onset envelope.
+
+    The excerpt we analyze may be several windows glued together
+    (see key_detection.load_excerpt), so beats are tracked in each
+    window separately and placed back at their real time in the track.
+
+    Args:
+        onset_env: Envelope from onset_envelope()
+        sr: Sample rate the envelope was computed at
+        segments: [(offset, length), ...] in seconds - where each part
+                  of the excerpt comes from in the track. None = the
+                  excerpt is one piece starting at 0:00.
+        preferred_range: BPM range half/double-time tempos are folded
+                         into (see fold_bpm)
+
+    Returns:
+        Dictionary with:
+        - 'bpm_exact': Fractional BPM (e.g. 127.96), folded into the
+          preferred range
+        - 'bpm_raw': The tempo the beat tracker locked onto
+        - 'bpm_candidates': [[bpm, evidence], ...] half/double-time
+          candidates (see tempo_candidates)
+        - 'first_beat': Time of the first beat of the grid (seconds)
+        - 'downbeat': Time of the first downbeat - the "1" (seconds)
+        - 'tempo_stability': 0-1, how steady the beats are
+        or None when no steady beat was found (ambient, spoken word)
+    """
+    import numpy as np
+
+    hop_length = onset_hop_length(sr)
+    frame_time = hop_length / sr
+    if segments is None:
+        segments = [(0.0, len(onset_env) * frame_time)]
+
+    windows = []
+    start = 0
+    for offset, length in segments:
+        env = onset_env[start:start + int(round(length / frame_time))]
+        start += len(env)
+        if len(env) < 2:
+            continue
+
+        _, beats = librosa.beat.beat_track(onset_envelope=env, sr=sr,
+                                           hop_length=hop_length)
+        if len(beats) < MIN_BEATS:
+            continue
+
+        # Straight line through the beats: slope = period, intercept = phase
+        times = beats * frame_time
+        period, phase = np.polyfit(np.arange(len(times)), times, 1)
+        residuals = times - (phase + period * np.arange(len(times)))
+        windows.append({
+            "offset": offset,
+            "period": period,
+            "phase": phase,
+            "jitter": residuals.std() / period,
+            "env": env,
+        })
+
+    if not windows:
+        return None
+
+    raw_period = float(np.median([w["period"] for w in windows]))
+    raw_bpm = 60.0 / raw_period
+
+    # Unsteady = beats off the line inside a window, or a different
+    # tempo from one window to the next
+    jitter = float(np.mean([w["jitter"] for w in windows]))
+    drift = (max(w["period"] for w in windows) - min(w["period"] for w in windows)) / raw_period
+    stability = min(max(1.0 - (jitter + drift) / STABILITY_TOLERANCE, 0.0), 1.0)
+
+    # Out of half/double time first - the grid is built on the folded tempo
+    candidates = tempo_candidates(onset_env, sr, raw_bpm)
+    bpm = fold_bpm(candidates, preferred_range)
+    period = 60.0 / bpm
+
+    # The grid is anchored on the first window and extended back to
+    # the start of the track
+    first = windows[0]
+    phase, bar_position = fold_grid(first["env"], frame_time, first["phase"],
+                                    raw_period, period)
+    anchor = first["offset"] + phase
+    downbeat = anchor + bar_position * period
+
+    return {
+        "bpm_exact": round(bpm, 2),
+        "bpm_raw": round(raw_bpm, 2),
+        "bpm_candidates": candidates,
+        "first_beat": round(anchor % period, 3),
+        "downbeat": round(downbeat % (BEATS_PER_BAR * period), 3),
+        "tempo_stability": round(stability, 3),
+    }
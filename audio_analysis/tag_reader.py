@@ -0,0 +1,218 @@
+"""
+Tag Reader - Using the Key/BPM Already Written in the File
+
+Most DJ libraries are already tagged: Rekordbox, Traktor, Mixed In Key
+and friends write the key and BPM into the file's metadata. Reading a
+tag takes milliseconds, while a full audio analysis takes seconds, so
+playlist builders look here first and only analyze the audio when the
+tags are missing or can't be trusted.
+
+Supported tags:
+- MP3 (ID3): TKEY, TBPM
+- FLAC / OGG (Vorbis comments): INITIALKEY, KEY, BPM
+- M4A (iTunes atoms): initialkey, tmpo
+
+Key values can be Camelot ("8A"), Open Key ("1m") or musical
+notation ("Am", "F# minor", "Eb").
+
+Requires the optional 'mutagen' package (pip install mutagen).
+"""
+
+import re
+
+try:
+    # Mutagen reads tags of every common audio format
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+from utils.camelot_map import (
+    MAJOR_KEY_NAMES, MINOR_KEY_NAMES, get_camelot_key, key_name_from_pitch_class
+)
+
+
+# Tag names to try, in order, for each format
+KEY_TAG_NAMES = (
+    "TKEY",                              # ID3
+    "initialkey", "key",                 # Vorbis comments
+    "----:com.apple.iTunes:initialkey",  # MP4
+)
+BPM_TAG_NAMES = (
+    "TBPM",                              # ID3
+    "bpm",                               # Vorbis comments
+    "tmpo",                              # MP4
+)
+
+# BPM tags outside this range are treated as garbage
+TRUSTED_BPM_RANGE = (40, 250)
+
+# Note letters to pitch class (C = 0)
+_NOTE_PITCH = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+_CAMELOT_RE = re.compile(r"^0?([1-9]|1[0-2])\s*([AB])$", re.IGNORECASE)
+_OPEN_KEY_RE = re.compile(r"^0?([1-9]|1[0-2])\s*([DM])$", re.IGNORECASE)
+_MUSICAL_RE = re.compile(
+    r"^([A-Ga-g])\s*([#♯b♭]?)\s*(m|min|minor|maj|major)?$", re.IGNORECASE
+)
+
+
+# Camelot code -> key name, spelled like the analyzer spells it (one
+# name per pitch class, so "3B" is always "C# Major", never "Eb Major")
+_KEY_NAME_FOR_CAMELOT = {
+    get_camelot_key(name): name for name in MAJOR_KEY_NAMES + MINOR_KEY_NAMES
+}
+
+
+def parse_key_tag(value):
+    """
+    Understand a key written by DJ software.
+
+    Args:
+        value: Tag text like "8A", "1m", "Am" or "F# Minor"
+
+    Returns:
+        Tuple (key_name, camelot) or None if the value is not a key
+
+    Example:
+        >>> parse_key_tag("Am")
+        ('A Minor', '8A')
+        >>> parse_key_tag("08A")
+        ('A Minor', '8A')
+    """
+    if not value:
+        return None
+
+    text = str(value).strip()
+
+    # Camelot: "8A", "08A"
+    match = _CAMELOT_RE.match(text)
+    if match:
+        camelot = f"{int(match.group(1))}{match.group(2).upper()}"
+        return _KEY_NAME_FOR_CAMELOT[camelot], camelot
+
+    # Open Key (Traktor): 1d = C Major (8B), 1m = A Minor (8A)
+    match = _OPEN_KEY_RE.match(text)
+    if match:
+        number = (int(match.group(1)) + 6) % 12 + 1
+        letter = "A" if match.group(2).lower() == "m" else "B"
+        camelot = f"{number}{letter}"
+        return _KEY_NAME_FOR_CAMELOT[camelot], camelot
+
+    # Musical notation: "A", "Am", "F#m", "Eb minor"
+    match = _MUSICAL_RE.match(text)
+    if match:
+        letter, accidental, mode = match.groups()
+        pitch = _NOTE_PITCH[letter.upper()]
+        if accidental in ("#", "♯"):
+            pitch += 1
+        elif accidental in ("b", "♭"):
+            pitch -= 1
+
+        is_major = not mode or mode.lower().startswith("maj")
+        key_name = key_name_from_pitch_class(pitch, is_major)
+        camelot = get_camelot_key(key_name)
+        if camelot == "Unknown":
+            return None
+        return key_name, camelot
+
+    return None
+
+
+def parse_bpm_tag(value):
+    """
+    Understand a BPM tag.
+
+    Args:
+        value: Tag text like "128", "127.98" or "128 BPM"
+
+    Returns:
+        Rounded BPM, or None if missing / outside TRUSTED_BPM_RANGE
+
+    Example:
+        >>> parse_bpm_tag("127.98")
+        128
+    """
+    if value is None:
+        return None
+
+    match = re.search(r"\d+(?:[.,]\d+)?", str(value))
+    if not match:
+        return None
+
+    bpm = float(match.group(0).replace(",", "."))
+    low, high = TRUSTED_BPM_RANGE
+    if not low <= bpm <= high:
+        return None
+
+    return round(bpm)
+
+
+def _tag_text(value):
+    """Turn a mutagen tag value (frame, list, atom) into plain text."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if hasattr(value, "text"):
+        value = value.text[0] if value.text else None
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="ignore")
+    return value
+
+
+def _first_tag(tags, names):
+    """Value of the first tag name that exists."""
+    for name in names:
+        try:
+            value = tags.get(name)
+        except (KeyError, ValueError):
+            continue
+        value = _tag_text(value)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def read_tag_analysis(file_path):
+    """
+    Build an analysis result from the file's tags, without decoding audio.
+
+    Args:
+        file_path: Path to the audio file
+
+    Returns:
+        Dictionary shaped like analyze_track() plus 'source': 'tags',
+        or None if mutagen is missing or the file has no usable key tag.
+        'bpm' is None when there is no trustworthy BPM tag.
+
+    Example:
+        >>> read_tag_analysis("tagged_song.mp3")
+        {'file_path': 'tagged_song.mp3', 'key': 'A Minor', 'camelot': '8A',
+         'bpm': 124, 'duration': 391.2, 'confidence': None, 'source': 'tags'}
+    """
+    if not MUTAGEN_AVAILABLE:
+        return None
+
+    try:
+        audio = mutagen.File(file_path)
+    except Exception:
+        return None
+
+    if audio is None or audio.tags is None:
+        return None
+
+    parsed_key = parse_key_tag(_first_tag(audio.tags, KEY_TAG_NAMES))
+    if parsed_key is None:
+        return None
+
+    key_name, camelot = parsed_key
+    length = getattr(audio.info, "length", None)
+
+    return {
+        "file_path": file_path,
+        "key": key_name,
+        "camelot": camelot,
+        "bpm": parse_bpm_tag(_first_tag(audio.tags, BPM_TAG_NAMES)),
+        "duration": round(length, 2) if length else None,
+        "confidence": None,
+        "source": "tags"
+    }
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark Suite for DJ Harmonic Analyzer
+
+Measures how fast (and how accurately) the analysis pipeline runs, so
+performance changes can be compared from one commit to the next.
+
+Everything runs offline: the audio fixtures are generated on the fly
+(sine chords in known keys + click tracks at known BPMs), no music
+files needed.
+
+Stages timed:
+- load:      load_audio (decode + resample, with the chosen profile)
+- chroma:    librosa.feature.chroma_cqt on the loaded audio
+- tempo:     tempo estimation on the loaded audio
+- analyze:   analyze_track() end-to-end
+- organize:  organize_by_key() over the whole fixture folder
+
+For each stage: files/sec, p50/p95 latency and peak RSS. Results are
+saved as JSON (with the git commit) so runs can be compared.
+
+Usage:
+    python benchmark.py                          # run, print, save bench_results.json
+    python benchmark.py --files 24 --seconds 60  # bigger fixtures
+    python benchmark.py --compare old.json       # show the change vs. an older run
+    python benchmark.py --seconds 180 --strategy intro   # first 60 s instead of 3 windows
+    python benchmark.py --profile fast --compare quality.json   # fast vs. quality decoding
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import wave
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    # Windows has no resource module - peak RSS is reported as None
+    RESOURCE_AVAILABLE = False
+
+
+# Rate of the generated WAVs. Real tracks are 44.1/48 kHz - fixtures
+# at librosa's 22.05 kHz would hide the cost of resampling, which is
+# exactly what the decode profiles change
+FIXTURE_SAMPLE_RATE = 44100
+
+# Keys and tempos of the generated fixtures (cycled)
+FIXTURE_KEYS = [
+    "C Major", "A Minor", "G Major", "E Minor", "D Major", "B Minor",
+    "F Major", "D Minor", "A Major", "F# Minor", "E Major", "C Minor",
+]
+FIXTURE_BPMS = [90, 100, 110, 120, 124, 128, 132, 140, 150, 160, 170, 174]
+
+NOTE_INDEX = {
+    "C": 0, "C#": 1, "D": 2, "Eb": 3, "D#": 3, "E": 4, "F": 5,
+    "F#": 6, "G": 7, "Ab": 8, "G#": 8, "A": 9, "Bb": 10, "A#": 10, "B": 11,
+}
+
+
+# ─────────────────────────────────────────────────────
+# Synthetic fixtures
+# ─────────────────────────────────────────────────────
+
+def _chord_frequencies(key_name):
+    """Triad (root, third, fifth) plus the octave, around middle C."""
+    root_name, mode = key_name.split()
+    root = NOTE_INDEX[root_name]
+    third = 4 if mode == "Major" else 3
+    # MIDI 60 = C4
+    return [
+        440.0 * 2 ** ((60 + root + interval - 69) / 12)
+        for interval in (0, third, 7, 12)
+    ]
+
+
+def write_fixture(path, key_name, bpm, seconds, sr=FIXTURE_SAMPLE_RATE):
+    """
+    Write a mono 16-bit WAV: a sustained chord in `key_name` with a
+    click on every beat at `bpm`.
+    """
+    import numpy as np   # comes with librosa, which the benchmark needs anyway
+
+    frequencies = _chord_frequencies(key_name)
+    beat_samples = sr * 60.0 / bpm
+    click_samples = int(0.02 * sr)
+    rng = np.random.default_rng(bpm)
+
+    t = np.arange(int(seconds * sr)) / sr
+    value = sum(np.sin(2 * np.pi * f * t) for f in frequencies) * 0.15
+
+    # Decaying noise burst at the start of every beat
+    position = np.arange(len(t)) % beat_samples
+    click = position < click_samples
+    value[click] += (rng.uniform(-1, 1, click.sum())
+                     * 0.6 * (1 - position[click] / click_samples))
+
+    samples = (np.clip(value, -1.0, 1.0) * 32767).astype("<i2")
+
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(samples.tobytes())
+
+
+def generate_fixtures(directory, count, seconds, sr=FIXTURE_SAMPLE_RATE):
+    """
+    Create `count` fixtures in `directory`.
+
+    Returns:
+        List of dicts with 'path', 'key' and 'bpm' (the ground truth)
+    """
+    fixtures = []
+    for i in range(count):
+        key_name = FIXTURE_KEYS[i % len(FIXTURE_KEYS)]
+        bpm = FIXTURE_BPMS[i % len(FIXTURE_BPMS)]
+        path = Path(directory) / f"fixture_{i:03d}_{key_name.replace(' ', '_')}_{bpm}.wav"
+        write_fixture(path, key_name, bpm, seconds, sr)
+        fixtures.append({"path": str(path), "key": key_name, "bpm": bpm})
+    return fixtures
+
+
+# ─────────────────────────────────────────────────────
+# Measuring
+# ─────────────────────────────────────────────────────
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and its children, in MB."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kB, macOS reports bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage / divisor, 1)
+
+
+def time_per_file(name, func, items):
+    """Run func on every item and summarize the latencies."""
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    return {
+        "stage": name,
+        "files": len(items),
+        "total_s": round(total, 4),
+        "files_per_s": round(len(items) / total, 3) if total else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def time_batch(name, func, count):
+    """Time one call that processes `count` files at once."""
+    start = time.perf_counter()
+    func()
+    total = time.perf_counter() - start
+    return {
+        "stage": name,
+        "files": count,
+        "total_s": round(total, 4),
+        "files_per_s": round(count / total, 3) if total else None,
+        "p50_ms": None,
+        "p95_ms": None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmarks(fixtures, fixture_dir, workers=None, strategy="spread",
+                   profile="quality"):
+    """Time every stage and check accuracy against the fixtures."""
+    import librosa
+    from audio_analysis.key_detection import analyze_track, detect_bpm, load_audio
+    from file_manager.organizaer import organize_by_key
+
+    paths = [f["path"] for f in fixtures]
+    loaded = {}
+
+    def load(path):
+        loaded[path] = load_audio(path, duration=30, profile=profile)
+
+    def chroma(path):
+        y, sr = loaded[path]
+        librosa.feature.chroma_cqt(y=y, sr=sr)
+
+    def tempo(path):
+        y, sr = loaded[path]
+        detect_bpm(y=y, sr=sr)
+
+    results = [
+        time_per_file("load", load, paths),
+        time_per_file("chroma", chroma, paths),
+        time_per_file("tempo", tempo, paths),
+    ]
+
+    # End-to-end, and accuracy against the known key/BPM
+    analyses = {}
+    results.append(time_per_file(
+        "analyze", lambda p: analyses.__setitem__(p, analyze_track(p, strategy, profile)), paths
+    ))
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        results.append(time_batch(
+            "organize",
+            lambda: organize_by_key(fixture_dir, out_dir, use_cache=False, workers=workers,
+                                    decode_profile=profile),
+            len(paths)
+        ))
+
+    key_hits = sum(analyses[f["path"]]["key"] == f["key"] for f in fixtures)
+    bpm_hits = sum(
+        analyses[f["path"]]["bpm"] is not None
+        and abs(analyses[f["path"]]["bpm"] - f["bpm"]) <= 2
+        for f in fixtures
+    )
+    accuracy = {
+        "key": round(key_hits / len(fixtures), 3),
+        "bpm_within_2": round(bpm_hits / len(fixtures), 3),
+    }
+
+    return results, accuracy
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline=None):
+    """Print the stage table (with % change vs. the baseline, if any)."""
+    previous = {}
+    if baseline:
+        previous = {s["stage"]: s for s in baseline["stages"]}
+
+    print(f"\n📊 Benchmark @ {report['commit'] or 'unknown commit'}")
+    print(f"{'stage':<10} {'files/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'RSS MB':>8}  change")
+    print("-" * 60)
+    for stage in report["stages"]:
+        change = ""
+        old = previous.get(stage["stage"])
+        if old and old.get("files_per_s") and stage["files_per_s"]:
+            delta = (stage["files_per_s"] / old["files_per_s"] - 1) * 100
+            change = f"{delta:+.1f}%"
+        print(f"{stage['stage']:<10} {stage['files_per_s'] or '-':>9} "
+              f"{stage['p50_ms'] or '-':>9} {stage['p95_ms'] or '-':>9} "
+              f"{stage['peak_rss_mb'] or '-':>8}  {change}")
+
+    accuracy = report["accuracy"]
+    print(f"\n🎯 Key accuracy: {accuracy['key']:.0%}   "
+          f"BPM accuracy (±2): {accuracy['bpm_within_2']:.0%}")
+    if baseline and "accuracy" in baseline:
+        # The speed of a faster profile only counts if these hold
+        old = baseline["accuracy"]
+        print(f"   vs. baseline: key {accuracy['key'] - old['key']:+.0%}   "
+              f"BPM {accuracy['bpm_within_2'] - old['bpm_within_2']:+.0%}"
+              f"   ({baseline.get('profile', '?')} @ "
+              f"{baseline.get('fixtures', {}).get('sample_rate', '?')} Hz)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline")
+    parser.add_argument('--files', type=int, default=12, help='Number of fixtures (default: 12)')
+    parser.add_argument('--seconds', type=float, default=30, help='Fixture length (default: 30)')
+    parser.add_argument('--sample-rate', type=int, default=FIXTURE_SAMPLE_RATE,
+                        help=f'Fixture sample rate (default: {FIXTURE_SAMPLE_RATE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes for the organize stage (default: one per core)')
+    parser.add_argument('--strategy', default='spread', choices=['spread', 'intro'],
+                        help='Segment strategy for the analyze stage (default: spread)')
+    parser.add_argument('--profile', default='quality', choices=['quality', 'fast'],
+                        help='Decode profile (default: quality)')
+    parser.add_argument('--output', default='bench_results.json', help='Where to save the JSON')
+    parser.add_argument('--compare', help='Older results JSON to compare against')
+    args = parser.parse_args()
+
+    try:
+        import librosa  # noqa: F401
+    except ImportError:
+        print("❌ Librosa not installed - run: pip install librosa")
+        return 1
+
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        print(f"🎹 Generating {args.files} fixtures "
+              f"({args.seconds:.0f}s each, {args.sample_rate} Hz)...")
+        fixtures = generate_fixtures(fixture_dir, args.files, args.seconds, args.sample_rate)
+        stages, accuracy = run_benchmarks(fixtures, fixture_dir, args.workers,
+                                          args.strategy, args.profile)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "fixtures": {"count": args.files, "seconds": args.seconds,
+                     "sample_rate": args.sample_rate},
+        "strategy": args.strategy,
+        "profile": args.profile,
+        "stages": stages,
+        "accuracy": accuracy,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_report(report, baseline)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,14 +8,24 @@ This package handles all file-related operations:
 """
 
 from .organizaer import (
+    iter_audio_files,
     find_audio_files,
+    iter_library_analysis,
     organize_by_key,
     create_playlist
 )
+from .library_index import LibraryIndex, get_library_index
+from .set_sequencer import NeighborIndex, sequence_set
 
 __all__ = [
+    'iter_audio_files',
     'find_audio_files',
+    'iter_library_analysis',
     'organize_by_key',
-    'create_playlist'
+    'create_playlist',
+    'LibraryIndex',
+    'get_library_index',
+    'NeighborIndex',
+    'sequence_set'
 ]
 
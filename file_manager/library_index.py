@@ -0,0 +1,402 @@
+"""
+Library Index - Instant Key/BPM Lookups
+
+Instead of re-analyzing (or even re-scanning) the whole library every
+time someone wants "tracks that mix with 8A between 124 and 128 BPM",
+we keep an index of every analyzed track:
+
+- one bucket per Camelot key ("8A", "9B", ...)
+- inside each bucket, the tracks sorted by BPM, so a BPM range is
+  found with a binary search instead of a full scan
+
+The index is saved as JSON in the library root and loaded lazily the
+first time it's used. It is updated incrementally: add() / remove()
+for single files, refresh() to pick up everything that changed on disk.
+Files that couldn't be analyzed are remembered too (with their size and
+mtime), so refresh() doesn't retry them until they change.
+
+Example:
+    >>> index = get_library_index("/music")
+    >>> index.refresh()                      # analyze only new files
+    >>> index.query("8A", bpm_range=(124, 128))
+    [{'file_path': '/music/a.mp3', 'camelot': '9A', 'bpm': 125, ...}, ...]
+"""
+
+import os
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+
+# Nome do arquivo de índice na raiz da biblioteca
+INDEX_FILENAME = ".dj_library_index.json"
+
+# Fields kept for each track (the beatgrid ones come from
+# audio_analysis/rhythm.py, None for tracks analyzed from tags;
+# 'provisional' marks quick preview results - see refine_organized;
+# 'loudness' is the energy used to order sets - see set_sequencer.py)
+INDEX_FIELDS = ("key", "camelot", "bpm", "duration", "confidence",
+                "bpm_exact", "first_beat", "downbeat", "tempo_stability",
+                "provisional", "loudness")
+
+
+class _KeyBucket:
+    """Tracks of one Camelot key, kept sorted by BPM."""
+
+    def __init__(self):
+        self.bpms = []       # sorted BPM values
+        self.paths = []      # file paths, parallel to self.bpms
+        self.no_bpm = []     # tracks whose BPM is unknown
+
+    def add(self, path, bpm):
+        if bpm is None:
+            self.no_bpm.append(path)
+            return
+        position = bisect_right(self.bpms, bpm)
+        self.bpms.insert(position, bpm)
+        self.paths.insert(position, path)
+
+    def remove(self, path, bpm):
+        if bpm is None:
+            self.no_bpm.remove(path)
+            return
+        # Only look among tracks with the same BPM
+        start = bisect_left(self.bpms, bpm)
+        end = bisect_right(self.bpms, bpm)
+        position = self.paths.index(path, start, end)
+        del self.bpms[position]
+        del self.paths[position]
+
+    def in_range(self, bpm_range=None):
+        if bpm_range is None:
+            return self.paths + self.no_bpm
+        low, high = bpm_range
+        return self.paths[bisect_left(self.bpms, low):bisect_right(self.bpms, high)]
+
+    def __len__(self):
+        return len(self.paths) + len(self.no_bpm)
+
+
+class LibraryIndex:
+    """
+    Persistent key/BPM index of a music library.
+
+    Safe to share between threads (the GUI, a CLI run and a watcher
+    can all use the same instance).
+
+    Args:
+        index_path: JSON file where the index is stored
+        library_root: Library folder (used by refresh())
+    """
+
+    def __init__(self, index_path, library_root=None):
+        self.index_path = Path(index_path)
+        self.library_root = library_root
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._tracks = {}    # path -> record
+        self._buckets = {}   # camelot -> _KeyBucket
+        self._failed = {}    # path -> [size, mtime] of files that couldn't be analyzed
+        self._dirty = False
+
+    @classmethod
+    def for_library(cls, directory):
+        """Index stored in the root of a library folder."""
+        return cls(Path(directory) / INDEX_FILENAME, library_root=directory)
+
+    # ─────────────────────────────────────────────────────
+    # Loading / saving
+    # ─────────────────────────────────────────────────────
+
+    def _ensure_loaded(self):
+        """Read the index from disk the first time it's needed."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+
+            if not self.index_path.exists():
+                return
+
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Índice corrompido, recriando: {e}")
+                return
+
+            from audio_analysis.key_detection import ANALYZER_VERSION
+            if data.get("analyzer_version") != ANALYZER_VERSION:
+                # Keys from an older analyzer (e.g. before the Camelot
+                # map fix) - start over, refresh() rebuilds it
+                return
+
+            for record in data.get("tracks", []):
+                self._insert(record)
+            self._failed = data.get("failed", {})
+            self._dirty = False
+
+    def save(self):
+        """Write the index to disk (only if something changed)."""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+
+            # Write to a temp file and swap, so a crash never leaves
+            # a half-written index behind
+            from audio_analysis.key_detection import ANALYZER_VERSION
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"analyzer_version": ANALYZER_VERSION,
+                           "tracks": list(self._tracks.values()),
+                           "failed": self._failed}, f)
+            os.replace(tmp_path, self.index_path)
+
+            self._dirty = False
+
+    # ─────────────────────────────────────────────────────
+    # Incremental updates
+    # ─────────────────────────────────────────────────────
+
+    def _insert(self, record):
+        # Absolute paths only, whatever the caller passed - the same
+        # file must never end up under two keys
+        path = record["file_path"] = os.path.abspath(record["file_path"])
+        self._tracks[path] = record
+        self._buckets.setdefault(record["camelot"], _KeyBucket()).add(path, record["bpm"])
+        self._dirty = True
+
+    def add(self, analysis):
+        """
+        Add (or update) one analyzed track.
+
+        Tracks whose key couldn't be detected are ignored.
+
+        Args:
+            analysis: Dictionary returned by analyze_track()
+
+        Returns:
+            True if the track was indexed
+        """
+        camelot = analysis.get("camelot", "Unknown")
+        if camelot == "Unknown" or "error" in analysis:
+            return False
+
+        path = os.path.abspath(analysis["file_path"])
+        record = {"file_path": path}
+        record.update({field: analysis.get(field) for field in INDEX_FIELDS})
+
+        # Remember which version of the file this describes
+        try:
+            stat = os.stat(path)
+            record["size"] = stat.st_size
+            record["mtime"] = stat.st_mtime
+        except OSError:
+            pass
+
+        with self._lock:
+            self._ensure_loaded()
+            self.remove(path)
+            self._insert(record)
+            self._failed.pop(path, None)
+        return True
+
+    def remove(self, file_path):
+        """
+        Remove one track from the index (no-op if it isn't there).
+
+        Args:
+            file_path: Path of the removed file
+
+        Returns:
+            The removed record, or None
+        """
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            self._ensure_loaded()
+            record = self._tracks.pop(file_path, None)
+            if record is None:
+                return None
+
+            bucket = self._buckets[record["camelot"]]
+            bucket.remove(file_path, record["bpm"])
+            if not len(bucket):
+                del self._buckets[record["camelot"]]
+
+            self._dirty = True
+            return record
+
+    def is_current(self, file_path, size, mtime):
+        """True if the index already describes this version of the file."""
+        with self._lock:
+            self._ensure_loaded()
+            record = self._tracks.get(os.path.abspath(file_path))
+        return (
+            record is not None
+            and record.get("size") == size
+            and record.get("mtime") == mtime
+        )
+
+    def _failed_before(self, file_path, size, mtime):
+        """True if this version of the file already failed to analyze."""
+        return self._failed.get(file_path) == [size, mtime]
+
+    def refresh(self, directory=None, use_cache=True, workers=None,
+                use_tags=False, progress_callback=None, should_stop=None,
+                retry_failed=False):
+        """
+        Bring the index up to date with the files on disk.
+
+        Only new or modified files are analyzed (and those usually come
+        straight from the analysis cache); deleted files are dropped.
+        Files whose analysis failed are remembered and skipped until
+        they change (or until retry_failed).
+
+        Args:
+            directory: Library folder (None = the one the index belongs to)
+            use_cache: Reuse cached analyses of unchanged files
+            workers: Analysis processes (None = one per CPU core)
+            use_tags: Take key/BPM from the file tags when present
+            progress_callback: Optional function(done, total, analysis)
+                               called for each file analyzed
+            should_stop: Optional function returning True to stop early
+                         (what was analyzed so far is kept)
+            retry_failed: Analyze files that failed before again, even
+                          if they didn't change (e.g. after installing
+                          a decoder)
+
+        Returns:
+            Dictionary with 'added' (tracks actually indexed - failed
+            and "Unknown" analyses don't count) and 'removed' counts
+        """
+        from .organizaer import _analyze_files, _watch_progress
+        from .scanner import scan_audio_files
+
+        directory = directory or self.library_root
+        self._ensure_loaded()
+
+        # The scanner already gives us size/mtime - no stat() per file
+        seen = {}   # path -> [size, mtime]
+        changed = []
+        for record in scan_audio_files(os.path.abspath(directory)):
+            path = os.path.abspath(record["path"])
+            seen[path] = [record["size"], record["mtime"]]
+            if self.is_current(path, record["size"], record["mtime"]):
+                continue
+            if not retry_failed and self._failed_before(path, *seen[path]):
+                continue
+            changed.append(path)
+
+        with self._lock:
+            missing = [p for p in self._tracks if p not in seen]
+            gone = [p for p in self._failed if p not in seen]
+            for file_path in gone:
+                del self._failed[file_path]
+                self._dirty = True
+        for file_path in missing:
+            self.remove(file_path)
+
+        added = 0
+        analyses = _watch_progress(_analyze_files(changed, use_cache, workers, use_tags),
+                                   len(changed), progress_callback, should_stop)
+        for analysis in analyses:
+            if self.add(analysis):
+                added += 1
+                continue
+            # Not retried until the file changes (an older record of
+            # the file, if any, stays as the best we know)
+            path = os.path.abspath(analysis["file_path"])
+            with self._lock:
+                self._failed[path] = seen[path]
+                self._dirty = True
+
+        self.save()
+        return {"added": added, "removed": len(missing)}
+
+    # ─────────────────────────────────────────────────────
+    # Queries
+    # ─────────────────────────────────────────────────────
+
+    def get(self, file_path):
+        """Indexed record of one file, or None."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._tracks.get(os.path.abspath(file_path))
+
+    def query(self, camelot=None, bpm_range=None, compatible=True):
+        """
+        Find tracks by key and BPM.
+
+        Args:
+            camelot: Camelot key like "8A" (None = any key)
+            bpm_range: Tuple (min_bpm, max_bpm), inclusive (None = any BPM)
+            compatible: Include every key that mixes with `camelot`
+                        (see utils.camelot_map.get_harmonic_mixes), not
+                        just `camelot` itself
+
+        Returns:
+            List of track records, sorted by BPM within each key
+
+        Example:
+            >>> index.query("8A", bpm_range=(124, 128))
+        """
+        from utils.camelot_map import get_harmonic_mixes
+
+        with self._lock:
+            self._ensure_loaded()
+
+            if camelot is None:
+                keys = list(self._buckets)
+            elif compatible:
+                keys = get_harmonic_mixes(camelot)
+            else:
+                keys = [camelot]
+
+            results = []
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    results.extend(self._tracks[p] for p in bucket.in_range(bpm_range))
+            return results
+
+    def keys(self):
+        """Camelot keys present in the library."""
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(self._buckets)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._tracks)
+
+    def __contains__(self, file_path):
+        return self.get(file_path) is not None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_library_index(directory):
+    """
+    Shared index of a library folder.
+
+    Every caller (GUI, CLI, playlist functions, watcher) gets the same
+    instance for the same folder, so updates made by one are
+    immediately visible to the others.
+
+    Args:
+        directory: Library folder
+
+    Returns:
+        LibraryIndex (loaded from disk lazily)
+    """
+    root = os.path.abspath(directory)
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = LibraryIndex.for_library(root)
+        return _indexes[root]
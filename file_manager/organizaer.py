@@ -16,16 +16,50 @@ import shutil
 from pathlib import Path
 
 
-def find_audio_files(directory, extensions=None):
+# copy2() keeps the modification time, but some filesystems (FAT on
+# USB sticks) only store it with 2-second precision
+MTIME_TOLERANCE = 2.0
+
+# What refine_organized() changed, one JSON line per track, in the
+# output folder
+REFINEMENT_LOG_FILENAME = ".dj_refinement_log.jsonl"
+
+
+def iter_audio_files(directory, extensions=None, scan_workers=1):
+    """
+    Lazily find audio files in a directory and its subdirectories.
+    
+    Same as find_audio_files(), but yields each path as soon as it is
+    found instead of building the whole list first - analysis can start
+    on the first file while the rest of the tree is still being walked.
+    
+    Args:
+        directory: Folder to search in (e.g., "/music/my_collection")
+        extensions: List of extensions to look for. If None, uses defaults.
+        scan_workers: Directories listed in parallel (use 8+ on a NAS)
+    
+    Yields:
+        Paths (strings) of audio files
+    """
+    # One pass over the tree for all extensions, case-insensitive
+    # (see scanner.py)
+    from .scanner import scan_audio_files
+    
+    for record in scan_audio_files(directory, extensions, scan_workers):
+        yield record['path']
+
+
+def find_audio_files(directory, extensions=None, scan_workers=1):
     """
     Find all audio files in a directory and its subdirectories.
     
     This walks through a folder and collects any files that look
-    like audio - MP3, WAV, FLAC, etc.
+    like audio - MP3, WAV, FLAC, etc. (".MP3" counts too!)
     
     Args:
         directory: Folder to search in (e.g., "/music/my_collection")
         extensions: List of extensions to look for. If None, uses defaults.
+        scan_workers: Directories listed in parallel (use 8+ on a NAS)
     
     Returns:
         List of paths to audio files found
@@ -35,29 +69,239 @@ def find_audio_files(directory, extensions=None):
         >>> print(f"Found {len(files)} audio files")
         Found 150 audio files
     """
-    # Default audio file extensions if none specified
-    if extensions is None:
-        extensions = ['.mp3', '.wav', '.flac', '.ogg', '.m4a', '.aiff']
+    return list(iter_audio_files(directory, extensions, scan_workers))
+
+
+def _analyze_files(audio_files, use_cache=True, workers=None, use_tags=False,
+                   decode_profile="quality", feature_store=None):
+    """
+    Analyze a list of tracks on all CPU cores.
+
+    Cached results for unchanged files come back instantly (see
+    audio_analysis/analysis_cache.py); the rest are spread over a
+    process pool (see audio_analysis/batch.py). Results are yielded in
+    completion order as soon as each file is done.
     
-    # Make sure extensions are lowercase
-    extensions = [ext.lower() for ext in extensions]
+    With use_tags, tracks whose key/BPM are already written in their
+    tags are not analyzed at all (see audio_analysis/tag_reader.py).
+    """
+    # Import here to avoid circular imports
+    from audio_analysis.batch import analyze_tracks
+    return analyze_tracks(audio_files, workers=workers, use_cache=use_cache,
+                          use_tags=use_tags, decode_profile=decode_profile,
+                          feature_store=feature_store)
+
+
+def _exclude_folder(audio_files, exclude):
+    """Drop the files that live inside the `exclude` folder."""
+    if exclude is None:
+        return audio_files
+    excluded = Path(exclude).resolve()
+    return (
+        f for f in audio_files
+        if excluded not in Path(f).resolve().parents
+    )
+
+
+def _watch_progress(source, total=None, progress_callback=None, should_stop=None):
+    """
+    Pass analyses through, reporting progress and honouring cancellation.
     
-    audio_files = []
+    Used by the long-running functions below so a GUI (or any caller)
+    can show a progress bar and stop the job halfway. When should_stop()
+    returns True the source is closed, which also cancels the analyses
+    still pending in the process pool.
     
-    # pathlib is modern and handles paths well on all OS
-    path = Path(directory)
+    Args:
+        source: Iterable of analysis dictionaries
+        total: Number of tracks expected (None if not known yet)
+        progress_callback: Optional function(done, total, analysis)
+        should_stop: Optional function returning True to cancel
     
-    # Walk through all folders and files
-    # .rglob finds files recursively (in all subfolders)
-    for ext in extensions:
-        # Find files matching this extension
-        audio_files.extend(path.rglob(f"*{ext}"))
+    Yields:
+        The analyses from source, unchanged
+    """
+    done = 0
+    try:
+        for analysis in source:
+            done += 1
+            if progress_callback is not None:
+                progress_callback(done, total, analysis)
+            yield analysis
+            if should_stop is not None and should_stop():
+                return
+    finally:
+        close = getattr(source, 'close', None)
+        if close is not None:
+            close()
+
+
+def iter_library_analysis(directory, use_cache=True, workers=None, exclude=None,
+                          use_tags=False, scan_workers=1):
+    """
+    Stream the analysis of every track in a library.
+    
+    Files are found, analyzed and yielded one by one, so the first
+    results show up while the rest of the library is still being
+    scanned. Nothing is accumulated here: memory stays flat whatever
+    the library size, and a consumer that stops early (break) also
+    stops the scan and cancels the analyses still pending.
+    
+    Args:
+        directory: Library folder
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        exclude: Folder inside the library to skip (e.g. the output
+                 folder of organize_by_key, which fills up while we scan)
+        use_tags: Take key/BPM from the file tags when present instead of
+                  analyzing the audio
+        scan_workers: Directories listed in parallel (use 8+ on a NAS)
+    
+    Yields:
+        Analysis dictionaries (same shape as analyze_track), in
+        completion order
+    
+    Example:
+        >>> for info in iter_library_analysis("/music"):
+        ...     print(f"{info['file_path']}: {info['camelot']}")
+    """
+    audio_files = _exclude_folder(
+        iter_audio_files(directory, scan_workers=scan_workers), exclude
+    )
     
-    # Convert Path objects to strings for easier handling
-    return [str(f) for f in audio_files]
+    return _analyze_files(audio_files, use_cache, workers, use_tags)
+
+
+def with_library_index(playlist_func, input_directory, use_cache=True, workers=None,
+                       use_tags=True, progress_callback=None, should_stop=None,
+                       **kwargs):
+    """
+    Build a playlist from the library index instead of a full scan.
+    
+    The index of the folder (see library_index.py) is brought up to
+    date first - only new or changed files are analyzed - and the
+    playlist is then answered from it. The first run costs as much as
+    a scan; every later one only looks at what changed.
+    
+    Args:
+        playlist_func: One of the create_*_playlist functions below
+        input_directory: Library folder
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        use_tags: Trust key/BPM tags already in the files
+        progress_callback: Optional function(done, total, analysis)
+        should_stop: Optional function returning True to stop early
+        **kwargs: The other arguments of playlist_func
+    
+    Returns:
+        Whatever playlist_func returns
+    
+    Example:
+        >>> with_library_index(create_harmonic_playlist, "/music",
+        ...                    output_file="8a.m3u", target_key="8A")
+    """
+    from .library_index import get_library_index
+    
+    index = get_library_index(input_directory)
+    print(f"🗂️  Atualizando o índice de {input_directory}...")
+    changes = index.refresh(use_cache=use_cache, workers=workers, use_tags=use_tags,
+                            progress_callback=progress_callback,
+                            should_stop=should_stop)
+    print(f"   {changes['added']} novas, {changes['removed']} removidas, {len(index)} no índice")
+    
+    return playlist_func(input_directory=input_directory, index=index,
+                         use_cache=use_cache, workers=workers, use_tags=use_tags,
+                         progress_callback=progress_callback,
+                         should_stop=should_stop, **kwargs)
+
+
+def place_in_key_folder(file_path, camelot, output_directory, move_files=False,
+                        link_mode="copy"):
+    """
+    Copy (or move, or link) one file into its Camelot key folder.
+    
+    Args:
+        file_path: The audio file
+        camelot: Its Camelot key (e.g., "8A") - also the folder name
+        output_directory: Root of the organized library
+        move_files: Move instead of copy (link_mode is then ignored)
+        link_mode: 'copy', 'auto', 'hardlink', 'reflink' or 'symlink'
+                   (see transfer.py) - links take no extra disk space
+    
+    Returns:
+        Path of the file in its key folder
+    """
+    return _place_file(file_path, camelot, output_directory, move_files, link_mode)[0]
 
 
-def organize_by_key(input_directory, output_directory, move_files=False):
+def _place_file(file_path, camelot, output_directory, move_files, link_mode):
+    """place_in_key_folder() that also says how: (destination, method)."""
+    # Create folder for this key if it doesn't exist
+    key_folder = Path(output_directory) / camelot
+    key_folder.mkdir(parents=True, exist_ok=True)
+    
+    # Build the destination path
+    destination = key_folder / Path(file_path).name
+    
+    # Already copied (e.g. by a run that was interrupted) - don't copy
+    # again. Links left by a link-mode run go to transfer_file(), which
+    # keeps them or replaces them with a real copy depending on the mode.
+    if not move_files and link_mode == 'copy' and _same_file_version(file_path, destination):
+        return destination, 'existing'
+    
+    # Move, or copy/link the file (see transfer.py)
+    if move_files:
+        # Same disk = a rename, no bytes copied
+        same_disk = os.stat(file_path).st_dev == os.stat(key_folder).st_dev
+        if not same_disk and os.path.lexists(destination):
+            # A cross-disk move copies - never through a link left
+            # there by a link-mode run (it would overwrite the original)
+            os.unlink(destination)
+        shutil.move(file_path, destination)
+        return destination, 'rename' if same_disk else 'move'
+    
+    from .transfer import transfer_file
+    return destination, transfer_file(file_path, destination, link_mode)
+
+
+def _transfer_task(file_path, camelot, output_directory, move_files, link_mode):
+    """Runs on a TransferPool thread: place one file and report the cost."""
+    stat = os.stat(file_path)
+    destination, method = _place_file(file_path, camelot, output_directory,
+                                      move_files, link_mode)
+    return {
+        'destination': destination,
+        'method': method,
+        'stat': stat,
+        'bytes': stat.st_size if method in ('copy', 'move') else 0
+    }
+
+
+def _same_file_version(source, destination):
+    """
+    True if destination is a separate copy of source: a regular file
+    (not a symlink, not a hardlink of source) with the same size and
+    mtime. os.stat() follows links, so a link would always match.
+    """
+    if os.path.islink(destination):
+        return False
+    try:
+        src = os.stat(source)
+        dst = os.stat(destination)
+    except OSError:
+        return False
+    return (
+        (src.st_dev, src.st_ino) != (dst.st_dev, dst.st_ino)
+        and src.st_size == dst.st_size
+        and abs(src.st_mtime - dst.st_mtime) <= MTIME_TOLERANCE
+    )
+
+
+def organize_by_key(input_directory, output_directory, move_files=False,
+                    use_cache=True, workers=None, incremental=False,
+                    progress_callback=None, should_stop=None, resume=True,
+                    link_mode="copy", transfer_workers=None,
+                    decode_profile="quality", feature_store=None):
     """
     Organize audio files into folders based on their musical key.
     
@@ -68,13 +312,40 @@ def organize_by_key(input_directory, output_directory, move_files=False):
     1. Find all audio files in the input folder
     2. Analyze each file to detect its key
     3. Create folders for each Camelot key (e.g., "8A", "9B")
-    4. Copy (or move) files into their matching folder
+    4. Copy (or move) files into their matching folder - on a few
+       threads, while the next files are still being analyzed
+    5. Record them in the output folder's library index, so playlists
+       can be built from it without any analysis
     
     Args:
         input_directory: Where to look for audio files
         output_directory: Where to put the organized files
         move_files: If True, removes from original location. 
                     If False, copies (safer - keeps originals!)
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        incremental: Only process files added, modified or renamed since
+                     the last incremental run (see scan_journal.py)
+        progress_callback: Optional function(done, total, analysis) called
+                           after each analyzed track
+        should_stop: Optional function returning True to cancel - files
+                     already organized stay where they are
+        resume: Continue an interrupted or cancelled run from its
+                checkpoint (see organize_job.py). False starts over.
+        link_mode: How files are copied (ignored with move_files):
+                   'copy' (independent copies), 'auto', 'hardlink',
+                   'reflink' or 'symlink' - links build the key folders
+                   in seconds with no extra disk space (see transfer.py)
+        transfer_workers: Files copied at the same time, while the next
+                          tracks are being analyzed (default 4 - more
+                          helps on a NAS)
+        decode_profile: "quality", or "fast" to decode at a lower sample
+                        rate (see audio_analysis/key_detection.py), or
+                        "preview" for a quick provisional first pass -
+                        run refine_organized() afterwards
+        feature_store: Optional FeatureStore that keeps the compact
+                       feature record of every track analyzed (see
+                       audio_analysis/feature_store.py)
     
     Returns:
         Summary dictionary with organizing results
@@ -87,83 +358,341 @@ def organize_by_key(input_directory, output_directory, move_files=False):
     # Make sure output directory exists
     Path(output_directory).mkdir(parents=True, exist_ok=True)
     
-    # Find all audio files
-    audio_files = find_audio_files(input_directory)
-    
     # Track what happened
     results = {
-        "total_files": len(audio_files),
+        "total_files": 0,
         "organized_count": 0,
         "errors": [],
-        "by_key": {}  # Count files per key
+        "by_key": {},  # Count files per key
+        "cancelled": False,
+        "resumed": 0  # Files already done by an interrupted run
     }
     
-    # Import here to avoid circular imports
-    from audio_analysis.key_detection import analyze_track
-    
-    print(f"🔍 Found {len(audio_files)} audio files")
-    
-    for file_path in audio_files:
-        try:
-            # Analyze this track
-            analysis = analyze_track(file_path)
-            
-            # Get the Camelot key (or Unknown)
-            camelot = analysis.get('camelot', 'Unknown')
-            
-            if camelot == 'Unknown':
-                # Skip files we couldn't analyze
+    # Index of the organized library (see library_index.py)
+    from .library_index import get_library_index
+    output_index = get_library_index(output_directory)
+    
+    # Every finished file is checkpointed, so an interrupted run can
+    # pick up where it stopped (see organize_job.py)
+    from .organize_job import OrganizeCheckpoint
+    checkpoint = OrganizeCheckpoint.for_output(output_directory, input_directory)
+    if not resume:
+        checkpoint.clear()
+    
+    finished = set()
+    for record in checkpoint.finished_records():
+        camelot = record['analysis'].get('camelot')
+        finished.add(record['source'])
+        results['total_files'] += 1
+        results['organized_count'] += 1
+        results['resumed'] += 1
+        results['by_key'].setdefault(camelot, []).append(Path(record['destination']).name)
+        # The index may not have been saved before the interruption
+        output_index.add({**record['analysis'], 'file_path': record['destination']})
+    
+    if finished:
+        print(f"⏯️  Retomando: {len(finished)} arquivos já organizados")
+    
+    print(f"🔍 Scanning {input_directory}...")
+    
+    journal = None
+    if incremental:
+        # Only what changed since the last run (moved files keep
+        # their analysis - see scan_journal.py)
+        from .scan_journal import ScanJournal
+        journal = ScanJournal.for_library(input_directory)
+        changes = journal.scan(exclude=output_directory)
+        
+        # A move inside the library only needs a new copy if the
+        # file name changed
+        renamed = [new for old, new in changes['moved']
+                   if Path(old).name != Path(new).name]
+        audio_files = changes['added'] + changes['modified'] + renamed
+        
+        results['changes'] = {
+            'added': len(changes['added']),
+            'modified': len(changes['modified']),
+            'moved': len(changes['moved']),
+            'deleted': len(changes['deleted']),
+            'unchanged': changes['unchanged']
+        }
+        print(f"  📝 {len(changes['added'])} new, {len(changes['modified'])} modified, "
+              f"{len(changes['moved'])} moved, {len(changes['deleted'])} deleted")
+    else:
+        # (the output folder is skipped in case it lives inside the input)
+        audio_files = _exclude_folder(iter_audio_files(input_directory),
+                                      output_directory)
+    
+    if finished:
+        audio_files = (f for f in audio_files if os.path.abspath(f) not in finished)
+    
+    total = None
+    if progress_callback is not None:
+        # A progress bar needs the total up front - listing the folder
+        # is cheap next to analyzing it
+        audio_files = list(audio_files)
+        total = len(audio_files)
+    
+    source = _watch_progress(_analyze_files(audio_files, use_cache, workers,
+                                            decode_profile=decode_profile,
+                                            feature_store=feature_store),
+                             total, progress_callback, should_stop)
+    
+    # Copies run on their own threads (see transfer.py) - this records
+    # the ones that finished
+    from .transfer import TransferPool, DEFAULT_TRANSFER_WORKERS
+    transfers = TransferPool(transfer_workers or DEFAULT_TRANSFER_WORKERS)
+    
+    def record_transfers(finished):
+        for analysis, transfer, error in finished:
+            file_path = analysis['file_path']
+            if error is not None:
+                # Something went wrong with this file
                 results['errors'].append({
                     'file': file_path,
-                    'reason': 'Could not detect key'
+                    'reason': str(error)
                 })
+                if journal is not None:
+                    journal.forget(file_path)
                 continue
             
-            # Create folder for this key if it doesn't exist
-            key_folder = Path(output_directory) / camelot
-            key_folder.mkdir(exist_ok=True)
-            
-            # Get the filename
-            filename = Path(file_path).name
-            
-            # Build the destination path
-            destination = key_folder / filename
+            camelot = analysis['camelot']
+            destination = transfer['destination']
+            filename = destination.name
+            checkpoint.record(file_path, analysis, destination,
+                              moved=move_files, stat=transfer['stat'])
             
-            # Copy or move the file
-            if move_files:
-                shutil.move(file_path, destination)
-            else:
-                shutil.copy2(file_path, destination)
+            # It left the input folder - not part of the snapshot
+            if move_files and journal is not None:
+                journal.forget(file_path)
             
             # Track success
             results['organized_count'] += 1
             
+            # The organized folder gets indexed for free
+            output_index.add({**analysis, 'file_path': str(destination)})
+            
             # Track by key
             if camelot not in results['by_key']:
                 results['by_key'][camelot] = []
             results['by_key'][camelot].append(filename)
             
             print(f"  ✓ {filename} → {camelot}")
-        
-        except Exception as e:
-            # Something went wrong with this file
-            results['errors'].append({
-                'file': file_path,
-                'reason': str(e)
-            })
+    
+    # Each track is handed to the transfer threads as soon as its
+    # analysis is ready
+    try:
+        for analysis in source:
+            file_path = analysis['file_path']
+            results['total_files'] += 1
+            
+            # Get the Camelot key (or Unknown)
+            camelot = analysis.get('camelot', 'Unknown')
+            
+            if camelot == 'Unknown':
+                # Skip files we couldn't analyze
+                results['errors'].append({
+                    'file': file_path,
+                    'reason': 'Could not detect key'
+                })
+                # Retry it on the next incremental run
+                if journal is not None:
+                    journal.forget(file_path)
+                continue
+            
+            record_transfers(transfers.submit(
+                _transfer_task, analysis,
+                file_path, camelot, output_directory, move_files, link_mode
+            ))
+    finally:
+        # Copies already started are finished (and checkpointed)
+        record_transfers(transfers.drain())
+    
+    results['transfer'] = transfers.stats()
+    
+    output_index.save()
+    
+    results['cancelled'] = bool(should_stop is not None and should_stop())
+    
+    # Done - next run starts fresh. A cancelled run keeps its checkpoint.
+    if results['cancelled']:
+        checkpoint.close()
+    else:
+        checkpoint.clear()
+    
+    # Only now is this scan the reference for the next run (a cancelled
+    # run left files unprocessed - they must show up again next time)
+    if journal is not None and not results['cancelled']:
+        journal.commit()
     
     # Print summary
     print(f"\n📊 Summary:")
     print(f"  Total files: {results['total_files']}")
     print(f"  Organized: {results['organized_count']}")
+    if results['resumed']:
+        print(f"  Resumed from checkpoint: {results['resumed']}")
     print(f"  Errors: {len(results['errors'])}")
+    if results['transfer']['mb_per_s']:
+        print(f"  Copied: {results['transfer']['bytes'] / 1e6:.0f} MB "
+              f"at {results['transfer']['mb_per_s']} MB/s")
     print(f"  Keys found: {', '.join(sorted(results['by_key'].keys()))}")
+    if results['cancelled']:
+        print(f"  ⏹️  Cancelled before the end")
+    
+    return results
+
+
+def _free_path(path):
+    """`path`, or "name (2).ext", "name (3).ext"... if it's taken."""
+    path = Path(path)
+    candidate, number = path, 2
+    while os.path.lexists(candidate):
+        candidate = path.with_name(f"{path.stem} ({number}){path.suffix}")
+        number += 1
+    return candidate
+
+
+def refine_organized(output_directory, use_cache=True, workers=None,
+                     progress_callback=None, should_stop=None,
+                     decode_profile="quality"):
+    """
+    Second pass of a quick organize: analyze provisional tracks properly.
+    
+    organize_by_key(..., decode_profile="preview") fills the key folders
+    in a fraction of the time, but its keys and BPMs are provisional
+    (see audio_analysis/preview.py). This re-analyzes those tracks
+    with the full settings, right from the key folders, and:
+    
+    - moves a track to another key folder if its key changed (as
+      "name (2).mp3" if a different track there has the same name)
+    - only updates the library index if just the BPM changed
+    - leaves everything else where it is
+    
+    Every refined track is logged with its confidence delta (printed
+    and appended to REFINEMENT_LOG_FILENAME in the output folder).
+    Cancelling is safe: refined tracks are no longer provisional, so
+    the next run picks up the rest.
+    
+    Args:
+        output_directory: Library organized by organize_by_key()
+        use_cache: Reuse cached full analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        progress_callback: Optional function(done, total, analysis)
+        should_stop: Optional function returning True to cancel
+        decode_profile: Settings of the full analysis ("quality" or "fast")
+    
+    Returns:
+        Summary dictionary: 'refined', 'moved', 'relabeled',
+        'unchanged' counts, 'errors' and 'cancelled'
+    
+    Example:
+        >>> organize_by_key("/downloads", "/music/by_key", decode_profile="preview")
+        >>> refine_organized("/music/by_key")   # e.g. on a background thread
+    """
+    import json
+    import time
+    from .library_index import get_library_index
+    
+    results = {
+        "refined": 0,
+        "moved": 0,
+        "relabeled": 0,
+        "unchanged": 0,
+        "errors": [],
+        "cancelled": False
+    }
+    
+    index = get_library_index(output_directory)
+    provisional = {t['file_path']: t for t in index.query() if t.get('provisional')}
+    if not provisional:
+        print("✅ Nenhuma faixa provisória para refinar")
+        return results
+    
+    print(f"🔬 Refinando {len(provisional)} faixas provisórias...")
+    
+    source = _watch_progress(_analyze_files(list(provisional), use_cache, workers,
+                                            decode_profile=decode_profile),
+                             len(provisional), progress_callback, should_stop)
+    
+    log_path = Path(output_directory) / REFINEMENT_LOG_FILENAME
+    with open(log_path, "a", encoding="utf-8") as log:
+        try:
+            for analysis in source:
+                file_path = analysis['file_path']
+                old = provisional[file_path]
+                camelot = analysis.get('camelot', 'Unknown')
+                
+                if 'error' in analysis or camelot == 'Unknown':
+                    # Stays provisional - retried next time
+                    results['errors'].append({
+                        'file': file_path,
+                        'reason': analysis.get('error', 'Could not detect key')
+                    })
+                    continue
+                
+                destination = file_path
+                renamed = False
+                if camelot != old['camelot']:
+                    # Wrong folder - move it (a rename inside the library),
+                    # never over a different track with the same name
+                    key_folder = Path(output_directory) / camelot
+                    key_folder.mkdir(parents=True, exist_ok=True)
+                    target = _free_path(key_folder / Path(file_path).name)
+                    renamed = target.name != Path(file_path).name
+                    shutil.move(file_path, target)
+                    destination = str(target)
+                    index.remove(file_path)
+                    action = "moved"
+                    try:
+                        # Key folder left empty by a wrong provisional key
+                        os.rmdir(Path(file_path).parent)
+                    except OSError:
+                        pass
+                elif analysis.get('bpm') != old.get('bpm'):
+                    action = "relabeled"
+                else:
+                    action = "unchanged"
+                
+                index.add({**analysis, 'file_path': destination})
+                results['refined'] += 1
+                results[action] += 1
+                
+                delta = (analysis.get('confidence') or 0) - (old.get('confidence') or 0)
+                entry = {
+                    "time": time.time(),
+                    "file": destination,
+                    "action": action,
+                    "camelot": [old['camelot'], camelot],
+                    "bpm": [old.get('bpm'), analysis.get('bpm')],
+                    "confidence_delta": round(delta, 3)
+                }
+                if renamed:
+                    # Another track already had its name in that folder
+                    entry["renamed_from"] = file_path
+                    print(f"  ⚠️  {Path(file_path).name} já existe em {camelot} - "
+                          f"salvo como {Path(destination).name}")
+                log.write(json.dumps(entry) + "\n")
+                log.flush()
+                
+                if action != "unchanged":
+                    print(f"  🔁 {Path(destination).name}: {old['camelot']} → {camelot}, "
+                          f"{old.get('bpm')} → {analysis.get('bpm')} BPM "
+                          f"(confiança {delta:+.2f})")
+        finally:
+            index.save()
+    
+    results['cancelled'] = bool(should_stop is not None and should_stop())
+    
+    print(f"\n📊 Refinamento: {results['refined']} faixas, {results['moved']} movidas, "
+          f"{results['relabeled']} com novo BPM, {results['unchanged']} sem mudança")
     
     return results
 
 
 def create_playlist(input_directory, output_file, target_key=None, 
-                    bpm_range=None, max_songs=20):
+                    bpm_range=None, max_songs=20, use_cache=True,
+                    workers=None, use_tags=True, index=None,
+                    progress_callback=None, should_stop=None):
     """
     Create an M3U playlist of harmonically compatible songs.
     
@@ -178,6 +707,16 @@ def create_playlist(input_directory, output_file, target_key=None,
         target_key: Camelot key to match (e.g., "8A")
         bpm_range: Tuple (min_bpm, max_bpm) to filter by
         max_songs: Maximum songs to include
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        use_tags: Trust key/BPM tags already in the files and only
+                  analyze tracks that lack them (much faster)
+        index: LibraryIndex to answer from (see library_index.py) -
+               when given, the folder is not scanned or analyzed at all
+        progress_callback: Optional function(done, total, analysis) called
+                           for each track looked at (total is None while
+                           the folder is still being scanned)
+        should_stop: Optional function returning True to stop early
     
     Returns:
         List of files in the playlist
@@ -192,53 +731,14 @@ def create_playlist(input_directory, output_file, target_key=None,
         ... )
         >>> print(f"Created playlist with {len(playlist)} songs")
     """
-    # Find all audio files
-    audio_files = find_audio_files(input_directory)
-    
     # Track playlist entries
     playlist = []
     
-    # Import analysis function
-    from audio_analysis.key_detection import analyze_track
     from utils.camelot_map import is_compatible_keys
     
     print(f"🎵 Building playlist...")
     
-    for file_path in audio_files:
-        # Stop if we have enough songs
-        if len(playlist) >= max_songs:
-            break
-        
-        try:
-            # Analyze this track
-            analysis = analyze_track(file_path)
-            
-            track_key = analysis.get('camelot', 'Unknown')
-            track_bpm = analysis.get('bpm', 0)
-            
-            # Skip if we couldn't detect the key
-            if track_key == 'Unknown':
-                continue
-            
-            # Check key compatibility
-            if target_key is not None:
-                if not is_compatible_keys(track_key, target_key):
-                    continue
-            
-            # Check BPM range
-            if bpm_range is not None:
-                min_bpm, max_bpm = bpm_range
-                if track_bpm < min_bpm or track_bpm > max_bpm:
-                    continue
-            
-            # This track passes all filters - add it!
-            playlist.append(file_path)
-            print(f"  ✓ Added: {Path(file_path).name} ({track_key}, {track_bpm} BPM)")
-        
-        except Exception as e:
-            print(f"  ✗ Error analyzing {file_path}: {e}")
-    
-    # Write the playlist file
+    # Write the playlist file as we go
     # M3U format is simple: just absolute paths, one per line
     with open(output_file, 'w', encoding='utf-8') as f:
         # Header (optional but nice)
@@ -247,9 +747,50 @@ def create_playlist(input_directory, output_file, target_key=None,
         f.write(f"# Target Key: {target_key or 'Any'}\n")
         f.write(f"# BPM Range: {bpm_range or 'Any'}\n\n")
         
-        # Write each file path
-        for file_path in playlist:
-            f.write(f"{file_path}\n")
+        if index is not None:
+            # Key and BPM are looked up in the index - no scan needed
+            source = index.query(target_key, bpm_range)
+        else:
+            source = iter_library_analysis(input_directory, use_cache, workers,
+                                           use_tags=use_tags)
+        
+        source = _watch_progress(source, len(source) if index is not None else None,
+                                 progress_callback, should_stop)
+        
+        for analysis in source:
+            file_path = analysis['file_path']
+            try:
+                track_key = analysis.get('camelot', 'Unknown')
+                track_bpm = analysis.get('bpm')
+                
+                # Skip if we couldn't detect the key
+                if track_key == 'Unknown':
+                    continue
+                
+                # Check key compatibility
+                if target_key is not None:
+                    if not is_compatible_keys(track_key, target_key):
+                        continue
+                
+                # Check BPM range (no BPM detected = not in any range)
+                if bpm_range is not None:
+                    min_bpm, max_bpm = bpm_range
+                    if track_bpm is None or not min_bpm <= track_bpm <= max_bpm:
+                        continue
+                
+                # This track passes all filters - add it!
+                playlist.append(file_path)
+                f.write(f"{file_path}\n")
+                f.flush()
+                print(f"  ✓ Added: {Path(file_path).name} ({track_key}, {track_bpm} BPM)")
+            
+            except Exception as e:
+                print(f"  ✗ Error analyzing {file_path}: {e}")
+            
+            # Stop as soon as we have enough songs - the rest of the
+            # library is never scanned or analyzed
+            if len(playlist) >= max_songs:
+                break
     
     print(f"\n✅ Playlist saved to: {output_file}")
     print(f"   Total songs: {len(playlist)}")
@@ -293,7 +834,10 @@ create_harmonic_playlist = create_playlist
 
 def create_harmonic_sequence_playlist(input_directory, output_file, 
                                       start_key, sequence_length=8,
-                                      direction='forward', max_songs_per_key=3):
+                                      direction='forward', max_songs_per_key=3,
+                                      use_cache=True, workers=None,
+                                      use_tags=True, index=None,
+                                      progress_callback=None, should_stop=None):
     """
     Create a playlist following a harmonic sequence path.
     
@@ -308,6 +852,16 @@ def create_harmonic_sequence_playlist(input_directory, output_file,
         sequence_length: How many keys to traverse
         direction: 'forward', 'backward', or 'zigzag'
         max_songs_per_key: Maximum tracks per key in sequence
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        use_tags: Trust key/BPM tags already in the files and only
+                  analyze tracks that lack them (much faster)
+        index: LibraryIndex to answer from (see library_index.py) -
+               when given, the folder is not scanned or analyzed at all
+        progress_callback: Optional function(done, total, analysis) called
+                           for each track looked at (total is None while
+                           the folder is still being scanned)
+        should_stop: Optional function returning True to stop early
     
     Returns:
         List of files in the playlist
@@ -322,29 +876,40 @@ def create_harmonic_sequence_playlist(input_directory, output_file,
         ... )
     """
     from utils.camelot_map import generate_harmonic_sequence
-    from audio_analysis.key_detection import analyze_track
-    
-    # Find all audio files
-    audio_files = find_audio_files(input_directory)
     
     # Generate the key sequence we'll follow
     key_sequence = generate_harmonic_sequence(start_key, sequence_length, direction)
     
     print(f"🎼 Criando playlist com sequência harmônica: {' > '.join(key_sequence)}")
     
-    # Organize files by key
-    files_by_key = {}
-    
-    for file_path in audio_files:
-        try:
-            analysis = analyze_track(file_path)
-            key = analysis.get('camelot', 'Unknown')
-            
-            if key not in files_by_key:
-                files_by_key[key] = []
+    # Organize files by key - only the keys in our sequence, and never
+    # more than max_songs_per_key each
+    files_by_key = {key: [] for key in key_sequence}
+    
+    if index is not None:
+        source = [track for key in key_sequence
+                  for track in index.query(key, compatible=False)]
+    else:
+        source = iter_library_analysis(input_directory, use_cache, workers,
+                                       use_tags=use_tags)
+    
+    source = _watch_progress(source, len(source) if index is not None else None,
+                             progress_callback, should_stop)
+    
+    for analysis in source:
+        file_path = analysis['file_path']
+        if 'error' in analysis:
+            print(f"  ✗ Erro ao analisar {file_path}: {analysis['error']}")
+            continue
+        
+        key = analysis.get('camelot', 'Unknown')
+        
+        if key in files_by_key and len(files_by_key[key]) < max_songs_per_key:
             files_by_key[key].append(file_path)
-        except Exception as e:
-            print(f"  ✗ Erro ao analisar {file_path}: {e}")
+            
+            # Every key of the sequence is full - no need to look further
+            if all(len(files) >= max_songs_per_key for files in files_by_key.values()):
+                break
     
     # Build playlist following the sequence
     playlist = []
@@ -378,7 +943,10 @@ def create_harmonic_sequence_playlist(input_directory, output_file,
 
 
 def create_key_to_key_playlist(input_directory, output_file,
-                               start_key, target_key, max_songs=30):
+                               start_key, target_key, max_songs=30,
+                               use_cache=True, workers=None,
+                               use_tags=True, index=None,
+                               progress_callback=None, should_stop=None):
     """
     Create a playlist that transitions from one key to another.
     
@@ -391,6 +959,16 @@ def create_key_to_key_playlist(input_directory, output_file,
         start_key: Starting Camelot key (e.g., "8A")
         target_key: Target Camelot key (e.g., "3B")
         max_songs: Maximum songs to include
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        use_tags: Trust key/BPM tags already in the files and only
+                  analyze tracks that lack them (much faster)
+        index: LibraryIndex to answer from (see library_index.py) -
+               when given, the folder is not scanned or analyzed at all
+        progress_callback: Optional function(done, total, analysis) called
+                           for each track looked at (total is None while
+                           the folder is still being scanned)
+        should_stop: Optional function returning True to stop early
     
     Returns:
         List of files in the playlist
@@ -404,32 +982,41 @@ def create_key_to_key_playlist(input_directory, output_file,
         ... )
     """
     from utils.camelot_map import get_harmonic_path
-    from audio_analysis.key_detection import analyze_track
-    
-    # Find all audio files
-    audio_files = find_audio_files(input_directory)
     
     # Get the harmonic path from start to target
     path = get_harmonic_path(start_key, target_key)
     
     print(f"🎼 Criando playlist de transição: {' > '.join(path)}")
     
-    # Organize files by key
+    # Organize files by key - only the keys on our path are kept
     files_by_key = {}
     
-    for file_path in audio_files:
-        try:
-            analysis = analyze_track(file_path)
-            key = analysis.get('camelot', 'Unknown')
-            
-            if key not in files_by_key:
-                files_by_key[key] = []
-            files_by_key[key].append({
-                'path': file_path,
-                'bpm': analysis.get('bpm', 0)
-            })
-        except Exception as e:
-            print(f"  ✗ Erro ao analisar {file_path}: {e}")
+    if index is not None:
+        source = [track for key in path
+                  for track in index.query(key, compatible=False)]
+    else:
+        source = iter_library_analysis(input_directory, use_cache, workers,
+                                       use_tags=use_tags)
+    
+    source = _watch_progress(source, len(source) if index is not None else None,
+                             progress_callback, should_stop)
+    
+    for analysis in source:
+        file_path = analysis['file_path']
+        if 'error' in analysis:
+            print(f"  ✗ Erro ao analisar {file_path}: {analysis['error']}")
+            continue
+        
+        key = analysis.get('camelot', 'Unknown')
+        if key not in path:
+            continue
+        
+        if key not in files_by_key:
+            files_by_key[key] = []
+        files_by_key[key].append({
+            'path': file_path,
+            'bpm': analysis.get('bpm') or 0
+        })
     
     # Build playlist following the transition path
     playlist = []
@@ -468,7 +1055,10 @@ def create_key_to_key_playlist(input_directory, output_file,
 
 
 def create_camelot_zone_playlist(input_directory, output_file,
-                                 target_key, zone_size=3, max_songs=50):
+                                 target_key, zone_size=3, max_songs=50,
+                                 use_cache=True, workers=None,
+                                 use_tags=True, index=None,
+                                 progress_callback=None, should_stop=None):
     """
     Create a focused playlist within a Camelot "zone".
     
@@ -481,6 +1071,16 @@ def create_camelot_zone_playlist(input_directory, output_file,
         target_key: Center Camelot key (e.g., "8A")
         zone_size: How wide the zone is (1-3, incompatible at 3+)
         max_songs: Maximum songs to include
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        use_tags: Trust key/BPM tags already in the files and only
+                  analyze tracks that lack them (much faster)
+        index: LibraryIndex to answer from (see library_index.py) -
+               when given, the folder is not scanned or analyzed at all
+        progress_callback: Optional function(done, total, analysis) called
+                           for each track looked at (total is None while
+                           the folder is still being scanned)
+        should_stop: Optional function returning True to stop early
     
     Returns:
         List of files in the playlist
@@ -494,31 +1094,12 @@ def create_camelot_zone_playlist(input_directory, output_file,
         ... )
     """
     from utils.camelot_map import is_compatible_keys
-    from audio_analysis.key_detection import analyze_track
-    
-    # Find all audio files
-    audio_files = find_audio_files(input_directory)
     
     print(f"🎼 Criando playlist de zona compatível: {target_key} (raio {zone_size})")
     
     playlist = []
     
-    for file_path in audio_files:
-        if len(playlist) >= max_songs:
-            break
-        
-        try:
-            analysis = analyze_track(file_path)
-            key = analysis.get('camelot', 'Unknown')
-            
-            # Check if this key is within our zone
-            if is_compatible_keys(key, target_key):
-                playlist.append(file_path)
-                print(f"  ✓ Added: {Path(file_path).name} ({key})")
-        except Exception as e:
-            print(f"  ✗ Erro ao analisar {file_path}: {e}")
-    
-    # Write the playlist file
+    # Write the playlist file as matches arrive
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write("#EXTM3U\n")
         f.write(f"# Camelot Zone Playlist\n")
@@ -526,10 +1107,127 @@ def create_camelot_zone_playlist(input_directory, output_file,
         f.write(f"# Zone Size: {zone_size}\n")
         f.write(f"# All tracks are harmonically compatible!\n\n")
         
+        if index is not None:
+            source = index.query(target_key)
+        else:
+            source = iter_library_analysis(input_directory, use_cache, workers,
+                                           use_tags=use_tags)
+        
+        source = _watch_progress(source, len(source) if index is not None else None,
+                                 progress_callback, should_stop)
+        
+        for analysis in source:
+            file_path = analysis['file_path']
+            try:
+                key = analysis.get('camelot', 'Unknown')
+                
+                # Check if this key is within our zone
+                if is_compatible_keys(key, target_key):
+                    playlist.append(file_path)
+                    f.write(f"{file_path}\n")
+                    f.flush()
+                    print(f"  ✓ Added: {Path(file_path).name} ({key})")
+            except Exception as e:
+                print(f"  ✗ Erro ao analisar {file_path}: {e}")
+            
+            # Enough songs - stop scanning the library
+            if len(playlist) >= max_songs:
+                break
+    
+    print(f"\n✅ Zone playlist saved: {output_file}")
+    print(f"   Total songs: {len(playlist)}")
+    
+    return playlist
+
+
+def create_optimal_set_playlist(input_directory, output_file,
+                               start_key=None, end_key=None, set_length=20,
+                               use_cache=True, workers=None,
+                               use_tags=True, index=None,
+                               progress_callback=None, should_stop=None):
+    """
+    Create the smoothest DJ set the library allows.
+    
+    Instead of walking the Camelot wheel and grabbing any track in each
+    key, this orders the tracks themselves: every transition is scored
+    on key distance, BPM change and energy drop, and a beam search finds
+    a cheap path through the whole library (see set_sequencer.py).
+    
+    Args:
+        input_directory: Folder containing audio files
+        output_file: Where to save the playlist
+        start_key: Camelot key the set opens in (None = any)
+        end_key: Camelot key the set should end in (None = any)
+        set_length: Number of tracks in the set
+        use_cache: Reuse cached analyses of unchanged files
+        workers: Analysis processes (None = one per CPU core)
+        use_tags: Trust key/BPM tags already in the files and only
+                  analyze tracks that lack them (much faster)
+        index: LibraryIndex to answer from (see library_index.py) -
+               when given, the folder is not scanned or analyzed at all
+        progress_callback: Optional function(done, total, analysis) called
+                           for each track looked at (total is None while
+                           the folder is still being scanned)
+        should_stop: Optional function returning True to stop early
+    
+    Returns:
+        List of files in the playlist, in play order
+    
+    Example:
+        >>> playlist = create_optimal_set_playlist(
+        ...     "/music",
+        ...     "/music/set.m3u",
+        ...     start_key="8A",
+        ...     end_key="11A",
+        ...     set_length=15
+        ... )
+    """
+    from .set_sequencer import sequence_set
+    
+    print(f"🎼 Montando set de {set_length} faixas: {start_key or 'qualquer'} > {end_key or 'qualquer'}")
+    
+    if index is not None:
+        source = index.query()
+    else:
+        source = iter_library_analysis(input_directory, use_cache, workers,
+                                       use_tags=use_tags)
+    
+    source = _watch_progress(source, len(source) if index is not None else None,
+                             progress_callback, should_stop)
+    
+    # Only what the sequencer needs - a big library stays small in memory
+    tracks = []
+    for analysis in source:
+        if 'error' in analysis:
+            print(f"  ✗ Erro ao analisar {analysis['file_path']}: {analysis['error']}")
+            continue
+        tracks.append({
+            'file_path': analysis['file_path'],
+            'camelot': analysis.get('camelot', 'Unknown'),
+            'bpm': analysis.get('bpm'),
+            'bpm_exact': analysis.get('bpm_exact'),
+            'loudness': analysis.get('loudness')
+        })
+    
+    ordered = sequence_set(tracks, length=set_length,
+                           start_key=start_key, end_key=end_key)
+    
+    playlist = []
+    for track in ordered:
+        playlist.append(track['file_path'])
+        print(f"  ✓ Added: {Path(track['file_path']).name} ({track['camelot']}, {track['bpm']} BPM)")
+    
+    # Write the playlist file
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("#EXTM3U\n")
+        f.write(f"# Optimal DJ Set\n")
+        f.write(f"# Keys: {' > '.join(track['camelot'] for track in ordered)}\n")
+        f.write(f"# Start: {start_key or 'Any'} > End: {end_key or 'Any'}\n\n")
+        
         for file_path in playlist:
             f.write(f"{file_path}\n")
     
-    print(f"\n✅ Zone playlist saved: {output_file}")
+    print(f"\n✅ Set playlist saved: {output_file}")
     print(f"   Total songs: {len(playlist)}")
     
-    return playlist
\ No newline at end of file
+    return playlist
@@ -0,0 +1,268 @@
+"""
+Organize Jobs - Picking Up Where We Left Off
+
+Organizing 40k tracks takes a while, and a crash, a power cut or a
+Ctrl+C halfway through shouldn't mean starting again from file one.
+
+While organize_by_key() runs, every finished file is written to a
+checkpoint in the output folder: where it came from (with size and
+mtime), where it went and its analysis. When the job is started again
+with the same input folder:
+
+- files in the checkpoint that didn't change are skipped - no analysis,
+  no copy - and their destination is put back in the library index
+- a file that was already copied (same size and mtime at the
+  destination) is not copied again, even if the job died before it
+  reached the checkpoint
+- once the job completes, the checkpoint is deleted
+
+The checkpoint is a JSON Lines file: one line per file, so saving
+progress is a cheap append instead of rewriting the whole thing. Its
+first line names the input folder; a checkpoint left by a job with
+another input folder is ignored and replaced.
+
+Run it from the command line (Ctrl+C cancels cleanly, run it again to
+resume):
+    python -m file_manager.organize_job --input ~/Downloads --output ~/Music/by_key
+
+With --quick the key folders are filled first from a provisional
+preview of every track, then the same command refines them (see
+organizaer.refine_organized). An interrupted refinement continues with:
+    python -m file_manager.organize_job --output ~/Music/by_key --refine
+"""
+
+import os
+import json
+from pathlib import Path
+
+
+# Nome do arquivo de checkpoint na pasta de saída
+CHECKPOINT_FILENAME = ".dj_organize_checkpoint.jsonl"
+
+
+class OrganizeCheckpoint:
+    """
+    Append-only record of the files an organize job already finished.
+
+    Args:
+        checkpoint_path: JSON Lines file holding the progress
+        input_root: Input folder of the job (None = accept a checkpoint
+                    of any job). A checkpoint written for another input
+                    folder is ignored, and overwritten on the first record.
+    """
+
+    def __init__(self, checkpoint_path, input_root=None):
+        self.checkpoint_path = Path(checkpoint_path)
+        self.input_root = os.path.abspath(input_root) if input_root else None
+        self._stale = False   # on disk, but from another job
+        self._records = self._load()
+        self._file = None
+
+    @classmethod
+    def for_output(cls, output_directory, input_directory=None):
+        """Checkpoint stored in the output folder of the job."""
+        return cls(Path(output_directory) / CHECKPOINT_FILENAME, input_directory)
+
+    def _load(self):
+        records = {}
+        if not self.checkpoint_path.exists():
+            return records
+
+        root = None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Last line cut short by a crash - that file is redone
+                    continue
+                if "input_root" in record:
+                    root = record["input_root"]
+                    continue
+                records[record["source"]] = record
+
+        if self.input_root is not None and root != self.input_root:
+            # Same output folder, different input: none of it applies
+            print(f"⚠️  Checkpoint de outra pasta de entrada ({root}) - ignorado")
+            self._stale = True
+            return {}
+        return records
+
+    def __len__(self):
+        return len(self._records)
+
+    def finished_records(self):
+        """
+        Records of the files that don't need to be processed again.
+
+        A copied file counts as finished if its source still has the
+        same size and mtime; a moved file if it is still at its
+        destination.
+
+        Returns:
+            List of checkpoint records ('source', 'destination', 'analysis', ...)
+        """
+        finished = []
+        for source, record in self._records.items():
+            if not os.path.exists(record["destination"]):
+                continue
+            try:
+                stat = os.stat(source)
+            except OSError:
+                # Source gone: fine for a move, it's at the destination now
+                if record.get("moved"):
+                    finished.append(record)
+                continue
+            if stat.st_size == record["size"] and stat.st_mtime == record["mtime"]:
+                finished.append(record)
+        return finished
+
+    def record(self, file_path, analysis, destination, moved=False, stat=None):
+        """
+        Remember one finished file (appended and flushed right away).
+
+        Args:
+            file_path: Source file
+            analysis: Its analysis dictionary
+            destination: Where it was copied/moved to
+            moved: True if the source was moved (it no longer exists)
+            stat: os.stat() of the source taken before a move
+        """
+        if stat is None:
+            stat = os.stat(file_path)
+
+        record = {
+            "source": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "destination": str(destination),
+            "moved": moved,
+            "analysis": {k: v for k, v in analysis.items() if k != "file_path"},
+        }
+
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+        self._records[record["source"]] = record
+
+    def _open(self):
+        """Open the checkpoint for appending - a new or stale one starts
+        over with the input folder on its first line."""
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = self._stale or not self.checkpoint_path.exists()
+        self._file = open(self.checkpoint_path, "w" if fresh else "a", encoding="utf-8")
+        if fresh:
+            self._file.write(json.dumps({"input_root": self.input_root}) + "\n")
+        self._stale = False
+
+    def close(self):
+        """Close the checkpoint file (the progress stays on disk)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        """Delete the checkpoint - the job is complete."""
+        self.close()
+        self._records = {}
+        self._stale = False
+        try:
+            self.checkpoint_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    """Command-line entry point: python -m file_manager.organize_job"""
+    import argparse
+    import signal
+    import threading
+    from .organizaer import organize_by_key, refine_organized
+    from .transfer import LINK_MODES
+
+    parser = argparse.ArgumentParser(
+        description="Organize a music folder by key (resumable - Ctrl+C to stop)"
+    )
+    parser.add_argument('--input', help='Folder with music')
+    parser.add_argument('--output', required=True, help='Organized library folder')
+    parser.add_argument('--move', action='store_true',
+                        help='Move files instead of copying (removes originals)')
+    parser.add_argument('--link', choices=LINK_MODES, default='copy',
+                        help='copy, or link instead of copying: auto, hardlink, '
+                             'reflink, symlink (default: copy)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only files that changed since the last incremental run')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore an unfinished job and start from scratch')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Analysis processes (default: one per CPU core)')
+    parser.add_argument('--fast', action='store_true',
+                        help='Decode at a lower sample rate (faster, see key_detection.py)')
+    parser.add_argument('--transfers', type=int, default=None,
+                        help='Files copied at the same time (default: 4, more for a NAS)')
+    parser.add_argument('--quick', action='store_true',
+                        help='Fill the key folders from a quick provisional preview '
+                             'first, then refine them with the full analysis')
+    parser.add_argument('--refine', action='store_true',
+                        help='Only refine the provisional tracks of --output')
+    parser.add_argument('--features', action='store_true',
+                        help='Also keep compact audio features of every track in the '
+                             'output folder (see audio_analysis/feature_store.py)')
+    args = parser.parse_args()
+    if not args.input and not args.refine:
+        parser.error("--input is required (unless --refine)")
+
+    full_profile = 'fast' if args.fast else 'quality'
+
+    feature_store = None
+    if args.features:
+        from audio_analysis.feature_store import FeatureStore
+        feature_store = FeatureStore.for_library(args.output)
+
+    # First Ctrl+C: finish the current file and stop (progress is kept).
+    # Second Ctrl+C: stop right now.
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        if stop.is_set():
+            raise KeyboardInterrupt
+        print("\n⏹️  Parando após o arquivo atual... (Ctrl+C de novo para forçar)")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+
+    if not args.refine:
+        results = organize_by_key(
+            args.input, args.output,
+            move_files=args.move,
+            workers=args.workers,
+            incremental=args.incremental,
+            resume=not args.restart,
+            link_mode=args.link,
+            transfer_workers=args.transfers,
+            decode_profile='preview' if args.quick else full_profile,
+            feature_store=feature_store,
+            should_stop=stop.is_set
+        )
+
+        if results['cancelled']:
+            print("💾 Progresso salvo - rode o mesmo comando para continuar")
+            return 1
+        if not args.quick:
+            return 0
+        print("\n📁 Pastas prontas (tonalidades provisórias) - refinando...")
+
+    refined = refine_organized(args.output, workers=args.workers,
+                               decode_profile=full_profile,
+                               should_stop=stop.is_set)
+
+    if refined['cancelled']:
+        print("💾 Progresso salvo - continue com --refine")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,198 @@
+"""
+Scan Journal - What Changed Since Last Time?
+
+A nightly organize job over 40k tracks shouldn't reprocess 40k tracks
+when only a few hundred are new. The journal remembers the last scan
+of a library (path, size, mtime, inode for every file) and compares
+the next scan against it:
+
+- added:    path we've never seen
+- modified: same path, different size or mtime
+- moved:    old path gone, new path with the same inode and size
+            (a rename or a move inside the same disk)
+- deleted:  path gone and not moved anywhere
+
+Moved files keep their analysis: the analysis cache entry is renamed
+instead of re-analyzing the file.
+
+The snapshot is only saved when commit() is called, so if a run
+crashes halfway the next run sees the same changes again.
+
+Example:
+    >>> journal = ScanJournal.for_library("/music/inbox")
+    >>> changes = journal.scan()
+    >>> print(len(changes['added']), "new files")
+    >>> ...process them...
+    >>> journal.commit()
+"""
+
+import os
+import json
+from pathlib import Path
+
+from .scanner import scan_audio_files
+
+
+# Nome do arquivo de snapshot na raiz da biblioteca
+SNAPSHOT_FILENAME = ".dj_scan_snapshot.json"
+
+
+def diff_snapshots(old, new):
+    """
+    Compare two snapshots.
+
+    Args:
+        old: {path: {'size', 'mtime', 'inode'}} from the previous scan
+        new: Same shape, from the current scan
+
+    Returns:
+        Dictionary with lists 'added', 'modified', 'deleted', 'moved'
+        (moved = list of (old_path, new_path) tuples) and the
+        'unchanged' count
+
+    Example:
+        >>> old = {"a.mp3": {"size": 10, "mtime": 1.0, "inode": 42}}
+        >>> new = {"b.mp3": {"size": 10, "mtime": 1.0, "inode": 42}}
+        >>> diff_snapshots(old, new)["moved"]
+        [('a.mp3', 'b.mp3')]
+    """
+    added = [path for path in new if path not in old]
+    gone = [path for path in old if path not in new]
+
+    modified = []
+    unchanged = 0
+    for path, record in new.items():
+        previous = old.get(path)
+        if previous is None:
+            continue
+        if previous["size"] != record["size"] or previous["mtime"] != record["mtime"]:
+            modified.append(path)
+        else:
+            unchanged += 1
+
+    # A vanished file whose inode (and size) shows up under a new path
+    # was moved/renamed, not deleted
+    gone_by_inode = {
+        (old[path]["inode"], old[path]["size"]): path
+        for path in gone if old[path].get("inode")
+    }
+    moved = []
+    still_added = []
+    for path in added:
+        record = new[path]
+        old_path = gone_by_inode.pop((record.get("inode"), record["size"]), None)
+        if old_path is not None:
+            moved.append((old_path, path))
+        else:
+            still_added.append(path)
+
+    moved_from = {old_path for old_path, _ in moved}
+    deleted = [path for path in gone if path not in moved_from]
+
+    return {
+        "added": still_added,
+        "modified": modified,
+        "deleted": deleted,
+        "moved": moved,
+        "unchanged": unchanged,
+    }
+
+
+class ScanJournal:
+    """
+    Remembers the last scan of a library and reports what changed.
+
+    Args:
+        snapshot_path: JSON file holding the last committed snapshot
+        library_root: Library folder to scan
+    """
+
+    def __init__(self, snapshot_path, library_root):
+        self.snapshot_path = Path(snapshot_path)
+        self.library_root = library_root
+        self._previous = self._load()
+        self._current = None
+
+    @classmethod
+    def for_library(cls, directory, snapshot_path=None):
+        """Journal stored in the library root (or at snapshot_path)."""
+        return cls(snapshot_path or Path(directory) / SNAPSHOT_FILENAME, directory)
+
+    def _load(self):
+        if not self.snapshot_path.exists():
+            return {}
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Snapshot inválido, fazendo scan completo: {e}")
+            return {}
+
+    @property
+    def is_first_scan(self):
+        """True when there is no previous snapshot to compare with."""
+        return not self._previous
+
+    def scan(self, scan_workers=1, exclude=None, analysis_cache=None):
+        """
+        Scan the library and compare it with the last committed snapshot.
+
+        Args:
+            scan_workers: Directories listed in parallel (see scanner.py)
+            exclude: Folder inside the library to ignore
+            analysis_cache: AnalysisCache whose entries follow moved files
+                            (None = the shared default cache)
+
+        Returns:
+            Changes dictionary (see diff_snapshots)
+        """
+        excluded = Path(exclude).resolve() if exclude is not None else None
+
+        current = {}
+        for record in scan_audio_files(self.library_root, workers=scan_workers):
+            path = record["path"]
+            if excluded is not None and excluded in Path(path).resolve().parents:
+                continue
+            current[path] = {
+                "size": record["size"],
+                "mtime": record["mtime"],
+                "inode": record["inode"],
+            }
+
+        self._current = current
+        changes = diff_snapshots(self._previous, current)
+
+        # Moved files keep their analysis
+        if changes["moved"]:
+            if analysis_cache is None:
+                from audio_analysis.analysis_cache import get_default_cache
+                analysis_cache = get_default_cache()
+            if analysis_cache is not None:
+                for old_path, new_path in changes["moved"]:
+                    analysis_cache.rename(old_path, new_path)
+
+        return changes
+
+    def forget(self, file_path):
+        """
+        Leave a file out of the snapshot being committed.
+
+        Use it for files that failed (so they're retried next run) or
+        that were moved out of the library.
+        """
+        if self._current is not None:
+            self._current.pop(file_path, None)
+
+    def commit(self):
+        """Save the last scan as the new reference snapshot."""
+        if self._current is None:
+            return
+
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self._current}, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+        self._previous = self._current
+        self._current = None
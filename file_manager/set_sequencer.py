@@ -0,0 +1,295 @@
+"""
+Set Sequencer - Ordering a DJ Set as a Path Through the Library
+
+The other playlist builders pick KEYS first (a walk around the Camelot
+wheel) and then fill each key with whatever tracks come first on disk.
+Here every track is a stop on a map, and going from one track to the
+next has a cost:
+
+- key: 0 for the same key, 1 for a neighbour on the wheel (7A/9A, or
+  the relative 8B) - other keys are never mixed into each other
+- BPM: how much the pitch fader has to move, in percent
+- energy: how much quieter the next track is (sets should build up,
+  not sag)
+
+A good set is a cheap path of N tracks that never visits a track
+twice. Finding the very cheapest one is the travelling salesman
+problem, so we use beam search instead: grow the best few hundred
+partial sets one track at a time and keep only the cheapest.
+
+It scales to huge libraries because nothing ever compares every track
+with every other one (50k tracks would be 2.5 billion pairs). A track
+can only be followed by tracks in a compatible key within the pitch
+range, and the index keeps each key's tracks sorted by BPM - so the
+candidates for "what comes after this track" are found with a binary
+search, and only the few best are kept (see NeighborIndex).
+
+Example:
+    >>> tracks = get_library_index("/music").query()
+    >>> for track in sequence_set(tracks, length=12, start_key="8A", end_key="11A"):
+    ...     print(track['camelot'], track['bpm'], track['file_path'])
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+
+
+# Edge cost weights: one step around the wheel costs as much as
+# moving the pitch fader by KEY_WEIGHT / BPM_WEIGHT percent (4%)
+KEY_WEIGHT = 1.0
+BPM_WEIGHT = 0.25      # per % of BPM change
+ENERGY_WEIGHT = 0.1    # per dB the next track is quieter
+
+# Pitch range of a typical deck (+/- 8%) - tracks further apart in
+# BPM are never considered for a transition
+BPM_TOLERANCE = 0.08
+
+# Transitions kept per track, and partial sets kept per step
+NEIGHBORS_PER_TRACK = 12
+BEAM_WIDTH = 64
+
+# Extra cost per key step the set is still away from end_key when it
+# has too few tracks left to get there
+END_KEY_PENALTY = 10.0
+
+
+def _parse_camelot(code):
+    """("8A") -> (8, "A"), or None for anything that isn't a Camelot code."""
+    try:
+        number, letter = int(code[:-1]), code[-1]
+    except (TypeError, ValueError, IndexError):
+        return None
+    if not 1 <= number <= 12 or letter not in "AB":
+        return None
+    return number, letter
+
+
+def key_distance(key1, key2):
+    """
+    Harmonic mixes needed to get from one Camelot key to another.
+
+    Every mix moves one hour around the wheel or swaps A/B at the same
+    hour (see utils.camelot_map.get_harmonic_mixes), so this is the
+    shortest route in those moves.
+
+    Args:
+        key1: Camelot code like "8A"
+        key2: Camelot code like "11B"
+
+    Returns:
+        Number of mixes (0 = same key), or None if a code is invalid
+
+    Example:
+        >>> key_distance("8A", "9A"), key_distance("8A", "8B"), key_distance("8A", "11B")
+        (1, 1, 4)
+    """
+    a, b = _parse_camelot(key1), _parse_camelot(key2)
+    if a is None or b is None:
+        return None
+    steps = abs(a[0] - b[0])
+    return min(steps, 12 - steps) + (a[1] != b[1])
+
+
+def transition_cost(track, next_track):
+    """
+    Cost of mixing from one track into the next (lower is smoother).
+
+    Args:
+        track: Track record with 'camelot', 'bpm' and optionally
+               'loudness' (see analyze_track / LibraryIndex.query)
+        next_track: The track that comes next
+
+    Returns:
+        KEY_WEIGHT * key distance + BPM_WEIGHT * BPM change in percent
+        + ENERGY_WEIGHT * energy drop in dB (tracks without a loudness
+        are not charged for energy)
+    """
+    bpm = track.get("bpm_exact") or track["bpm"]
+    next_bpm = next_track.get("bpm_exact") or next_track["bpm"]
+
+    cost = KEY_WEIGHT * key_distance(track["camelot"], next_track["camelot"])
+    cost += BPM_WEIGHT * abs(next_bpm - bpm) / bpm * 100
+
+    loudness = track.get("loudness")
+    next_loudness = next_track.get("loudness")
+    if loudness is not None and next_loudness is not None:
+        cost += ENERGY_WEIGHT * max(0.0, loudness - next_loudness)
+
+    return cost
+
+
+class NeighborIndex:
+    """
+    The few best transitions out of every track, without an N x N matrix.
+
+    Tracks are bucketed by Camelot key and sorted by BPM once. The
+    candidates after a track are the tracks of its compatible keys
+    inside the pitch range - a binary search per key - of which only
+    the cheapest few per key are kept (`neighbors` in total). Neighbour lists are worked out
+    the first time a track is reached and remembered, so a search only
+    pays for the tracks it actually visits.
+
+    Tracks without a known key or BPM can't be mixed into and are left
+    out.
+
+    Args:
+        tracks: Track records (see LibraryIndex.query)
+        neighbors: Transitions kept per track
+        bpm_tolerance: Largest BPM change considered (0.08 = 8%)
+    """
+
+    def __init__(self, tracks, neighbors=NEIGHBORS_PER_TRACK, bpm_tolerance=BPM_TOLERANCE):
+        self.tracks = [
+            t for t in tracks
+            if t.get("bpm") and _parse_camelot(t.get("camelot")) is not None
+        ]
+        self.neighbors_per_track = neighbors
+        self.bpm_tolerance = bpm_tolerance
+        self._neighbors = {}   # track number -> [(cost, track number), ...]
+
+        # camelot -> (sorted BPMs, track numbers in the same order)
+        by_key = {}
+        for i, track in enumerate(self.tracks):
+            by_key.setdefault(track["camelot"], []).append((self._bpm(i), i))
+        self._buckets = {}
+        for key, entries in by_key.items():
+            entries.sort()
+            self._buckets[key] = ([bpm for bpm, _ in entries], [i for _, i in entries])
+
+    def _bpm(self, i):
+        track = self.tracks[i]
+        return track.get("bpm_exact") or track["bpm"]
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def in_key(self, camelot):
+        """Track numbers of one Camelot key, slowest first."""
+        return list(self._buckets.get(camelot, ((), ()))[1])
+
+    def neighbors(self, i):
+        """
+        Cheapest transitions out of track number i.
+
+        Returns:
+            List of (cost, track number), cheapest first
+        """
+        cached = self._neighbors.get(i)
+        if cached is not None:
+            return cached
+
+        from utils.camelot_map import get_harmonic_mixes
+
+        track = self.tracks[i]
+        bpm = self._bpm(i)
+        low, high = bpm * (1 - self.bpm_tolerance), bpm * (1 + self.bpm_tolerance)
+
+        # The same number of transitions into every compatible key -
+        # in a big library the cheapest ones would all stay in the
+        # same key, and the set could never move around the wheel
+        mixes = get_harmonic_mixes(track["camelot"])
+        per_key = max(1, -(-self.neighbors_per_track // len(mixes)))
+
+        best = []
+        for key in mixes:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            bpms, numbers = bucket
+
+            # Inside the pitch range - and in a crowded key only the
+            # closest BPMs, a few times more than we'll keep
+            start, end = bisect_left(bpms, low), bisect_right(bpms, high)
+            limit = 4 * per_key
+            if end - start > limit:
+                middle = bisect_left(bpms, bpm, start, end)
+                start = max(start, min(middle - limit // 2, end - limit))
+                end = start + limit
+
+            best.extend(heapq.nsmallest(per_key, (
+                (transition_cost(track, self.tracks[j]), j)
+                for j in numbers[start:end] if j != i
+            )))
+
+        best.sort()
+        self._neighbors[i] = best
+        return best
+
+
+def sequence_set(tracks, length=20, start_key=None, end_key=None,
+                 beam_width=BEAM_WIDTH, neighbors=NEIGHBORS_PER_TRACK, index=None):
+    """
+    Find a smooth N-track DJ set with beam search.
+
+    Args:
+        tracks: Track records (see LibraryIndex.query) - ignored when
+                `index` is given
+        length: Tracks in the set
+        start_key: Camelot key the set opens in (None = any)
+        end_key: Camelot key the set should finish in (None = any)
+        beam_width: Partial sets kept per step - higher finds cheaper
+                    sets but takes longer
+        neighbors: Transitions considered per track
+        index: NeighborIndex to reuse between calls (built from
+               `tracks` when None)
+
+    Returns:
+        List of track records in play order - shorter than `length`
+        if the library runs out of compatible tracks
+
+    Example:
+        >>> sequence_set(index.query(), length=3, start_key="8A")
+        [{'camelot': '8A', 'bpm': 122, ...}, {'camelot': '8A', 'bpm': 123, ...},
+         {'camelot': '9A', 'bpm': 124, ...}]
+    """
+    if index is None:
+        index = NeighborIndex(tracks, neighbors)
+    if not len(index) or length < 1:
+        return []
+
+    def end_penalty(i, remaining):
+        # Every step still to go to end_key costs at least KEY_WEIGHT,
+        # so charge it now - otherwise the beam settles in the opening
+        # key and finds out too late. Steps the tracks left can't
+        # cover cost END_KEY_PENALTY on top.
+        if end_key is None:
+            return 0.0
+        steps = key_distance(index.tracks[i]["camelot"], end_key)
+        if steps is None:
+            return 0.0
+        return KEY_WEIGHT * steps + END_KEY_PENALTY * max(0, steps - remaining)
+
+    # Openers: the quietest, slowest tracks - a set builds up from there
+    if start_key is not None:
+        openers = index.in_key(start_key)
+    else:
+        openers = range(len(index))
+    openers = heapq.nsmallest(
+        beam_width, openers,
+        key=lambda i: (end_penalty(i, length - 1),
+                       index.tracks[i].get("loudness") or 0.0,
+                       index._bpm(i))
+    )
+    if not openers:
+        return []
+
+    # Each entry: (cost so far, set so far)
+    beam = [(0.0, [i]) for i in openers]
+    for step in range(1, length):
+        remaining = length - 1 - step
+        expansions = []
+        for cost, path in beam:
+            used = set(path)
+            for edge, j in index.neighbors(path[-1]):
+                if j not in used:
+                    expansions.append((cost + edge, path + [j]))
+        if not expansions:
+            break  # Nowhere left to go from any of the sets
+
+        beam = heapq.nsmallest(
+            beam_width, expansions,
+            key=lambda e: e[0] + end_penalty(e[1][-1], remaining)
+        )
+
+    _, best = min(beam, key=lambda e: e[0] + end_penalty(e[1][-1], 0))
+    return [index.tracks[i] for i in best]
@@ -0,0 +1,352 @@
+"""
+File Transfer - Putting Tracks in Their Key Folders Without Copying
+
+Copying a 400 GB library into Camelot folders doubles the disk usage
+and takes hours of pure I/O. Most of the time we don't need a second
+copy of the bytes at all, just a second name for the same file:
+
+- hardlink: another directory entry for the same file (same disk only).
+            Instant, no extra space. Editing the tags in one place
+            changes both.
+- reflink:  a copy-on-write clone (btrfs, XFS, APFS-style filesystems).
+            Instant, no extra space until one side is modified - then
+            they become independent copies.
+- symlink:  a pointer to the original path. Works across disks, but
+            breaks if the original is moved or deleted.
+- copy:     a real, independent copy (the old behaviour).
+- auto:     reflink, then hardlink, then copy - the first that works.
+
+Whatever mode is asked for, if the filesystem can't do it we fall back
+to a plain copy, so organizing never fails because of the link mode.
+
+Copies themselves are done by the kernel (copy_file_range / sendfile):
+the bytes never pass through Python, and on NFS 4.2 / SMB3 shares the
+NAS can copy server-side without sending them over the network.
+
+TransferPool runs several transfers at once on a few threads - one copy
+stream rarely saturates a NAS link - while the caller keeps analyzing.
+
+Example:
+    >>> transfer_file("/music/a.mp3", "/music/by_key/8A/a.mp3", mode="auto")
+    'hardlink'
+"""
+
+import os
+import time
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Windows
+    FCNTL_AVAILABLE = False
+
+
+# Modes accepted by transfer_file()
+LINK_MODES = ("copy", "auto", "hardlink", "reflink", "symlink")
+
+# ioctl number of FICLONE on Linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+# Transfers running at the same time (good for NAS targets, harmless locally)
+DEFAULT_TRANSFER_WORKERS = 4
+
+# Bytes per kernel copy call / per read when copying in Python
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _kernel_copy(src_fd, dst_fd, size):
+    """
+    Copy size bytes between file descriptors inside the kernel.
+
+    Returns:
+        True if all size bytes were copied, False if neither
+        copy_file_range nor sendfile can be used for these files
+        (nothing was copied then)
+
+    Raises:
+        OSError: The copy stopped halfway
+    """
+    for name in ("copy_file_range", "sendfile"):
+        call = getattr(os, name, None)
+        if call is None:
+            continue
+
+        copied = 0
+        try:
+            while copied < size:
+                if name == "copy_file_range":
+                    sent = call(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied))
+                else:
+                    sent = call(dst_fd, src_fd, copied, min(COPY_CHUNK_SIZE, size - copied))
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError:
+            if copied:
+                # Failed halfway - a real error, not "unsupported"
+                raise
+            continue
+
+        if copied == size:
+            return True
+        if copied == 0:
+            # Some filesystems (procfs, FUSE, NFS, overlayfs...) answer
+            # 0 instead of an error when they can't do it - try the next
+            # way, like shutil does
+            continue
+        raise OSError(f"{name} stopped after {copied} of {size} bytes")
+
+    return False
+
+
+def copy_file(source, destination):
+    """
+    Same result as shutil.copy2(), with the bytes copied by the kernel.
+
+    The copy is written to a temporary file next to destination and
+    renamed over it, so an existing destination is replaced, never
+    written into (it may be a link to another file), and a failed copy
+    never leaves a truncated file behind.
+
+    Args:
+        source: Existing file
+        destination: New file (replaced if it exists)
+    """
+    folder, name = os.path.split(os.path.abspath(destination))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".part", dir=folder)
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            size = os.fstat(src.fileno()).st_size
+            if not _kernel_copy(src.fileno(), dst.fileno(), size):
+                shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+        shutil.copystat(source, tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def reflink(source, destination):
+    """
+    Clone a file copy-on-write (Linux FICLONE ioctl).
+
+    Raises:
+        OSError: The filesystem (or OS) doesn't support it
+    """
+    if not FCNTL_AVAILABLE:
+        raise OSError("reflink not supported on this platform")
+
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(destination)
+            raise
+
+    # Keep the original modification time, like copy2()
+    shutil.copystat(source, destination)
+
+
+def _already_there(source, destination):
+    """True if destination is already a link to (or clone of) source."""
+    try:
+        return os.path.samefile(source, destination)
+    except OSError:
+        return False
+
+
+def transfer_file(source, destination, mode="copy"):
+    """
+    Give `source` a second name at `destination`.
+
+    Args:
+        source: Existing file
+        destination: New path (replaced if it exists)
+        mode: One of LINK_MODES (see the top of this module)
+
+    Returns:
+        The method actually used: 'hardlink', 'reflink', 'symlink',
+        'copy' - or 'existing' if destination already was that file
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {mode} (use one of {', '.join(LINK_MODES)})")
+
+    if _already_there(source, destination):
+        if mode != "copy":
+            return "existing"
+        # A link left by an earlier run - replace it with a real copy
+        os.unlink(destination)
+
+    if mode == "auto":
+        attempts = ("reflink", "hardlink")
+    elif mode == "copy":
+        attempts = ()
+    else:
+        attempts = (mode,)
+
+    for method in attempts:
+        if os.path.lexists(destination):
+            os.unlink(destination)
+        try:
+            if method == "hardlink":
+                os.link(source, destination)
+            elif method == "reflink":
+                reflink(source, destination)
+            else:
+                os.symlink(os.path.abspath(source), destination)
+            return method
+        except OSError:
+            # Different disk, unsupported filesystem, no permission...
+            continue
+
+    # Never copy INTO an existing entry: it may be a hardlink or a
+    # symlink to some other original (left by an earlier run in a
+    # link mode), and writing through it would overwrite that file
+    if os.path.lexists(destination):
+        os.unlink(destination)
+    copy_file(source, destination)
+    return "copy"
+
+
+class TransferPool:
+    """
+    Runs file transfers on a bounded thread pool.
+
+    Copying is I/O, not CPU, so threads are enough - and while they wait
+    on the disk the caller keeps feeding analyses in. At most
+    max_in_flight transfers are queued at once, so a fast analysis
+    stage can't pile up thousands of pending copies.
+
+    Each task is a function returning a dictionary; its 'method' and
+    'bytes' entries (if any) go into the throughput stats.
+
+    Args:
+        workers: Transfers running at the same time
+        max_in_flight: Max transfers queued or running (default 2 x workers)
+
+    Example:
+        >>> pool = TransferPool(workers=4)
+        >>> for context, result, error in pool.submit(task, "a.mp3", "a.mp3"):
+        ...     print("finished", context)
+        >>> finished = pool.drain()
+        >>> print(pool.stats()['mb_per_s'])
+    """
+
+    def __init__(self, workers=DEFAULT_TRANSFER_WORKERS, max_in_flight=None):
+        self.workers = max(1, workers)
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._in_flight = {}   # future -> context
+        self._busy = []        # (start, end) of every transfer
+        self.files = 0
+        self.bytes = 0
+        self.methods = {}
+
+    def submit(self, task, context, *args):
+        """
+        Queue one transfer (waits while the pool is full).
+
+        Args:
+            task: Function run on a pool thread with *args
+            context: Anything - handed back with the result
+
+        Returns:
+            List of (context, result, error) for the transfers that
+            finished in the meantime
+        """
+        finished = []
+        while len(self._in_flight) >= self.max_in_flight:
+            finished.extend(self._collect(block=True))
+
+        self._in_flight[self._executor.submit(self._timed, task, *args)] = context
+        finished.extend(self._collect(block=False))
+        return finished
+
+    def drain(self):
+        """
+        Wait for every queued transfer and stop the threads.
+
+        Returns:
+            List of (context, result, error)
+        """
+        finished = []
+        while self._in_flight:
+            finished.extend(self._collect(block=True))
+        self._executor.shutdown(wait=True)
+        return finished
+
+    def _timed(self, task, *args):
+        """Runs on a pool thread: the task, plus when it was busy."""
+        start = time.monotonic()
+        try:
+            return task(*args)
+        finally:
+            # list.append is atomic - no lock needed
+            self._busy.append((start, time.monotonic()))
+
+    def _busy_seconds(self):
+        """Time at least one transfer was running (overlaps counted once)."""
+        total = 0.0
+        current_start = current_end = None
+        for start, end in sorted(self._busy):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    total += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            total += current_end - current_start
+        return total
+
+    def _collect(self, block):
+        if not self._in_flight:
+            return []
+
+        done, _ = wait(list(self._in_flight), timeout=None if block else 0,
+                       return_when=FIRST_COMPLETED)
+
+        finished = []
+        for future in done:
+            context = self._in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                finished.append((context, None, e))
+                continue
+
+            self.files += 1
+            self.bytes += result.get("bytes", 0)
+            method = result.get("method")
+            self.methods[method] = self.methods.get(method, 0) + 1
+            finished.append((context, result, None))
+
+        return finished
+
+    def stats(self):
+        """
+        Throughput of the transfers so far.
+
+        'seconds' only counts the time transfers were actually running
+        (while they waited for the next analysis the clock stops), so
+        'mb_per_s' is the copy speed, not the analysis speed.
+
+        Returns:
+            Dictionary with 'files', 'bytes', 'seconds', 'mb_per_s' and
+            'methods' (how many files were copied, hardlinked, ...)
+        """
+        seconds = self._busy_seconds()
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "seconds": round(seconds, 3),
+            "mb_per_s": round(self.bytes / 1e6 / seconds, 1) if seconds > 0 else None,
+            "methods": dict(self.methods),
+        }
@@ -0,0 +1,320 @@
+"""
+Library Watcher - Organizing Tracks as Soon as They Arrive
+
+Instead of clicking "Organize" (or running a full rescan) after every
+download, leave the watcher running: drop a track into the inbox and a
+few seconds later it is analyzed, copied into its Camelot key folder
+and added to the library index.
+
+How it works:
+1. Watch the input folders - with inotify (via the optional 'watchdog'
+   package) or, if that isn't available, by polling every few seconds
+2. Wait until a new file stops changing (a download or a copy from a
+   USB stick can take a while - we don't want half a file)
+3. Analyze the ready files in the background (process pool + cache)
+4. Copy/move them into the output folder and update its index
+
+Run it from the command line:
+    python -m file_manager.watcher --input ~/Downloads/music --output ~/Music/by_key
+"""
+
+import os
+import time
+import queue
+import threading
+from pathlib import Path
+
+try:
+    # watchdog uses inotify on Linux, FSEvents on macOS, etc.
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+
+from .scanner import AUDIO_EXTENSIONS, scan_audio_files
+
+
+def _is_audio(path):
+    return os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events for audio files to the watcher."""
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
+
+
+class LibraryWatcher:
+    """
+    Keeps an organized library in sync with one or more inbox folders.
+
+    Args:
+        input_directories: Folder (or list of folders) to watch
+        output_directory: Root of the organized library
+        move_files: Move files out of the inbox instead of copying
+        settle_seconds: How long a file must stay unchanged before it is
+                        considered completely written
+        poll_interval: Seconds between scans when polling
+        use_polling: Force polling even if watchdog is installed
+                     (useful on network drives, where inotify sees nothing)
+        workers: Analysis processes (None = one per CPU core)
+        use_cache: Reuse cached analyses
+        link_mode: How files are copied into the library - 'copy',
+                   'auto', 'hardlink', 'reflink' or 'symlink' (see transfer.py)
+        on_organized: Optional callback(analysis, destination) called
+                      for each organized track (e.g. to refresh a GUI)
+
+    Example:
+        >>> watcher = LibraryWatcher("/inbox", "/music/by_key")
+        >>> watcher.run_forever()
+    """
+
+    def __init__(self, input_directories, output_directory, move_files=False,
+                 settle_seconds=2.0, poll_interval=2.0, use_polling=False,
+                 workers=None, use_cache=True, on_organized=None,
+                 link_mode="copy"):
+        if isinstance(input_directories, (str, Path)):
+            input_directories = [input_directories]
+
+        self.input_directories = [str(d) for d in input_directories]
+        self.output_directory = str(output_directory)
+        self.move_files = move_files
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_polling = use_polling or not WATCHDOG_AVAILABLE
+        self.workers = workers
+        self.use_cache = use_cache
+        self.on_organized = on_organized
+        self.link_mode = link_mode
+
+        self._pending = {}          # path -> (size, mtime, last change time)
+        self._pending_lock = threading.Lock()
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    # ─────────────────────────────────────────────────────
+    # Detecting new files
+    # ─────────────────────────────────────────────────────
+
+    def notify(self, path):
+        """Register a new/changed file; it's queued once it settles."""
+        if not _is_audio(path):
+            return
+        # Never react to our own copies
+        if Path(self.output_directory).resolve() in Path(path).resolve().parents:
+            return
+        with self._pending_lock:
+            self._pending[path] = (None, None, time.monotonic())
+
+    def _poll_loop(self, known):
+        """Fallback when inotify isn't available: rescan periodically."""
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            for path, identity in current.items():
+                if known.get(path) != identity:
+                    self.notify(path)
+            known = current
+
+    def _snapshot(self):
+        snapshot = {}
+        for directory in self.input_directories:
+            for record in scan_audio_files(directory):
+                snapshot[record["path"]] = (record["size"], record["mtime"])
+        return snapshot
+
+    def _settle_loop(self):
+        """Move files that stopped changing from pending to ready."""
+        while not self._stop.wait(0.5):
+            now = time.monotonic()
+            with self._pending_lock:
+                for path, (size, mtime, changed_at) in list(self._pending.items()):
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        # Deleted (or renamed) before it settled
+                        del self._pending[path]
+                        continue
+
+                    if (stat.st_size, stat.st_mtime) != (size, mtime):
+                        # Still being written - restart the clock
+                        self._pending[path] = (stat.st_size, stat.st_mtime, now)
+                    elif now - changed_at >= self.settle_seconds and stat.st_size > 0:
+                        del self._pending[path]
+                        self._ready.put(path)
+
+    # ─────────────────────────────────────────────────────
+    # Analyzing and organizing
+    # ─────────────────────────────────────────────────────
+
+    def _process_loop(self):
+        """Analyze ready files in batches and organize them."""
+        from audio_analysis.batch import analyze_tracks, WorkerPool
+        from .library_index import get_library_index
+
+        index = get_library_index(self.output_directory)
+
+        # One pool for the watcher's whole life - new files usually
+        # arrive a few at a time, and starting workers per batch would
+        # cost more than analyzing them
+        pool = None if self.workers == 1 else WorkerPool(self.workers)
+
+        try:
+            while not self._stop.is_set():
+                try:
+                    batch = [self._ready.get(timeout=0.5)]
+                except queue.Empty:
+                    continue
+
+                # Whatever else is ready goes in the same batch
+                while True:
+                    try:
+                        batch.append(self._ready.get_nowait())
+                    except queue.Empty:
+                        break
+
+                try:
+                    for analysis in analyze_tracks(batch, workers=self.workers,
+                                                   use_cache=self.use_cache, pool=pool):
+                        self._organize(analysis, index)
+                except Exception as e:
+                    # Never let one bad batch stop the watcher
+                    print(f"  ✗ Erro ao analisar {len(batch)} arquivo(s): {e}")
+
+                try:
+                    index.save()
+                except OSError as e:
+                    print(f"  ✗ Erro ao salvar o índice: {e}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _organize(self, analysis, index):
+        """Place one analyzed track in its key folder - errors are printed,
+        never raised, so the next track still gets organized."""
+        from .organizaer import place_in_key_folder
+
+        file_path = analysis["file_path"]
+        camelot = analysis.get("camelot", "Unknown")
+        if camelot == "Unknown":
+            print(f"  ✗ Não foi possível detectar a tonalidade: {file_path}")
+            return
+
+        try:
+            destination = place_in_key_folder(
+                file_path, camelot, self.output_directory, self.move_files,
+                self.link_mode
+            )
+            index.add({**analysis, "file_path": str(destination)})
+            print(f"  ✓ {Path(file_path).name} → {camelot}")
+
+            if self.on_organized is not None:
+                self.on_organized(analysis, str(destination))
+        except Exception as e:
+            # shutil.Error, a callback that raises, a bad analysis...
+            print(f"  ✗ Erro ao organizar {file_path}: {e}")
+
+    # ─────────────────────────────────────────────────────
+    # Start / stop
+    # ─────────────────────────────────────────────────────
+
+    def start(self):
+        """Start watching in background threads (returns immediately)."""
+        Path(self.output_directory).mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+
+        loops = [(self._settle_loop, ()), (self._process_loop, ())]
+        if self.use_polling:
+            # Files already there when we start are not "new"
+            loops.append((self._poll_loop, (self._snapshot(),)))
+        else:
+            self._observer = Observer()
+            handler = _EventHandler(self)
+            for directory in self.input_directories:
+                self._observer.schedule(handler, directory, recursive=True)
+            self._observer.start()
+
+        for loop, args in loops:
+            thread = threading.Thread(target=loop, args=args, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        mode = "polling" if self.use_polling else "inotify"
+        print(f"👀 Observando {', '.join(self.input_directories)} ({mode})")
+
+    def stop(self):
+        """Stop watching and wait for the background threads."""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def run_forever(self):
+        """Watch until Ctrl+C."""
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n🛑 Parando o watcher...")
+        finally:
+            self.stop()
+
+
+def main():
+    """Command-line entry point: python -m file_manager.watcher"""
+    import argparse
+    from .transfer import LINK_MODES
+
+    parser = argparse.ArgumentParser(
+        description="Watch inbox folders and organize new tracks by key"
+    )
+    parser.add_argument('--input', required=True, action='append',
+                        help='Folder to watch (repeat for several)')
+    parser.add_argument('--output', required=True, help='Organized library folder')
+    parser.add_argument('--move', action='store_true',
+                        help='Move files instead of copying (removes originals)')
+    parser.add_argument('--link', choices=LINK_MODES, default='copy',
+                        help='copy, or link instead of copying: auto, hardlink, '
+                             'reflink, symlink (default: copy)')
+    parser.add_argument('--poll', action='store_true',
+                        help='Poll instead of using inotify (network drives)')
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help='Seconds a file must stay unchanged (default: 2)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Analysis processes (default: one per CPU core)')
+    args = parser.parse_args()
+
+    LibraryWatcher(
+        args.input, args.output,
+        move_files=args.move,
+        settle_seconds=args.settle,
+        use_polling=args.poll,
+        workers=args.workers,
+        link_mode=args.link
+    ).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,13 @@ Implementada com PyQt5 para melhor compatibilidade e aparência profissional.
 
 import sys
 import os
+import time
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTabWidget, QPushButton, QLabel, QLineEdit, QFileDialog, QTextEdit,
     QComboBox, QSpinBox, QCheckBox, QMessageBox, QProgressDialog, QFrame,
-    QRadioButton, QButtonGroup
+    QRadioButton, QButtonGroup, QProgressBar
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon, QColor, QLinearGradient, QPalette, QPixmap
@@ -20,9 +21,9 @@ from PyQt5.QtSvg import QSvgWidget
 
 from audio_analysis.key_detection import analyze_track
 from file_manager.organizaer import (
-    find_audio_files, organize_by_key, create_harmonic_playlist,
+    organize_by_key, refine_organized, with_library_index, create_harmonic_playlist,
     create_harmonic_sequence_playlist, create_key_to_key_playlist,
-    create_camelot_zone_playlist
+    create_camelot_zone_playlist, create_optimal_set_playlist
 )
 from utils.camelot_map import CAMELOT_MAP, get_compatible_keys
 
@@ -47,6 +48,58 @@ class AnalysisWorker(QThread):
             self.finished.emit()
 
 
+class TaskWorker(QThread):
+    """
+    Worker thread para operações longas (organizar, criar playlists).
+    
+    Runs one of the organizer functions (which spread the analysis over
+    a process pool) and reports back through signals, so the window
+    stays responsive even during a 10k-file organize.
+    
+    The function must accept progress_callback and should_stop keyword
+    arguments (see file_manager/organizaer.py).
+    """
+    progress = pyqtSignal(int, int, str)   # done, total (0 = unknown), file
+    partial = pyqtSignal(dict)             # each analysis as it arrives
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    
+    def __init__(self, func, **kwargs):
+        super().__init__()
+        self.func = func
+        self.kwargs = kwargs
+    
+    def _report(self, done, total, analysis):
+        self.progress.emit(done, total or 0, analysis.get('file_path', ''))
+        self.partial.emit(analysis)
+    
+    def run(self):
+        try:
+            result = self.func(
+                progress_callback=self._report,
+                should_stop=self.isInterruptionRequested,
+                **self.kwargs
+            )
+            self.result.emit(result)
+        except Exception as e:
+            self.error.emit(str(e))
+    
+    def cancel(self):
+        """Pede para parar - the job stops after the current track"""
+        self.requestInterruption()
+
+
+def format_eta(started, done, total):
+    """Estimated time left, e.g. "2m 15s" (empty while unknown)"""
+    if not done or not total or done >= total:
+        return ""
+    remaining = (time.monotonic() - started) / done * (total - done)
+    minutes, seconds = divmod(int(remaining), 60)
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
 class DJAnalyzerGUI(QMainWindow):
     """Classe principal da interface gráfica com PyQt5 - CAMEL-HOT Theme"""
     
@@ -56,6 +109,9 @@ class DJAnalyzerGUI(QMainWindow):
         self.selected_input_folder = None
         self.selected_output_folder = None
         self.analysis_results = {}
+        self.analyze_worker = None
+        self.org_worker = None
+        self.pl_worker = None
         self.apply_theme()
         self.init_ui()
     
@@ -676,6 +732,7 @@ class DJAnalyzerGUI(QMainWindow):
         # Botões de ação
         btn_layout = QHBoxLayout()
         analyze_btn = QPushButton("Analyze Track")
+        self.analyze_btn = analyze_btn
         analyze_btn.setMinimumHeight(40)
         analyze_btn.setFont(QFont("Segoe UI", 11, QFont.Bold))
         analyze_btn.setStyleSheet("""
@@ -761,6 +818,23 @@ class DJAnalyzerGUI(QMainWindow):
         layout.addWidget(self.move_files)
         layout.addWidget(QLabel("⚠️  Warning: Original files will be moved!"))
         
+        # Modo de cópia: links não ocupam espaço extra (ver transfer.py)
+        link_layout = QHBoxLayout()
+        link_layout.addWidget(QLabel("Copy mode:"))
+        self.org_link_mode = QComboBox()
+        self.org_link_mode.addItem("Copy files", "copy")
+        self.org_link_mode.addItem("Auto link (no extra space)", "auto")
+        self.org_link_mode.addItem("Hardlink", "hardlink")
+        self.org_link_mode.addItem("Reflink (btrfs/XFS)", "reflink")
+        self.org_link_mode.addItem("Symlink", "symlink")
+        link_layout.addWidget(self.org_link_mode)
+        link_layout.addStretch()
+        layout.addLayout(link_layout)
+        
+        # Modo rápido: pastas prontas logo, tonalidades refinadas depois
+        self.org_quick = QCheckBox("Quick first pass (provisional keys, refined afterwards)")
+        layout.addWidget(self.org_quick)
+        
         # Botões
         btn_layout = QHBoxLayout()
         organize_btn = QPushButton("Organize Library")
@@ -780,6 +854,13 @@ class DJAnalyzerGUI(QMainWindow):
         """)
         organize_btn.clicked.connect(self.handle_organize)
         btn_layout.addWidget(organize_btn)
+        self.organize_btn = organize_btn
+        
+        self.org_cancel_btn = QPushButton("Cancel")
+        self.org_cancel_btn.setMaximumWidth(100)
+        self.org_cancel_btn.setEnabled(False)
+        self.org_cancel_btn.clicked.connect(self.cancel_organize)
+        btn_layout.addWidget(self.org_cancel_btn)
         
         clear_btn = QPushButton("Clear")
         clear_btn.setMaximumWidth(100)
@@ -787,6 +868,13 @@ class DJAnalyzerGUI(QMainWindow):
         btn_layout.addWidget(clear_btn)
         layout.addLayout(btn_layout)
         
+        # Progresso
+        self.org_progress = QProgressBar()
+        self.org_progress.setValue(0)
+        layout.addWidget(self.org_progress)
+        self.org_status = QLabel("")
+        layout.addWidget(self.org_status)
+        
         # Output
         layout.addWidget(QLabel("Progress:"))
         self.org_output_text = QTextEdit()
@@ -821,11 +909,13 @@ class DJAnalyzerGUI(QMainWindow):
         mode_sequence = QRadioButton("Harmonic Sequence")
         mode_transition = QRadioButton("Key Transition")
         mode_zone = QRadioButton("Camelot Zone")
+        mode_set = QRadioButton("Optimal Set")
         
         self.pl_mode_group.addButton(mode_simple, 0)
         self.pl_mode_group.addButton(mode_sequence, 1)
         self.pl_mode_group.addButton(mode_transition, 2)
         self.pl_mode_group.addButton(mode_zone, 3)
+        self.pl_mode_group.addButton(mode_set, 4)
         
         mode_simple.setChecked(True)
         
@@ -833,6 +923,7 @@ class DJAnalyzerGUI(QMainWindow):
         mode_layout.addWidget(mode_sequence)
         mode_layout.addWidget(mode_transition)
         mode_layout.addWidget(mode_zone)
+        mode_layout.addWidget(mode_set)
         mode_layout.addStretch()
         layout.addLayout(mode_layout)
         
@@ -919,6 +1010,11 @@ class DJAnalyzerGUI(QMainWindow):
         filter_layout.addStretch()
         layout.addLayout(filter_layout)
         
+        # Library index: only new/changed files are analyzed next time
+        self.pl_use_index = QCheckBox("Use library index (repeat playlists without rescanning)")
+        self.pl_use_index.setChecked(True)
+        layout.addWidget(self.pl_use_index)
+        
         # Botões
         btn_layout = QHBoxLayout()
         create_btn = QPushButton("Create Playlist")
@@ -938,6 +1034,13 @@ class DJAnalyzerGUI(QMainWindow):
         """)
         create_btn.clicked.connect(self.handle_playlist)
         btn_layout.addWidget(create_btn)
+        self.create_pl_btn = create_btn
+        
+        self.pl_cancel_btn = QPushButton("Cancel")
+        self.pl_cancel_btn.setMaximumWidth(100)
+        self.pl_cancel_btn.setEnabled(False)
+        self.pl_cancel_btn.clicked.connect(self.cancel_playlist)
+        btn_layout.addWidget(self.pl_cancel_btn)
         
         clear_btn = QPushButton("Clear")
         clear_btn.setMaximumWidth(100)
@@ -945,6 +1048,13 @@ class DJAnalyzerGUI(QMainWindow):
         btn_layout.addWidget(clear_btn)
         layout.addLayout(btn_layout)
         
+        # Progresso
+        self.pl_progress = QProgressBar()
+        self.pl_progress.setValue(0)
+        layout.addWidget(self.pl_progress)
+        self.pl_status = QLabel("")
+        layout.addWidget(self.pl_status)
+        
         # Output
         layout.addWidget(QLabel("Result:"))
         self.pl_output_text = QTextEdit()
@@ -1126,76 +1236,152 @@ Stay professional. Keep mixing. Enjoy the music!
             self.pl_input.setText(folder)
     
     def handle_analyze(self):
-        """Analisa um arquivo"""
+        """Analisa um arquivo (em background)"""
         if not self.selected_file:
             QMessageBox.warning(self, "Aviso", "Selecione um arquivo!")
             return
         
-        try:
-            result = analyze_track(self.selected_file)
-            
-            # Build confidence bar visualization
-            confidence = result.get('confidence', 0.0)
-            confidence_pct = int(confidence * 100)
-            bar_length = 30
-            filled = int((confidence_pct / 100) * bar_length)
-            bar = "█" * filled + "░" * (bar_length - filled)
-            
-            # Build output with confidence bar
-            output = f"🔄 Análise #{self.analyze_output.toPlainText().count('Arquivo:') + 1}\n"
-            output += "═" * 60 + "\n\n"
-            output += f"📀 Arquivo:     {os.path.basename(self.selected_file)}\n"
-            output += f"🎵 Tonalidade:  {result.get('key', 'Desconhecido')}\n"
-            output += f"🎼 Camelot:     {result.get('camelot', 'Desconhecido')}\n"
-            output += f"⏱️  BPM:         {result.get('bpm', 'Desconhecido')}\n"
-            output += f"⏰ Duração:     {result.get('duration', 'Desconhecida')} segundos\n"
-            output += "\n"
-            output += f"📊 Confiança da Análise:\n"
-            output += f"   [{bar}] {confidence_pct}%\n"
-            output += "\n✅ Análise concluída com sucesso!\n"
-            output += "═" * 60 + "\n\n"
-            
-            # Get current text and append new result
-            current_text = self.analyze_output.toPlainText()
-            if current_text.strip():
-                # If there are already results, append with separator
-                self.analyze_output.setText(current_text + output)
+        if self.analyze_worker is not None and self.analyze_worker.isRunning():
+            return
+        
+        self.analyze_btn.setEnabled(False)
+        self.analyze_btn.setText("Analyzing...")
+        
+        worker = AnalysisWorker(self.selected_file)
+        worker.result.connect(lambda result, path=self.selected_file: self._show_analysis(path, result))
+        worker.error.connect(
+            lambda message: QMessageBox.critical(self, "Erro", f"Erro ao analisar:\n{message}")
+        )
+        worker.finished.connect(self._analysis_finished)
+        self.analyze_worker = worker
+        worker.start()
+    
+    def _analysis_finished(self):
+        self.analyze_btn.setEnabled(True)
+        self.analyze_btn.setText("Analyze Track")
+    
+    def _show_analysis(self, file_path, result):
+        """Mostra o resultado de uma análise"""
+        # Build confidence bar visualization
+        confidence = result.get('confidence') or 0.0
+        confidence_pct = int(confidence * 100)
+        bar_length = 30
+        filled = int((confidence_pct / 100) * bar_length)
+        bar = "█" * filled + "░" * (bar_length - filled)
+        
+        # Build output with confidence bar
+        output = f"🔄 Análise #{self.analyze_output.toPlainText().count('Arquivo:') + 1}\n"
+        output += "═" * 60 + "\n\n"
+        output += f"📀 Arquivo:     {os.path.basename(file_path)}\n"
+        output += f"🎵 Tonalidade:  {result.get('key', 'Desconhecido')}\n"
+        output += f"🎼 Camelot:     {result.get('camelot', 'Desconhecido')}\n"
+        output += f"⏱️  BPM:         {result.get('bpm', 'Desconhecido')}\n"
+        output += f"⏰ Duração:     {result.get('duration', 'Desconhecida')} segundos\n"
+        output += "\n"
+        output += f"📊 Confiança da Análise:\n"
+        output += f"   [{bar}] {confidence_pct}%\n"
+        output += "\n✅ Análise concluída com sucesso!\n"
+        output += "═" * 60 + "\n\n"
+        
+        # Get current text and append new result
+        current_text = self.analyze_output.toPlainText()
+        if current_text.strip():
+            # If there are already results, append with separator
+            self.analyze_output.setText(current_text + output)
+        else:
+            # First analysis
+            self.analyze_output.setText(output)
+        
+        # Scroll to the bottom to see latest result
+        self.analyze_output.verticalScrollBar().setValue(
+            self.analyze_output.verticalScrollBar().maximum()
+        )
+        
+        self.analysis_results = result
+    
+    def _start_task(self, func, kwargs, on_done, progress_bar, status_label,
+                    start_btn, cancel_btn, on_partial=None, on_finished=None):
+        """
+        Roda uma função longa num TaskWorker e liga os sinais à aba.
+        
+        Args:
+            func: Organizer function (accepts progress_callback/should_stop)
+            kwargs: Its arguments
+            on_done: Called with the function's return value
+            progress_bar, status_label: Where progress and ETA are shown
+            start_btn, cancel_btn: Disabled/enabled while the task runs
+            on_partial: Optional, called with each analysis as it arrives
+            on_finished: Optional, called once the thread has ended and
+                         the buttons are enabled again (e.g. to start
+                         a follow-up task)
+        
+        Returns:
+            The running TaskWorker
+        """
+        worker = TaskWorker(func, **kwargs)
+        started = time.monotonic()
+        
+        def show_progress(done, total, file_path):
+            if total:
+                progress_bar.setMaximum(total)
+                progress_bar.setValue(done)
+                eta = format_eta(started, done, total)
+                status_label.setText(
+                    f"{done}/{total} • {os.path.basename(file_path)}"
+                    + (f" • ⏳ {eta} restantes" if eta else "")
+                )
             else:
-                # First analysis
-                self.analyze_output.setText(output)
-            
-            # Scroll to the bottom to see latest result
-            self.analyze_output.verticalScrollBar().setValue(
-                self.analyze_output.verticalScrollBar().maximum()
-            )
-            
-            self.analysis_results = result
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", f"Erro ao analisar:\n{str(e)}")
+                # Total not known yet - busy indicator
+                progress_bar.setMaximum(0)
+                status_label.setText(f"{done} • {os.path.basename(file_path)}")
+        
+        def finish():
+            start_btn.setEnabled(True)
+            cancel_btn.setEnabled(False)
+            progress_bar.setMaximum(max(progress_bar.maximum(), 1))
+            progress_bar.setValue(progress_bar.maximum())
+        
+        worker.progress.connect(show_progress)
+        if on_partial is not None:
+            worker.partial.connect(on_partial)
+        worker.result.connect(on_done)
+        worker.error.connect(lambda message: QMessageBox.critical(self, "Erro", message))
+        worker.finished.connect(finish)
+        if on_finished is not None:
+            # Connected before start(), after finish: runs once the
+            # buttons are back, and can't miss an early finished signal
+            worker.finished.connect(on_finished)
+        
+        start_btn.setEnabled(False)
+        cancel_btn.setEnabled(True)
+        progress_bar.setMaximum(0)
+        progress_bar.setValue(0)
+        status_label.setText("🔍 Procurando arquivos...")
+        
+        worker.start()
+        return worker
     
     def handle_organize(self):
-        """Organiza biblioteca"""
+        """Organiza biblioteca (em background)"""
         if not self.selected_input_folder or not self.selected_output_folder:
             QMessageBox.warning(self, "Aviso", "Selecione ambas as pastas!")
             return
         
-        try:
-            self.org_output_text.setText("🔄 Iniciando organização...\n")
-            self.org_output_text.repaint()
-            
-            audio_files = find_audio_files(self.selected_input_folder)
-            self.org_output_text.setText(f"🎵 Encontrados {len(audio_files)} arquivos\n")
-            self.org_output_text.repaint()
-            
-            result = organize_by_key(
-                self.selected_input_folder,
-                self.selected_output_folder,
-                move_files=self.move_files.isChecked()
-            )
-            
-            output = f"✅ Total de arquivos: {result.get('total_files', 0)}\n"
+        self.org_output_text.setText("🔄 Iniciando organização...\n")
+        
+        def show_track(analysis):
+            name = os.path.basename(analysis['file_path'])
+            camelot = analysis.get('camelot', 'Unknown')
+            if camelot == 'Unknown':
+                self.org_output_text.append(f"  ✗ {name}")
+            else:
+                self.org_output_text.append(f"  ✓ {name} → {camelot}")
+        
+        def show_result(result):
+            output = f"\n✅ Total de arquivos: {result.get('total_files', 0)}\n"
             output += f"✅ Organizados: {result.get('organized_count', 0)}\n"
+            if result.get('resumed'):
+                output += f"⏯️  Retomados de uma execução anterior: {result['resumed']}\n"
             output += f"\n📁 Estrutura criada em:\n{self.selected_output_folder}\n\n"
             
             if result.get('by_key'):
@@ -1204,13 +1390,76 @@ Stay professional. Keep mixing. Enjoy the music!
                     count = len(result.get('by_key', {})[key])
                     output += f"  • {key}: {count} músicas\n"
             
-            output += "\n✅ Organização concluída!"
-            self.org_output_text.setText(output)
+            if result.get('cancelled'):
+                output += "\n⏹️  Organização cancelada - clique em Organize Library"
+                output += "\n   de novo para continuar de onde parou"
+                self.org_output_text.append(output)
+                self.org_status.setText("⏹️  Cancelado")
+                return
+            
+            if quick:
+                # As pastas já servem - agora a análise completa
+                output += "\n📁 Pastas prontas (tonalidades provisórias) - refinando..."
+                self.org_output_text.append(output)
+                # Começa quando o worker da organização terminar
+                refine['pending'] = True
+                return
             
+            output += "\n✅ Organização concluída!"
+            self.org_output_text.append(output)
+            self.org_status.setText("✅ Concluído")
             QMessageBox.information(self, "Sucesso", "Biblioteca organizada com sucesso!")
+        
+        def start_refine():
+            if refine['pending']:
+                refine['pending'] = False
+                self._refine_organized()
+        
+        quick = self.org_quick.isChecked()
+        refine = {'pending': False}   # set by show_result in quick mode
+        self.org_worker = self._start_task(
+            organize_by_key,
+            dict(input_directory=self.selected_input_folder,
+                 output_directory=self.selected_output_folder,
+                 move_files=self.move_files.isChecked(),
+                 link_mode=self.org_link_mode.currentData(),
+                 decode_profile='preview' if quick else 'quality'),
+            show_result, self.org_progress, self.org_status,
+            self.organize_btn, self.org_cancel_btn, on_partial=show_track,
+            on_finished=start_refine
+        )
+    
+    def _refine_organized(self):
+        """Segunda fase do modo rápido: reanalisa as faixas provisórias"""
+        def show_result(result):
+            output = f"\n🔬 Refinadas: {result['refined']}\n"
+            output += f"  • Mudaram de pasta: {result['moved']}\n"
+            output += f"  • Novo BPM: {result['relabeled']}\n"
+            output += f"  • Sem mudança: {result['unchanged']}\n"
             
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", f"Erro ao organizar:\n{str(e)}")
+            if result.get('cancelled'):
+                output += "\n⏹️  Refinamento cancelado - as faixas restantes continuam provisórias"
+                self.org_output_text.append(output)
+                self.org_status.setText("⏹️  Cancelado")
+                return
+            
+            output += "\n✅ Organização concluída!"
+            self.org_output_text.append(output)
+            self.org_status.setText("✅ Concluído")
+            QMessageBox.information(self, "Sucesso", "Biblioteca organizada com sucesso!")
+        
+        self.org_worker = self._start_task(
+            refine_organized,
+            dict(output_directory=self.selected_output_folder),
+            show_result, self.org_progress, self.org_status,
+            self.organize_btn, self.org_cancel_btn
+        )
+    
+    def cancel_organize(self):
+        """Cancela a organização em andamento"""
+        if self.org_worker is not None:
+            self.org_worker.cancel()
+            self.org_status.setText("⏹️  Cancelando...")
     
     def handle_playlist(self):
         """Cria playlist baseado no modo selecionado"""
@@ -1225,7 +1474,6 @@ Stay professional. Keep mixing. Enjoy the music!
             
             mode = self.pl_mode_group.checkedId()
             self.pl_output_text.setText("🔄 Criando playlist...\n")
-            self.pl_output_text.repaint()
             
             if mode == 0:  # Simple Harmonic
                 self._handle_simple_playlist(output_file)
@@ -1235,6 +1483,8 @@ Stay professional. Keep mixing. Enjoy the music!
                 self._handle_transition_playlist(output_file)
             elif mode == 3:  # Camelot Zone
                 self._handle_zone_playlist(output_file)
+            elif mode == 4:  # Optimal Set
+                self._handle_optimal_set_playlist(output_file)
             
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Erro ao criar playlist:\n{str(e)}")
@@ -1253,22 +1503,23 @@ Stay professional. Keep mixing. Enjoy the music!
         if (bpm_min > 0) or (bpm_max < 300):
             bpm_range = (bpm_min, bpm_max)
         
-        result = create_harmonic_playlist(
-            input_directory=self.pl_input.text(),
-            output_file=output_file,
-            target_key=key,
-            bpm_range=bpm_range,
-            max_songs=limit
+        def show_result(result):
+            output = f"✅ Simple Harmonic Playlist criada!\n"
+            output += f"📁 Arquivo: {output_file}\n"
+            output += f"🎵 Músicas: {len(result)}\n"
+            output += f"🎼 Tonalidade: {key or 'Qualquer uma'}\n"
+            output += f"\n✅ Pronto para tocar!"
+            self._playlist_done(output, f"Playlist criada: {output_file}")
+        
+        self._start_playlist_task(
+            create_harmonic_playlist,
+            dict(input_directory=self.pl_input.text(),
+                 output_file=output_file,
+                 target_key=key,
+                 bpm_range=bpm_range,
+                 max_songs=limit),
+            show_result
         )
-        
-        output = f"✅ Simple Harmonic Playlist criada!\n"
-        output += f"📁 Arquivo: {output_file}\n"
-        output += f"🎵 Músicas: {len(result)}\n"
-        output += f"🎼 Tonalidade: {key or 'Qualquer uma'}\n"
-        output += f"\n✅ Pronto para tocar!"
-        
-        self.pl_output_text.setText(output)
-        QMessageBox.information(self, "Sucesso", f"Playlist criada: {output_file}")
     
     def _handle_sequence_playlist(self, output_file):
         """Cria playlist com sequência harmônica"""
@@ -1277,24 +1528,25 @@ Stay professional. Keep mixing. Enjoy the music!
         seq_length = 8  # Default sequence length
         max_per_key = 3
         
-        result = create_harmonic_sequence_playlist(
-            input_directory=self.pl_input.text(),
-            output_file=output_file,
-            start_key=start_key,
-            sequence_length=seq_length,
-            direction=direction,
-            max_songs_per_key=max_per_key
+        def show_result(result):
+            output = f"✅ Harmonic Sequence Playlist criada!\n"
+            output += f"📁 Arquivo: {output_file}\n"
+            output += f"🎵 Músicas: {len(result)}\n"
+            output += f"🎼 Início: {start_key}\n"
+            output += f"📍 Direção: {direction}\n"
+            output += f"\n✅ Sequência harmônica criada!"
+            self._playlist_done(output, f"Sequência criada: {output_file}")
+        
+        self._start_playlist_task(
+            create_harmonic_sequence_playlist,
+            dict(input_directory=self.pl_input.text(),
+                 output_file=output_file,
+                 start_key=start_key,
+                 sequence_length=seq_length,
+                 direction=direction,
+                 max_songs_per_key=max_per_key),
+            show_result
         )
-        
-        output = f"✅ Harmonic Sequence Playlist criada!\n"
-        output += f"📁 Arquivo: {output_file}\n"
-        output += f"🎵 Músicas: {len(result)}\n"
-        output += f"🎼 Início: {start_key}\n"
-        output += f"📍 Direção: {direction}\n"
-        output += f"\n✅ Sequência harmônica criada!"
-        
-        self.pl_output_text.setText(output)
-        QMessageBox.information(self, "Sucesso", f"Sequência criada: {output_file}")
     
     def _handle_transition_playlist(self, output_file):
         """Cria playlist de transição entre duas tonalidades"""
@@ -1302,22 +1554,23 @@ Stay professional. Keep mixing. Enjoy the music!
         target_key = self.pl_target_key.currentText()
         limit = self.pl_limit.value()
         
-        result = create_key_to_key_playlist(
-            input_directory=self.pl_input.text(),
-            output_file=output_file,
-            start_key=start_key,
-            target_key=target_key,
-            max_songs=limit
+        def show_result(result):
+            output = f"✅ Key Transition Playlist criada!\n"
+            output += f"📁 Arquivo: {output_file}\n"
+            output += f"🎵 Músicas: {len(result)}\n"
+            output += f"🎼 Transição: {start_key} → {target_key}\n"
+            output += f"\n✅ Transição harmônica criada!"
+            self._playlist_done(output, f"Transição criada: {output_file}")
+        
+        self._start_playlist_task(
+            create_key_to_key_playlist,
+            dict(input_directory=self.pl_input.text(),
+                 output_file=output_file,
+                 start_key=start_key,
+                 target_key=target_key,
+                 max_songs=limit),
+            show_result
         )
-        
-        output = f"✅ Key Transition Playlist criada!\n"
-        output += f"📁 Arquivo: {output_file}\n"
-        output += f"🎵 Músicas: {len(result)}\n"
-        output += f"🎼 Transição: {start_key} → {target_key}\n"
-        output += f"\n✅ Transição harmônica criada!"
-        
-        self.pl_output_text.setText(output)
-        QMessageBox.information(self, "Sucesso", f"Transição criada: {output_file}")
     
     def _handle_zone_playlist(self, output_file):
         """Cria playlist de zona compatível"""
@@ -1327,22 +1580,76 @@ Stay professional. Keep mixing. Enjoy the music!
         
         limit = self.pl_limit.value()
         
-        result = create_camelot_zone_playlist(
-            input_directory=self.pl_input.text(),
-            output_file=output_file,
-            target_key=target_key,
-            zone_size=2,
-            max_songs=limit
+        def show_result(result):
+            output = f"✅ Camelot Zone Playlist criada!\n"
+            output += f"📁 Arquivo: {output_file}\n"
+            output += f"🎵 Músicas: {len(result)}\n"
+            output += f"🎼 Centro: {target_key}\n"
+            output += f"\n✅ Todas as músicas são compatíveis!"
+            self._playlist_done(output, f"Zona criada: {output_file}")
+        
+        self._start_playlist_task(
+            create_camelot_zone_playlist,
+            dict(input_directory=self.pl_input.text(),
+                 output_file=output_file,
+                 target_key=target_key,
+                 zone_size=2,
+                 max_songs=limit),
+            show_result
         )
-        
-        output = f"✅ Camelot Zone Playlist criada!\n"
-        output += f"📁 Arquivo: {output_file}\n"
-        output += f"🎵 Músicas: {len(result)}\n"
-        output += f"🎼 Centro: {target_key}\n"
-        output += f"\n✅ Todas as músicas são compatíveis!"
-        
+    
+    def _handle_optimal_set_playlist(self, output_file):
+        """Cria o set com o menor custo de transição (tom, BPM, energia)"""
+        start_key = self.pl_seq_start.currentText()
+        end_key = self.pl_target_key.currentText()
+        set_length = self.pl_limit.value()
+        
+        def show_result(result):
+            output = f"✅ Optimal Set Playlist criada!\n"
+            output += f"📁 Arquivo: {output_file}\n"
+            output += f"🎵 Músicas: {len(result)}\n"
+            output += f"🎼 Set: {start_key} → {end_key}\n"
+            output += f"\n✅ Transições suaves de tom, BPM e energia!"
+            self._playlist_done(output, f"Set criado: {output_file}")
+        
+        self._start_playlist_task(
+            create_optimal_set_playlist,
+            dict(input_directory=self.pl_input.text(),
+                 output_file=output_file,
+                 start_key=start_key,
+                 end_key=end_key,
+                 set_length=set_length),
+            show_result
+        )
+    
+    def _start_playlist_task(self, func, kwargs, on_done):
+        """Cria a playlist em background"""
+        if self.pl_worker is not None and self.pl_worker.isRunning():
+            return
+        if self.pl_use_index.isChecked():
+            # Refresh the folder's index, then answer from it
+            kwargs = dict(kwargs, playlist_func=func)
+            func = with_library_index
+        self.pl_worker = self._start_task(
+            func, kwargs, on_done, self.pl_progress, self.pl_status,
+            self.create_pl_btn, self.pl_cancel_btn
+        )
+    
+    def _playlist_done(self, output, message):
+        """Mostra o resumo de uma playlist pronta"""
         self.pl_output_text.setText(output)
-        QMessageBox.information(self, "Sucesso", f"Zona criada: {output_file}")
+        if self.pl_worker is not None and self.pl_worker.isInterruptionRequested():
+            # Cancelled - the file holds what was found so far
+            self.pl_status.setText("⏹️  Cancelado (playlist parcial)")
+            return
+        self.pl_status.setText("✅ Concluído")
+        QMessageBox.information(self, "Sucesso", message)
+    
+    def cancel_playlist(self):
+        """Cancela a playlist em andamento"""
+        if self.pl_worker is not None:
+            self.pl_worker.cancel()
+            self.pl_status.setText("⏹️  Cancelando...")
 
     
     def handle_compatibility(self):
@@ -1381,7 +1688,11 @@ Stay professional. Keep mixing. Enjoy the music!
         self.org_input.clear()
         self.org_output.clear()
         self.org_output_text.clear()
+        self.org_progress.setValue(0)
+        self.org_status.clear()
         self.move_files.setChecked(False)
+        self.org_link_mode.setCurrentIndex(0)
+        self.org_quick.setChecked(False)
         self.selected_input_folder = None
         self.selected_output_folder = None
     
@@ -1397,7 +1708,18 @@ Stay professional. Keep mixing. Enjoy the music!
         self.pl_bpm_max.setValue(300)
         self.pl_limit.setValue(50)
         self.pl_output_text.clear()
+        self.pl_progress.setValue(0)
+        self.pl_status.clear()
         self.pl_mode_group.button(0).setChecked(True)
+        self.pl_use_index.setChecked(True)
+    
+    def closeEvent(self, event):
+        """Para os workers antes de fechar a janela"""
+        for worker in (self.analyze_worker, self.org_worker, self.pl_worker):
+            if worker is not None and worker.isRunning():
+                worker.requestInterruption()
+                worker.wait()
+        super().closeEvent(event)
 
 
 def main():
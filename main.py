@@ -87,12 +87,13 @@ def cmd_playlist(args):
     - --key: Only include songs compatible with this Camelot key
     - --bpm: Only include songs in this BPM range
     - --limit: Maximum number of songs
+    - --no-index: Rescan the folder instead of using its library index
     
     Example:
         # Create a playlist in 8A, 120-130 BPM, max 20 songs
         python main.py playlist --input /music --output 8A.m3u --key 8A --bpm 120 130 --limit 20
     """
-    from file_manager.organizaer import create_playlist
+    from file_manager.organizaer import create_playlist, with_library_index
     
     # Parse BPM range if provided
     bpm_range = None
@@ -106,13 +107,18 @@ def cmd_playlist(args):
         print(f"   BPM Range: {bpm_range[0]}-{bpm_range[1]}")
     print("-" * 40)
     
-    create_playlist(
+    options = dict(
         input_directory=args.input,
         output_file=args.output,
         target_key=args.key,
         bpm_range=bpm_range,
         max_songs=args.limit
     )
+    if args.no_index:
+        create_playlist(**options)
+    else:
+        # Only new/changed files are analyzed (see library_index.py)
+        with_library_index(create_playlist, **options)
 
 
 def cmd_find(args):
@@ -219,6 +225,8 @@ Examples:
     parser_pl.add_argument('--bpm', type=int, nargs=2, metavar=('MIN', 'MAX'),
                           help='BPM range filter')
     parser_pl.add_argument('--limit', type=int, default=20, help='Max songs (default: 20)')
+    parser_pl.add_argument('--no-index', action='store_true',
+                          help='Scan and analyze the folder instead of using its library index')
     
     # ─────────────────────────────────────────────────────
     # Command: find
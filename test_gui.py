@@ -138,6 +138,67 @@ def test_gui_creation():
         return False
 
 
+def test_quick_organize():
+    """Teste 4: Modo rápido - a organização provisória é seguida do refinamento"""
+    print("\n" + "=" * 60)
+    print("TEST 4: Organização rápida + refinamento...")
+    print("=" * 60)
+    
+    try:
+        import time
+        from PyQt5.QtWidgets import QApplication, QMessageBox
+        import gui.main_window as main_window
+        
+        app = QApplication.instance()
+        if app is None:
+            app = QApplication(sys.argv)
+        
+        calls = []
+        
+        def fake_organize(progress_callback=None, should_stop=None, **kwargs):
+            calls.append(('organize', kwargs['decode_profile']))
+            return {'total_files': 1, 'organized_count': 1, 'by_key': {'8A': ['a.mp3']}}
+        
+        def fake_refine(progress_callback=None, should_stop=None, **kwargs):
+            calls.append(('refine', kwargs['output_directory']))
+            return {'refined': 1, 'moved': 0, 'relabeled': 0, 'unchanged': 1}
+        
+        originals = (main_window.organize_by_key, main_window.refine_organized,
+                     QMessageBox.information)
+        main_window.organize_by_key = fake_organize
+        main_window.refine_organized = fake_refine
+        QMessageBox.information = staticmethod(lambda *args: None)
+        try:
+            gui = main_window.DJAnalyzerGUI()
+            gui.selected_input_folder = "/music/inbox"
+            gui.selected_output_folder = "/music/by_key"
+            gui.org_quick.setChecked(True)
+            gui.handle_organize()
+            
+            deadline = time.monotonic() + 10
+            while len(calls) < 2 or not gui.organize_btn.isEnabled():
+                assert time.monotonic() < deadline, f"refinamento não rodou: {calls}"
+                app.processEvents()
+                time.sleep(0.01)
+        finally:
+            (main_window.organize_by_key, main_window.refine_organized,
+             QMessageBox.information) = originals
+        
+        print("✓ Preview seguido do refinamento...", end=" ")
+        assert calls == [('organize', 'preview'), ('refine', '/music/by_key')]
+        assert gui.org_status.text() == "✅ Concluído"
+        print("OK")
+        
+        print("\n✅ Modo rápido refina as faixas provisórias!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def main():
     """Executar todos os testes"""
     print("\n")
@@ -150,6 +211,7 @@ def main():
     results.append(("Imports", test_imports()))
     results.append(("Estruturas de Dados", test_data_structures()))
     results.append(("GUI Creation", test_gui_creation()))
+    results.append(("Quick Organize", test_quick_organize()))
     
     # Resumo
     print("\n" + "=" * 60)
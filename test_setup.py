@@ -30,6 +30,20 @@ def test_utils():
     assert key == "8A", f"Expected '8A', got '{key}'"
     print("  ✓ A Minor → 8A")
     
+    # Every key: one fifth up = one hour clockwise, and the relative
+    # minor (3 semitones down) shares the number of its major
+    from utils.camelot_map import CAMELOT_MAP, MAJOR_KEY_NAMES, MINOR_KEY_NAMES
+    from audio_analysis.key_estimation import KEY_CAMELOT
+    
+    for pitch_class in range(12):
+        hour = (7 * pitch_class + 7) % 12 + 1   # C = 8, G = 9, D = 10...
+        assert CAMELOT_MAP[MAJOR_KEY_NAMES[pitch_class]] == f"{hour}B", MAJOR_KEY_NAMES[pitch_class]
+        relative_minor = MINOR_KEY_NAMES[(pitch_class + 9) % 12]
+        assert CAMELOT_MAP[relative_minor] == f"{hour}A", relative_minor
+    assert len(set(CAMELOT_MAP.values())) == 24
+    assert sorted(KEY_CAMELOT) == sorted(CAMELOT_MAP.values())
+    print("  ✓ All 24 keys follow the circle of fifths (G Major → 9B, E Minor → 9A)")
+    
     # Test 2: Relative minor/major
     rel = get_relative_minor("8B")
     assert rel == "8A", f"Expected '8A', got '{rel}'"
@@ -65,9 +79,836 @@ def test_file_manager():
     files = find_audio_files(".")
     print(f"  ✓ Found {len(files)} audio files in current directory")
     
+    # Single-pass scanner: case-insensitive, same result with threads
+    import os
+    import tempfile
+    from file_manager.scanner import scan_audio_files
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "sub", "deep"))
+        for name in ("a.mp3", "sub/B.MP3", "sub/deep/c.Flac", "sub/notes.txt"):
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(b"x")
+        
+        found = sorted(os.path.basename(r["path"]) for r in scan_audio_files(tmp))
+        assert found == ["B.MP3", "a.mp3", "c.Flac"], found
+        threaded = sorted(os.path.basename(r["path"]) for r in scan_audio_files(tmp, workers=4))
+        assert threaded == found
+        print("  ✓ Scanner matches extensions case-insensitively in one pass")
+    
+    # Scan journal: added / modified / moved / deleted
+    from file_manager.scan_journal import diff_snapshots
+    
+    old = {"a.mp3": {"size": 1, "mtime": 1.0, "inode": 10},
+           "b.mp3": {"size": 2, "mtime": 1.0, "inode": 11},
+           "c.mp3": {"size": 3, "mtime": 1.0, "inode": 12}}
+    new = {"a.mp3": {"size": 1, "mtime": 2.0, "inode": 10},
+           "renamed.mp3": {"size": 2, "mtime": 1.0, "inode": 11},
+           "d.mp3": {"size": 4, "mtime": 1.0, "inode": 13}}
+    changes = diff_snapshots(old, new)
+    assert changes["added"] == ["d.mp3"]
+    assert changes["modified"] == ["a.mp3"]
+    assert changes["moved"] == [("b.mp3", "renamed.mp3")]
+    assert changes["deleted"] == ["c.mp3"]
+    print("  ✓ Scan journal detects added/modified/moved/deleted files")
+    
+    # Progress reporting / cancellation used by the GUI workers
+    from file_manager.organizaer import _watch_progress
+    
+    reported = []
+    stream = _watch_progress(({"file_path": str(i)} for i in range(10)), 10,
+                             lambda done, total, analysis: reported.append((done, total)),
+                             should_stop=lambda: len(reported) >= 3)
+    assert len(list(stream)) == 3
+    assert reported == [(1, 10), (2, 10), (3, 10)]
+    print("  ✓ Long jobs report progress and stop when cancelled")
+    
+    # Organize checkpoint: finished files survive a crash
+    from file_manager.organize_job import OrganizeCheckpoint
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "song.mp3")
+        destination = os.path.join(tmp, "song_copy.mp3")
+        for path in (source, destination):
+            with open(path, "wb") as f:
+                f.write(b"x")
+        
+        checkpoint = OrganizeCheckpoint.for_output(tmp)
+        checkpoint.record(source, {"camelot": "8A"}, destination)
+        checkpoint.close()
+        with open(checkpoint.checkpoint_path, "a") as f:
+            f.write('{"source": "half-writ')   # crash mid-line
+        
+        reloaded = OrganizeCheckpoint.for_output(tmp)
+        assert [r["destination"] for r in reloaded.finished_records()] == [destination]
+        reloaded.clear()
+        assert not reloaded.checkpoint_path.exists()
+        print("  ✓ Organize checkpoint reloads finished files after a crash")
+        
+        # Same output folder, another input folder: nothing carries over
+        first = OrganizeCheckpoint.for_output(tmp, "/music/inbox")
+        first.record(source, {"camelot": "8A"}, destination)
+        first.close()
+        other = OrganizeCheckpoint.for_output(tmp, "/music/other")
+        assert other.finished_records() == []
+        other.record(source, {"camelot": "9A"}, destination)
+        other.close()
+        assert OrganizeCheckpoint.for_output(tmp, "/music/inbox").finished_records() == []
+        again = OrganizeCheckpoint.for_output(tmp, "/music/other").finished_records()
+        assert [r["analysis"]["camelot"] for r in again] == ["9A"]
+        print("  ✓ A checkpoint of another input folder is ignored and replaced")
+    
+    # Link modes: no second copy of the bytes, copy as the fallback
+    from file_manager.transfer import transfer_file
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "song.mp3")
+        with open(source, "wb") as f:
+            f.write(b"audio")
+        
+        linked = os.path.join(tmp, "linked.mp3")
+        assert transfer_file(source, linked, "auto") in ("reflink", "hardlink", "copy")
+        assert transfer_file(source, os.path.join(tmp, "copy.mp3"), "copy") == "copy"
+        with open(linked, "rb") as f:
+            assert f.read() == b"audio"
+        print("  ✓ Link modes fall back to copying when needed")
+        
+        # A link left in the key folder must not be written through
+        # when a different track with the same name is copied there
+        for mode in ("hardlink", "symlink"):
+            originals = []
+            for folder, data in (("x", b"track x"), ("y", b"track y")):
+                os.makedirs(os.path.join(tmp, mode, folder))
+                originals.append(os.path.join(tmp, mode, folder, "song.mp3"))
+                with open(originals[-1], "wb") as f:
+                    f.write(data)
+            key_folder = os.path.join(tmp, mode, "8A")
+            os.makedirs(key_folder)
+            destination = os.path.join(key_folder, "song.mp3")
+            
+            transfer_file(originals[0], destination, mode)
+            assert transfer_file(originals[1], destination, "copy") == "copy"
+            with open(originals[0], "rb") as f:
+                assert f.read() == b"track x"
+            with open(destination, "rb") as f:
+                assert f.read() == b"track y"
+            assert not os.path.islink(destination)
+        print("  ✓ Copying over a linked file never touches the original")
+        
+        # Organize with links, then again in copy mode: the key folder
+        # must end up with real copies, independent of the originals
+        from file_manager.organizaer import place_in_key_folder
+        
+        for mode in ("hardlink", "symlink"):
+            original = os.path.join(tmp, f"{mode}-track.mp3")
+            with open(original, "wb") as f:
+                f.write(b"original audio")
+            library = os.path.join(tmp, f"{mode}-library")
+            
+            place_in_key_folder(original, "8A", library, link_mode=mode)
+            placed = place_in_key_folder(original, "8A", library, link_mode="copy")
+            assert not os.path.islink(placed) and not os.path.samefile(original, placed)
+            with open(placed, "r+b") as f:
+                f.write(b"EDITED")
+            with open(original, "rb") as f:
+                assert f.read() == b"original audio"
+        print("  ✓ Switching back to copy mode replaces links with real copies")
+        
+        # Kernel copy answering 0 ("can't do it here", as on some
+        # FUSE/NFS/overlay mounts): fall back, never a truncated file
+        from file_manager import transfer
+        
+        real_calls = {name: getattr(os, name, None) for name in ("copy_file_range", "sendfile")}
+        try:
+            for name in real_calls:
+                setattr(os, name, lambda *args: 0)
+            copied = os.path.join(tmp, "fallback.mp3")
+            assert transfer_file(source, copied, "copy") == "copy"
+            with open(copied, "rb") as f:
+                assert f.read() == b"audio"
+            
+            # Stopping halfway is an error, not a success
+            sizes = iter([2])
+            os.copy_file_range = lambda *args: next(sizes, 0)
+            with open(source, "rb") as src, open(os.path.join(tmp, "half.mp3"), "wb") as dst:
+                try:
+                    transfer._kernel_copy(src.fileno(), dst.fileno(), 5)
+                    assert False, "short copy reported as done"
+                except OSError:
+                    pass
+        finally:
+            for name, call in real_calls.items():
+                if call is None:
+                    if hasattr(os, name):
+                        delattr(os, name)
+                else:
+                    setattr(os, name, call)
+        assert not [n for n in os.listdir(tmp) if n.endswith(".part")]
+        print("  ✓ Kernel copies that return 0 fall back to a normal copy")
+    
+    # Transfer pool: bounded, reports every transfer and its errors
+    from file_manager.transfer import TransferPool
+    
+    def fake_transfer(n):
+        if n == 3:
+            raise OSError("disk full")
+        return {"method": "copy", "bytes": 10}
+    
+    pool = TransferPool(workers=2, max_in_flight=2)
+    finished = []
+    for n in range(6):
+        finished.extend(pool.submit(fake_transfer, n, n))
+    finished.extend(pool.drain())
+    assert sorted(context for context, _, _ in finished) == list(range(6))
+    assert [context for context, _, error in finished if error] == [3]
+    assert pool.stats()["bytes"] == 50
+    print("  ✓ Transfer pool runs copies concurrently and reports throughput")
+    
+    # Waiting for the next analysis is not transfer time
+    import time
+    
+    def slow_transfer(n):
+        time.sleep(0.05)
+        return {"method": "copy", "bytes": 10}
+    
+    pool = TransferPool(workers=2)
+    for n in range(4):
+        pool.submit(slow_transfer, n, n)
+        time.sleep(0.1)   # the analysis of the next track
+    pool.drain()
+    assert 0.2 <= pool.stats()["seconds"] < 0.3
+    print("  ✓ Throughput counts only the time transfers were running")
+    
     print("✅ File Manager tests passed!\n")
 
 
+def test_library_index():
+    """Test the key/BPM library index."""
+    print("🧪 Testing Library Index...")
+    
+    import os
+    import tempfile
+    from file_manager.library_index import LibraryIndex
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LibraryIndex.for_library(tmp)
+        tracks = [("a.mp3", "8A", 124), ("b.mp3", "9A", 128),
+                  ("c.mp3", "8A", 140), ("d.mp3", "3B", 126)]
+        for name, camelot, bpm in tracks:
+            index.add({"file_path": os.path.join(tmp, name), "key": "", "camelot": camelot,
+                       "bpm": bpm, "duration": 300.0, "confidence": 0.5})
+        
+        found = [os.path.basename(t["file_path"]) for t in index.query("8A", bpm_range=(124, 128))]
+        assert sorted(found) == ["a.mp3", "b.mp3"], found
+        print("  ✓ Compatible keys within a BPM range")
+        
+        index.remove(os.path.join(tmp, "a.mp3"))
+        assert [os.path.basename(t["file_path"]) for t in index.query("8A", compatible=False)] == ["c.mp3"]
+        print("  ✓ Incremental removal")
+        
+        # A relative path is the same track as its absolute path
+        cwd = os.getcwd()
+        try:
+            os.chdir(tmp)
+            index.add({"file_path": "c.mp3", "camelot": "8A", "bpm": 141})
+        finally:
+            os.chdir(cwd)
+        assert len(index) == 3 and index.get(os.path.join(tmp, "c.mp3"))["bpm"] == 141
+        print("  ✓ Paths are stored absolute - no duplicates")
+        
+        index.save()
+        reloaded = LibraryIndex.for_library(tmp)
+        assert len(reloaded) == 3 and reloaded.keys() == ["3B", "8A", "9A"]
+        print("  ✓ Saved and lazily reloaded from disk")
+        
+        # Failed analyses are not counted as added
+        library = os.path.join(tmp, "library")
+        os.makedirs(library)
+        with open(os.path.join(library, "broken.mp3"), "wb") as f:
+            f.write(b"not audio")
+        refreshed = LibraryIndex.for_library(library).refresh(use_cache=False, workers=1)
+        assert refreshed == {"added": 0, "removed": 0}, refreshed
+        print("  ✓ refresh() only counts tracks it could index")
+        
+        # ...and doesn't analyze them again until they change
+        from file_manager import organizaer
+        
+        analyzed = []
+        real_analyze = organizaer._analyze_files
+        
+        def counting_analyze(files, *args, **kwargs):
+            analyzed.extend(files)
+            return real_analyze(files, *args, **kwargs)
+        
+        organizaer._analyze_files = counting_analyze
+        try:
+            LibraryIndex.for_library(library).refresh(use_cache=False, workers=1)
+            assert analyzed == []
+            
+            LibraryIndex.for_library(library).refresh(use_cache=False, workers=1,
+                                                      retry_failed=True)
+            assert len(analyzed) == 1
+            
+            with open(os.path.join(library, "broken.mp3"), "ab") as f:
+                f.write(b" - edited")
+            LibraryIndex.for_library(library).refresh(use_cache=False, workers=1)
+            assert len(analyzed) == 2
+        finally:
+            organizaer._analyze_files = real_analyze
+        print("  ✓ Files that failed are skipped until they change")
+        
+        # Playlists built through the index get it refreshed first
+        from file_manager.organizaer import create_playlist, with_library_index
+        
+        for name in ("b.mp3", "c.mp3", "d.mp3"):
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(b"x")
+        playlist = with_library_index(create_playlist, tmp, output_file=os.path.join(tmp, "8a.m3u"),
+                                      target_key="8A", use_cache=False, workers=1)
+        assert sorted(os.path.basename(p) for p in playlist) == ["b.mp3", "c.mp3"], playlist
+        print("  ✓ Playlists are answered from the refreshed index")
+    
+    print("✅ Library Index tests passed!\n")
+
+
+def test_refine_collision():
+    """Test that refining never moves a track over another one."""
+    print("🧪 Testing Refinement Name Collisions...")
+    
+    import os
+    import json
+    import tempfile
+    from file_manager import organizaer
+    from file_manager.library_index import get_library_index
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tracks = {}
+        for camelot, data in (("8A", b"provisional track"), ("9A", b"another track")):
+            os.makedirs(os.path.join(tmp, camelot))
+            tracks[camelot] = os.path.join(tmp, camelot, "song.mp3")
+            with open(tracks[camelot], "wb") as f:
+                f.write(data)
+        
+        index = get_library_index(tmp)
+        index.add({"file_path": tracks["8A"], "camelot": "8A", "bpm": 124,
+                   "provisional": True})
+        index.add({"file_path": tracks["9A"], "camelot": "9A", "bpm": 126})
+        
+        def fake_analysis(files, *args, **kwargs):
+            return [{"file_path": f, "key": "E Minor", "camelot": "9A",
+                     "bpm": 124, "confidence": 0.8} for f in files]
+        
+        real_analyze = organizaer._analyze_files
+        organizaer._analyze_files = fake_analysis
+        try:
+            results = organizaer.refine_organized(tmp)
+        finally:
+            organizaer._analyze_files = real_analyze
+        
+        assert results["moved"] == 1
+        with open(tracks["9A"], "rb") as f:
+            assert f.read() == b"another track"
+        moved = os.path.join(tmp, "9A", "song (2).mp3")
+        with open(moved, "rb") as f:
+            assert f.read() == b"provisional track"
+        assert sorted(t["file_path"] for t in index.query()) == [moved, tracks["9A"]]
+        
+        with open(os.path.join(tmp, organizaer.REFINEMENT_LOG_FILENAME)) as f:
+            entry = json.loads(f.readline())
+        assert entry["renamed_from"] == tracks["8A"] and entry["file"] == moved
+        print("  ✓ A moved track gets a free name and the rename is logged")
+    
+    print("✅ Refinement Name Collision tests passed!\n")
+
+
+def test_analysis_cache():
+    """Test the persistent analysis cache (no librosa needed)."""
+    print("🧪 Testing Analysis Cache...")
+    
+    import os
+    import tempfile
+    from audio_analysis.analysis_cache import AnalysisCache
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        track = os.path.join(tmp, "song.mp3")
+        with open(track, "wb") as f:
+            f.write(b"fake audio")
+        
+        cache = AnalysisCache(os.path.join(tmp, "cache.sqlite"), max_entries=1)
+        analysis = {"file_path": track, "key": "A Minor", "camelot": "8A",
+                    "bpm": 128, "duration": 60.0, "confidence": 0.8}
+        
+        assert cache.get(track) is None
+        cache.put(track, analysis)
+        cached = cache.get(track)
+        assert cached["camelot"] == "8A" and cached["bpm"] == 128
+        print("  ✓ Stored and retrieved an analysis")
+        
+        # Changing the file invalidates its entry
+        with open(track, "ab") as f:
+            f.write(b"more")
+        assert cache.get(track) is None
+        print("  ✓ Modified file is re-analyzed")
+        
+        # Size cap evicts the least recently used entry
+        other = os.path.join(tmp, "other.mp3")
+        with open(other, "wb") as f:
+            f.write(b"x")
+        cache.put(track, analysis)
+        cache.put(other, analysis)
+        assert len(cache) == 1 and cache.get(other) is not None
+        print("  ✓ LRU eviction keeps the cache under its size cap")
+        
+        # A failed key detection must not be remembered
+        failed = dict(analysis, key="Erro ao detectar: boom", camelot="Unknown",
+                      confidence=0.0)
+        cache.put(track, failed)
+        assert cache.get(track) is None
+        print("  ✓ Analyses without a key are not cached")
+        cache.close()
+        
+        # Hits don't write to the database one by one
+        from audio_analysis import analysis_cache
+        
+        cache = AnalysisCache(os.path.join(tmp, "hits.sqlite"))
+        tracks = []
+        for n in range(3):
+            tracks.append(os.path.join(tmp, f"hit{n}.mp3"))
+            with open(tracks[-1], "wb") as f:
+                f.write(b"audio")
+            cache.put(tracks[-1], dict(analysis, file_path=tracks[-1]))
+        commits = []
+        
+        class CountingConnection:
+            def __init__(self, conn):
+                self.conn = conn
+            def commit(self):
+                commits.append(1)
+                self.conn.commit()
+            def __getattr__(self, name):
+                return getattr(self.conn, name)
+        
+        cache._conn = CountingConnection(cache._conn)
+        batch_size = analysis_cache.TOUCH_BATCH
+        analysis_cache.TOUCH_BATCH = 3
+        try:
+            for track in tracks[:2] * 5:
+                assert cache.get(track) is not None
+            assert commits == []
+            assert cache.get(tracks[2]) is not None
+            assert len(commits) == 1
+        finally:
+            analysis_cache.TOUCH_BATCH = batch_size
+        print("  ✓ Last-used times of cache hits are written in batches")
+        cache.close()
+    
+    print("✅ Analysis Cache tests passed!\n")
+
+
+def _crashing_worker(file_path, decode_profile="quality", keep_features=False):
+    """Stand-in for batch._analyze_worker: dies hard on crash.mp3."""
+    import os
+    import time
+    if file_path.endswith("crash.mp3"):
+        os._exit(1)   # like a segfault in a decoder
+    time.sleep(0.05)
+    return {"file_path": file_path, "camelot": "8A", "bpm": 128}
+
+
+def test_batch_crash_recovery():
+    """Test that a crashing worker only fails its own file."""
+    print("🧪 Testing Batch Crash Recovery...")
+    
+    import multiprocessing
+    from audio_analysis import batch
+    
+    if multiprocessing.get_start_method() != "fork":
+        print("  ⚠️  needs the 'fork' start method - skipping")
+        return
+    
+    files = [f"/music/{n}.mp3" for n in range(6)] + ["/music/crash.mp3"]
+    real_worker = batch._analyze_worker
+    batch._analyze_worker = _crashing_worker
+    try:
+        results = {r["file_path"]: r for r in batch.analyze_tracks(files, workers=3,
+                                                                   use_cache=False)}
+    finally:
+        batch._analyze_worker = real_worker
+    
+    assert sorted(results) == sorted(files)
+    assert [p for p, r in results.items() if "error" in r] == ["/music/crash.mp3"]
+    print("  ✓ Files in flight with the crash are retried, only the culprit fails")
+    
+    # A shared pool survives the call - and a crash inside it
+    pool = batch.WorkerPool(2)
+    batch._analyze_worker = _crashing_worker
+    try:
+        list(batch.analyze_tracks(files[:2], use_cache=False, pool=pool))
+        executor = pool.executor
+        list(batch.analyze_tracks(files[2:4], use_cache=False, pool=pool))
+        assert pool.executor is executor
+        list(batch.analyze_tracks(files[4:], use_cache=False, pool=pool))
+        results = list(batch.analyze_tracks(files[:2], use_cache=False, pool=pool))
+        assert all("error" not in r for r in results)
+    finally:
+        batch._analyze_worker = real_worker
+        pool.shutdown()
+    print("  ✓ A WorkerPool is reused across calls and recovers from a crash")
+    
+    print("✅ Batch Crash Recovery tests passed!\n")
+
+
+def test_watcher_errors():
+    """Test that one failing track doesn't stop the library watcher."""
+    print("🧪 Testing Watcher Error Handling...")
+    
+    import os
+    import tempfile
+    from file_manager.watcher import LibraryWatcher
+    from file_manager.library_index import LibraryIndex
+    
+    def broken_callback(analysis, destination):
+        raise RuntimeError("GUI went away")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox, library = os.path.join(tmp, "inbox"), os.path.join(tmp, "library")
+        os.makedirs(inbox)
+        watcher = LibraryWatcher(inbox, library, on_organized=broken_callback)
+        index = LibraryIndex(os.path.join(tmp, "index.json"))
+        
+        for name in ("a.mp3", "b.mp3"):
+            track = os.path.join(inbox, name)
+            with open(track, "wb") as f:
+                f.write(b"fake audio")
+            watcher._organize({"file_path": track, "camelot": "8A", "bpm": 128}, index)
+        
+        assert sorted(os.listdir(os.path.join(library, "8A"))) == ["a.mp3", "b.mp3"]
+        print("  ✓ A raising on_organized callback doesn't stop the next track")
+        
+        watcher._organize({"file_path": os.path.join(inbox, "gone.mp3"),
+                           "camelot": "8A"}, index)
+        print("  ✓ A file that vanished is reported, not raised")
+    
+    print("✅ Watcher Error Handling tests passed!\n")
+
+
+def test_pcm_cache():
+    """Test the decoded-audio cache's LRU eviction."""
+    print("🧪 Testing PCM Cache...")
+    
+    import os
+    import tempfile
+    from audio_analysis.pcm_cache import PcmCache
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PcmCache(tmp, max_bytes=2500)
+        for age, name in enumerate(["old", "middle", "new"]):
+            path = os.path.join(tmp, f"{name}.npy")
+            with open(path, "wb") as f:
+                f.write(b"x" * 1000)
+            os.utime(path, (age, age))
+        
+        assert cache.evict() == 1
+        assert sorted(os.listdir(tmp)) == ["middle.npy", "new.npy"]
+        print("  ✓ Least recently used excerpts are evicted over budget")
+    
+    print("✅ PCM Cache tests passed!\n")
+
+
+def test_tag_parsing():
+    """Test key/BPM tag parsing (no mutagen needed)."""
+    print("🧪 Testing Tag Parsing...")
+    
+    from audio_analysis.tag_reader import parse_key_tag, parse_bpm_tag
+    
+    assert parse_key_tag("8A") == ("A Minor", "8A")
+    assert parse_key_tag("08A") == ("A Minor", "8A")
+    print("  ✓ Camelot tags (8A, 08A)")
+    
+    assert parse_key_tag("1m") == ("A Minor", "8A")
+    assert parse_key_tag("1d") == ("C Major", "8B")
+    print("  ✓ Open Key tags (1m, 1d)")
+    
+    assert parse_key_tag("Am") == ("A Minor", "8A")
+    assert parse_key_tag("C") == ("C Major", "8B")
+    assert parse_key_tag("Ab minor") == ("G# Minor", "1A")
+    print("  ✓ Musical tags (Am, C, Ab minor)")
+    
+    # Every key, in every notation, ends up on the same name and code
+    spellings = [["C", "B#"], ["C#", "Db"], ["D"], ["D#", "Eb"], ["E", "Fb"],
+                 ["F", "E#"], ["F#", "Gb"], ["G"], ["G#", "Ab"], ["A"],
+                 ["A#", "Bb"], ["B", "Cb"]]
+    for pitch_class, notes in enumerate(spellings):
+        for is_major, suffixes in ((True, ("", "maj", " Major")), (False, ("m", "min", " minor"))):
+            tonic = pitch_class if is_major else (pitch_class + 3) % 12   # relative major
+            hour = (7 * tonic + 7) % 12 + 1
+            camelot = f"{hour}{'B' if is_major else 'A'}"
+            open_key = f"{(hour + 4) % 12 + 1}{'d' if is_major else 'm'}"
+            expected = parse_key_tag(camelot)
+            assert expected[1] == camelot and expected[0].split()[1] == ("Major" if is_major else "Minor")
+            assert parse_key_tag(open_key) == expected, open_key
+            for note in notes:
+                for suffix in suffixes:
+                    assert parse_key_tag(note + suffix) == expected, note + suffix
+    assert parse_key_tag("12B") == ("E Major", "12B")
+    assert parse_key_tag("G") == ("G Major", "9B") and parse_key_tag("Ab") == ("Ab Major", "4B")
+    print("  ✓ All 24 keys as Camelot, Open Key and note names (sharps and flats)")
+    
+    assert parse_key_tag("") is None
+    assert parse_key_tag("unknown") is None
+    print("  ✓ Garbage tags are ignored")
+    
+    assert parse_bpm_tag("127.98") == 128
+    assert parse_bpm_tag("124 BPM") == 124
+    assert parse_bpm_tag("0") is None
+    print("  ✓ BPM tags")
+    
+    print("✅ Tag Parsing tests passed!\n")
+
+
+def test_bpm_folding():
+    """Test half/double-time BPM folding (no librosa needed)."""
+    print("🧪 Testing BPM Folding...")
+    
+    from audio_analysis.rhythm import fold_bpm
+    
+    candidates = [[31.0, 0.2], [62.0, 0.9], [124.0, 0.7], [248.0, 0.4]]
+    assert fold_bpm(candidates) == 124.0
+    print("  ✓ House tracked at 62 BPM is folded to 124")
+    
+    assert fold_bpm(candidates, preferred_range=(50, 80)) == 62.0
+    print("  ✓ Stored candidates can be re-folded into another range")
+    
+    assert fold_bpm([[40.0, 0.9], [80.0, 0.1]], preferred_range=(85, 175)) == 160.0
+    print("  ✓ Nothing in range: the best candidate is doubled into it")
+    
+    print("✅ BPM Folding tests passed!\n")
+
+
+def test_beatgrid_folding():
+    """Test that the beatgrid follows a folded tempo (needs numpy)."""
+    print("🧪 Testing Beatgrid Folding...")
+    
+    try:
+        import numpy as np
+    except ImportError:
+        print("  ⚠️  numpy not installed - skipping")
+        return
+    
+    from audio_analysis.rhythm import fold_grid
+    
+    # 124 BPM, 10 s of onsets: beats at 0.3 s + n periods, the "1" of
+    # every bar on beat 1 (hardest), hi-hats on the off-beats (weak)
+    frame_time = 512 / 22050
+    period = 60 / 124
+    env = np.zeros(int(10 / frame_time))
+    for n in range(int(9.5 / period)):
+        beat = 0.3 + n * period
+        env[int(round(beat / frame_time))] = 3.0 if n % 4 == 1 else 2.0
+        env[int(round((beat + period / 2) / frame_time))] = 0.5
+    downbeat = 0.3 + period
+    
+    # Tracked at 248, starting on a hi-hat
+    phase, bar = fold_grid(env, frame_time, 0.3 + period / 2, period / 2, period)
+    assert abs(phase % period - 0.3) < frame_time
+    assert abs(phase + bar * period - downbeat) < frame_time
+    print("  ✓ Double-time grid: the phase moves from the off-beat to the beat")
+    
+    # Tracked at 62, on beats 0, 2, 4... - the downbeat is in between
+    phase, bar = fold_grid(env, frame_time, 0.3, 2 * period, period)
+    assert abs(phase - 0.3) < frame_time
+    assert abs(phase + bar * period - downbeat) < frame_time
+    print("  ✓ Half-time grid: the downbeat can land between tracked beats")
+    
+    print("✅ Beatgrid Folding tests passed!\n")
+
+
+def test_mp3_frame_scan():
+    """Test the MP3 frame header walk used by the preview (no decoder needed)."""
+    print("🧪 Testing MP3 Frame Scan...")
+    
+    from audio_analysis.preview import parse_frame_header, scan_frames
+    
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding
+    header = bytes([0xFF, 0xFB, 0x90, 0x00])
+    assert parse_frame_header(header) == (417, 44100, 1152)
+    assert parse_frame_header(b"ID3\x04") is None
+    print("  ✓ Frame header → length, sample rate, samples per frame")
+    
+    # ID3 tag, 10 frames, a bit of junk, 5 more frames
+    frame = header + bytes(413)
+    tag = b"ID3\x04\x00\x00\x00\x00\x00\x05" + bytes(5)
+    data = tag + frame * 10 + b"junk" + frame * 5
+    offsets, lengths, sample_rate, samples = scan_frames(data)
+    assert len(offsets) == 15 and offsets[0] == len(tag)
+    assert offsets[10] == len(tag) + 417 * 10 + 4
+    assert sample_rate == 44100 and samples == 1152
+    print("  ✓ Frames found past the ID3 tag and garbage")
+    
+    # A lone sync pattern in the junk (here a 48 kHz header) must not
+    # lock the scan onto the wrong stream
+    stray = bytes([0xFF, 0xFB, 0x94, 0x00])
+    offsets, lengths, sample_rate, samples = scan_frames(tag + b"art" + stray + frame * 5)
+    assert len(offsets) == 5 and sample_rate == 44100
+    print("  ✓ A stray header needs back-to-back frames before it's trusted")
+    
+    assert scan_frames(b"not an mp3 at all") is None
+    print("  ✓ Non-MP3 data is rejected")
+    
+    print("✅ MP3 Frame Scan tests passed!\n")
+
+
+def test_set_sequencer():
+    """Test beam-search set ordering over a synthetic library."""
+    print("🧪 Testing Set Sequencer...")
+    
+    from file_manager.set_sequencer import NeighborIndex, key_distance, sequence_set
+    
+    assert key_distance("8A", "9A") == 1 and key_distance("8A", "8B") == 1
+    assert key_distance("12A", "1A") == 1 and key_distance("8A", "11B") == 4
+    assert key_distance("8A", "Unknown") is None
+    print("  ✓ Key distance = harmonic mixes around the wheel")
+    
+    # 10 tracks in every key, 118-127 BPM, getting louder with the BPM
+    tracks = [
+        {"file_path": f"/music/{number}{letter}_{i}.mp3",
+         "camelot": f"{number}{letter}", "bpm": 118 + i, "loudness": -20.0 + i}
+        for number in range(1, 13) for letter in "AB" for i in range(10)
+    ]
+    tracks.append({"file_path": "/music/no_bpm.mp3", "camelot": "8A", "bpm": None})
+    
+    index = NeighborIndex(tracks, neighbors=8)
+    assert len(index) == 240
+    first = index.in_key("8A")[0]
+    neighbors = index.neighbors(first)
+    assert 0 < len(neighbors) <= 8 and first not in [j for _, j in neighbors]
+    assert {index.tracks[j]["camelot"] for _, j in neighbors} == {"7A", "8A", "9A", "8B"}
+    print("  ✓ Neighbors come from every compatible key, tracks without BPM left out")
+    
+    tracks_set = sequence_set(tracks, length=12, start_key="8A", end_key="11A", index=index)
+    keys = [t["camelot"] for t in tracks_set]
+    assert len(tracks_set) == 12
+    assert len({t["file_path"] for t in tracks_set}) == 12
+    assert keys[0] == "8A" and keys[-1] == "11A"
+    assert all(key_distance(a, b) <= 1 for a, b in zip(keys, keys[1:]))
+    print(f"  ✓ 12-track set: {' > '.join(keys)}")
+    
+    assert sequence_set(tracks, length=5, start_key="5X") == []
+    print("  ✓ Unknown start key gives an empty set")
+    
+    print("✅ Set Sequencer tests passed!\n")
+
+
+def test_key_estimation():
+    """Test the 24-key profile matching (needs numpy)."""
+    print("🧪 Testing Key Estimation...")
+    
+    try:
+        import numpy as np
+    except ImportError:
+        print("  ⚠️  numpy not installed - skipping")
+        return
+    
+    from audio_analysis.key_estimation import (
+        KRUMHANSL_MAJOR, KRUMHANSL_MINOR, estimate_key, estimate_keys, classify_keys
+    )
+    
+    # A chroma shaped exactly like a key profile must come out as that key
+    a_minor = np.roll(KRUMHANSL_MINOR, 9)
+    result = estimate_key(a_minor)
+    assert result['key'] == "A Minor" and result['camelot'] == "8A"
+    assert result['ranking'][0] == ("A Minor", 1.0)
+    print("  ✓ A minor profile → A Minor (8A)")
+    
+    batch = np.stack([a_minor, np.roll(KRUMHANSL_MAJOR, 2), np.zeros(12)])
+    results = estimate_keys(batch)
+    assert [r['camelot'] for r in results] == ["8A", "10B", "Unknown"]
+    assert 0 < results[0]['confidence'] <= 1
+    print("  ✓ Batches of chroma vectors (silence → Unknown)")
+    
+    columns = classify_keys(batch)
+    assert columns['camelot'] == ["8A", "10B", "Unknown"]
+    assert list(columns['confidence']) == [r['confidence'] for r in results]
+    print("  ✓ Column-wise scoring matches the per-track results")
+    
+    # Re-keying the cache uses the stored chroma, no audio needed
+    import os
+    import tempfile
+    from audio_analysis.analysis_cache import AnalysisCache
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        track = os.path.join(tmp, "song.mp3")
+        with open(track, "wb") as f:
+            f.write(b"fake audio")
+        
+        cache = AnalysisCache(os.path.join(tmp, "cache.sqlite"))
+        cache.put(track, {"file_path": track, "key": "C Major", "camelot": "8B",
+                          "bpm": 128, "duration": 60.0, "confidence": 0.1,
+                          "chroma": a_minor.tolist(), "correlation": 0.2,
+                          "ranking": [("C Major", 0.2)]})
+        assert cache.rekey() == 1
+        rekeyed = cache.get(track)
+        assert rekeyed["camelot"] == "8A"
+        assert rekeyed["ranking"][0] == ["A Minor", 1.0] and rekeyed["correlation"] == 1.0
+        print("  ✓ Cached tracks are re-keyed from their stored chroma")
+        cache.close()
+    
+    print("✅ Key Estimation tests passed!\n")
+
+
+def test_feature_store():
+    """Test the columnar feature store (needs numpy)."""
+    print("🧪 Testing Feature Store...")
+    
+    try:
+        import numpy as np
+    except ImportError:
+        print("  ⚠️  numpy not installed - skipping")
+        return
+    
+    import os
+    import tempfile
+    from audio_analysis.feature_store import FeatureStore
+    
+    def features(value):
+        return {
+            "chroma_mean": np.full(12, value, dtype=np.float32),
+            "chroma_var": np.zeros(12, dtype=np.float32),
+            "chroma_series": np.zeros((32, 12), dtype=np.float16),
+            "tempogram": np.zeros(192, dtype=np.float16),
+            "loudness": np.float32(-12.0),
+        }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tracks = []
+        for name in ("a.mp3", "b.mp3"):
+            tracks.append(os.path.join(tmp, name))
+            with open(tracks[-1], "wb") as f:
+                f.write(b"fake audio")
+        
+        store = FeatureStore.for_library(tmp)
+        store.add(tracks[0], features(0.1))
+        store.add(tracks[1], features(0.2))
+        store.save()
+        
+        # Replacing one track keeps the other
+        reopened = FeatureStore.for_library(tmp)
+        reopened.add(tracks[0], features(0.3))
+        reopened.save()
+        columns = FeatureStore.for_library(tmp).columns()
+        assert columns["chroma_mean"].shape == (2, 12)
+        means = dict(zip(columns["path"], columns["chroma_mean"][:, 0]))
+        assert np.isclose(means[tracks[0]], 0.3) and np.isclose(means[tracks[1]], 0.2)
+        print("  ✓ Records are stored column by column and can be replaced")
+        
+        with open(tracks[1], "ab") as f:
+            f.write(b"more")
+        assert tracks[0] in reopened and tracks[1] not in reopened
+        print("  ✓ Modified files need new features")
+    
+    print("✅ Feature Store tests passed!\n")
+
+
 def test_audio_analysis():
     """Test the audio analysis (may fail without librosa)."""
     print("🧪 Testing Audio Analysis Module...")
@@ -117,6 +958,19 @@ def main():
     try:
         test_utils()
         test_file_manager()
+        test_library_index()
+        test_refine_collision()
+        test_analysis_cache()
+        test_batch_crash_recovery()
+        test_watcher_errors()
+        test_pcm_cache()
+        test_tag_parsing()
+        test_bpm_folding()
+        test_beatgrid_folding()
+        test_mp3_frame_scan()
+        test_set_sequencer()
+        test_key_estimation()
+        test_feature_store()
         test_audio_analysis()
         
         print("=" * 50)
@@ -2,33 +2,33 @@
 Camelot Wheel Mapping - Harmonic Mixing Helper
 
 The Camelot system is a way to represent musical keys using numbers (1-12)
-and letters (A for major, B for minor). This makes it easy for DJs to mix
+and letters (A for minor, B for major). This makes it easy for DJs to mix
 songs that sound good together harmonically.
 
-Example: "8A" means C# Minor, and it can mix with:
+Example: "8A" means A Minor, and it can mix with:
   - Same key: 8A
-  - Relative major: 8B (A# Major / C# Minor are the same key)
+  - Relative major: 8B (C Major / A Minor use the same notes)
   - +/- 1 hour on the wheel: 7A, 9A, 8B, 8A
 """
 
 # Think of the Camelot wheel like a clock:
-# - Numbers 1-12 represent the 12 musical notes
-# - 'A' = Major scale (happy, bright sound)
-# - 'B' = Minor scale (sad, dark sound)
+# - Numbers 1-12 go around the circle of fifths (one hour = one fifth)
+# - 'A' = Minor scale (sad, dark sound)
+# - 'B' = Major scale (happy, bright sound)
 
 # This dictionary maps standard key names to their Camelot notation
 # The key is the "musical" name, the value is the Camelot code
 CAMELOT_MAP = {
-    # Major Keys (the "A" circle)
+    # Major Keys (the "B" circle)
     "C Major": "8B",
     "C# Major": "3B",  # Also called Db Major
     "D Major": "10B",
-    "Eb Major": "3B",  # Also called D# Major
-    "E Major": "7B",
-    "F Major": "2B",
-    "F# Major": "9B",  # Also called Gb Major
-    "G Major": "4B",
-    "Ab Major": "9B",  # Also called G# Major
+    "Eb Major": "5B",  # Also called D# Major
+    "E Major": "12B",
+    "F Major": "7B",
+    "F# Major": "2B",  # Also called Gb Major
+    "G Major": "9B",
+    "Ab Major": "4B",  # Also called G# Major
     "A Major": "11B",
     "Bb Major": "6B",  # Also called A# Major
     "B Major": "1B",
@@ -48,6 +48,18 @@ CAMELOT_MAP = {
     "B Minor": "10A",
 }
 
+# Key names as spelled in CAMELOT_MAP, indexed by pitch class
+# (0 = C, 1 = C#/Db, ... 11 = B). Use these when you compute a key
+# from a note number, so get_camelot_key() always finds it.
+MAJOR_KEY_NAMES = [
+    "C Major", "C# Major", "D Major", "Eb Major", "E Major", "F Major",
+    "F# Major", "G Major", "Ab Major", "A Major", "Bb Major", "B Major",
+]
+MINOR_KEY_NAMES = [
+    "C Minor", "C# Minor", "D Minor", "D# Minor", "E Minor", "F Minor",
+    "F# Minor", "G Minor", "G# Minor", "A Minor", "A# Minor", "B Minor",
+]
+
 # Sometimes you need to know the relative key - the "twin" key
 # that uses the same notes but different mood (major vs minor)
 # Example: C Major (8B) and A Minor (8A) use the same notes!
@@ -101,6 +113,25 @@ def get_camelot_key(standard_key_name):
     return CAMELOT_MAP.get(standard_key_name, "Unknown")
 
 
+def key_name_from_pitch_class(pitch_class, is_major):
+    """
+    Build a CAMELOT_MAP key name from a note number.
+    
+    Args:
+        pitch_class: 0-11 (0 = C, 1 = C#, ..., 11 = B)
+        is_major: True for a major key, False for minor
+    
+    Returns:
+        Key name like "Eb Major" or "G# Minor"
+    
+    Example:
+        >>> key_name_from_pitch_class(9, False)
+        'A Minor'
+    """
+    names = MAJOR_KEY_NAMES if is_major else MINOR_KEY_NAMES
+    return names[pitch_class % 12]
+
+
 def get_relative_minor(camelot_code):
     """
     Get the relative minor/major key from a Camelot code.